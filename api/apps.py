@@ -3,3 +3,20 @@ from django.apps import AppConfig
 # main main
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.models.signals import post_delete, post_save
+        from .config_utils import config_changed
+        from .models import Config
+
+        post_save.connect(config_changed, sender=Config, dispatch_uid="config_changed_save")
+        post_delete.connect(config_changed, sender=Config, dispatch_uid="config_changed_delete")
+
+        if getattr(settings, "PHOTO_VALIDATOR_WARM_DETECTORS", False):
+            import threading
+            from .detectors import warm_detectors
+
+            # Loaded in the background so startup is not held up, but before
+            # the first request needs them
+            threading.Thread(target=warm_detectors, name="warm-detectors", daemon=True).start()
@@ -0,0 +1,175 @@
+"""
+Pre-screen of uploaded archives from the ZIP central directory alone.
+
+Before a single member is inflated, every entry is sorted into one of:
+
+* skipped - directories, non-image files and macOS metadata, silently ignored
+* rejected - entries that are never read: unsafe paths, duplicate file names
+  after flattening, oversize or ratio-bomb members, and images whose declared
+  size already fails the file size check
+* accepted - everything else, handed on to full validation
+
+Rejected images still get an ``ImageReport`` so they show up in the results
+like any other invalid image; they are simply never extracted.
+
+``ArchivePrescreen.screen`` judges one member at a time, so the same rules
+apply to a central directory (``prescreen_archive``) and to the local headers
+of an archive that is still being uploaded (see zip_stream). Sizes that are
+only known once a streamed member has been read are checked then, with
+``check_sizes``.
+"""
+import os
+import posixpath
+
+from django.conf import settings
+
+from .batch_sources import is_image_name
+from .check_registry import CheckResult, ImageContext, Reason
+from .validation_engine import ImageReport, build_plan
+
+
+def get_archive_limits():
+    """(max compression ratio, max member size in bytes) from settings"""
+    return (
+        getattr(settings, "PHOTO_VALIDATOR_ARCHIVE_MAX_RATIO", 100),
+        getattr(settings, "PHOTO_VALIDATOR_ARCHIVE_MAX_MEMBER_SIZE", 50 * 1024 * 1024),
+    )
+
+
+def get_archive_max_size():
+    """Largest archive, in bytes, an upload may declare"""
+    return getattr(settings, "PHOTO_VALIDATOR_ARCHIVE_MAX_SIZE", 10 * 1024 * 1024 * 1024)
+
+
+class ArchivePrescreen:
+    """
+    The outcome of screening one archive's members. Image paths are
+    ``<archive_path>/<file name>``; with a config, sizes are run through the
+    enabled file size check.
+    """
+    def __init__(self, archive_path, config=None):
+        self.archive_path = archive_path
+        self.max_ratio, self.max_member_size = get_archive_limits()
+        self.config = config
+        self.plan = build_plan(config) if config is not None else None
+        self.size_check = next(
+            (check for check in self.plan.checks if check.name == "size"), None) if self.plan else None
+        self.bypassed = [check.name for check in self.plan.bypassed] if self.plan else []
+        # image path -> ZipInfo, or the member name of a streamed member
+        self.accepted = {}
+        # (image path, ImageReport)
+        self.rejected = []
+        self.skipped = 0
+        # Accepted members below the archive's top-level folder, flattened
+        self.nested = 0
+        # Image paths of every member screened, whatever the verdict
+        self._seen = set()
+        self._report_names = set()
+
+    def summary(self):
+        reasons = {}
+        for _, report in self.rejected:
+            for result in report.results:
+                if not result.passed:
+                    reasons[result.name] = reasons.get(result.name, 0) + 1
+        return {
+            "accepted": len(self.accepted),
+            "rejected": len(self.rejected),
+            "skipped": self.skipped,
+            "nested": self.nested,
+            "rejected_by": reasons,
+        }
+
+    def _reject_report(self, image_name, reason):
+        result = CheckResult("archive", "Archive pre-screen", False, [reason])
+        return ImageReport(image_name, [result], self.bypassed, 0.0, tier="archive")
+
+    def _unique_name(self, name):
+        """A results name for a duplicate that no other row of the archive uses: ``a (2).jpg``"""
+        stem, extension = os.path.splitext(name)
+        unique = name
+        copy = 1
+        while unique in self._report_names:
+            copy += 1
+            unique = f"{stem} ({copy}){extension}"
+        return unique
+
+    def screen(self, filename, file_size=None, compress_size=None, member=None):
+        """
+        Sort one member into skipped, rejected or accepted; returns its image
+        path when it is to be read, None otherwise. ``member`` is what
+        ``accepted`` keeps for it (default its name). A size that is not
+        known yet (a streamed member with a data descriptor) is None.
+        """
+        name = posixpath.basename(filename)
+        if filename.endswith("/") or not is_image_name(name):
+            self.skipped += 1
+            return None
+        # macOS resource forks (__MACOSX/, ._name.jpg)
+        if name.startswith(".") or filename.startswith("__MACOSX/"):
+            self.skipped += 1
+            return None
+
+        image_path = os.path.join(self.archive_path, name)
+        parts = filename.replace("\\", "/").split("/")
+        duplicate = image_path in self._seen
+        self._seen.add(image_path)
+        if filename.startswith(("/", "\\")) or ".." in parts:
+            report = self._reject_report(name, Reason("archive.unsafe_path", member=filename))
+        elif duplicate:
+            # Renamed so it does not clash with the first copy's row
+            report = self._reject_report(self._unique_name(name), Reason("archive.duplicate"))
+        else:
+            report = self.check_sizes(name, file_size, compress_size)
+
+        if report is not None:
+            self._report_names.add(report.image_name)
+            self.rejected.append((image_path, report))
+            return None
+        self._report_names.add(name)
+        self.accepted[image_path] = member if member is not None else filename
+        if len(parts) > 2:
+            self.nested += 1
+        return image_path
+
+    def check_sizes(self, image_name, file_size, compress_size=None):
+        """The rejecting ImageReport for a member of these sizes, or None"""
+        if file_size is None:
+            return None
+        if file_size > self.max_member_size:
+            return self.too_large_report(image_name, file_size, self.max_member_size)
+        if compress_size is not None and file_size > max(compress_size, 1) * self.max_ratio:
+            return self.ratio_report(image_name, file_size, compress_size)
+        if self.size_check is not None:
+            # The uncompressed size is the file size once extracted
+            context = ImageContext(os.path.join(self.archive_path, image_name), self.config)
+            context.provide("file_size", file_size)
+            results = self.plan.run(context, [self.size_check])
+            if not all(result.passed for result in results):
+                return ImageReport(image_name, results, self.bypassed, 0.0, tier="archive")
+        return None
+
+    def too_large_report(self, image_name, file_size, limit):
+        return self._reject_report(
+            image_name, Reason("archive.too_large", size_mb=file_size / 1024 / 1024, limit_mb=limit / 1024 / 1024))
+
+    def ratio_report(self, image_name, file_size, compress_size):
+        return self._reject_report(
+            image_name, Reason("archive.ratio", ratio=file_size / max(compress_size, 1), limit=self.max_ratio))
+
+    def reject(self, image_path, report):
+        """Reject a member accepted before its sizes were known"""
+        del self.accepted[image_path]
+        self.rejected.append((image_path, report))
+
+
+def prescreen_archive(archive_path, infos, config=None):
+    """
+    Screen ``infos`` (the archive's ZipInfo list, central directory order).
+    Image paths are ``<archive_path>/<file name>``, as used by ZipSource.
+    With a config, declared sizes are run through the enabled file size check.
+    """
+    screen = ArchivePrescreen(archive_path, config)
+    for info in infos:
+        screen.screen(info.filename, info.file_size, info.compress_size, info)
+    return screen
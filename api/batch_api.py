@@ -0,0 +1,191 @@
+"""
+Stateless batch validation for API clients.
+
+One request carries the whole batch: any number of multipart ``images``
+files, or a JSON body ``{"paths": [...]}`` naming files already on the
+server (only below ``PHOTO_VALIDATOR_API_PATH_ROOTS``; none by default).
+The images go through the batch thread engine, largest first, and one JSON
+object per image is streamed back as each finishes (NDJSON). No session,
+workspace, output folder, thumbnail or results database is involved.
+
+Each line is the image's ``format_json_report`` plus ``index``, its
+position in the request, since lines arrive in completion order.
+
+A request carries at most ``PHOTO_VALIDATOR_BATCH_API_MAX_IMAGES`` images of
+at most ``PHOTO_VALIDATOR_SINGLE_IMAGE_MAX_BYTES`` each (413 otherwise), so
+one call cannot hold the shared workers indefinitely. Uploads are counted as
+they arrive and refused as soon as they go over, before the rest of the body
+is read.
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+
+from .batch_sources import RequestSource, is_image_name
+from .config_utils import get_cached_config
+from .photo_validator_threaded import get_optimal_thread_count, iter_thread_engine, schedule_largest_first
+from .single_image import get_max_bytes
+from .validation_engine import build_cascade, build_plan, format_json_report
+
+IMAGES_FIELD = "images"
+# Multipart headers and boundary of one file part, allowed on top of its bytes
+PART_OVERHEAD = 4096
+
+
+class BatchRequestError(Exception):
+    """The request does not describe a batch; ``status`` is the HTTP status to answer with"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_max_images():
+    return getattr(settings, "PHOTO_VALIDATOR_BATCH_API_MAX_IMAGES", 100)
+
+
+def _check_limits(count, sizes):
+    """413 for a request over the image count or per-image size limit"""
+    max_images = get_max_images()
+    if count > max_images:
+        raise BatchRequestError(f"More than {max_images} images in one request", status=413)
+    max_bytes = get_max_bytes()
+    for name, size in sizes:
+        if size > max_bytes:
+            raise BatchRequestError(f"{name} is larger than {max_bytes} bytes", status=413)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Counts the files and bytes of a multipart upload, raising a 413
+    BatchRequestError past ``max_images`` files or ``max_bytes`` in one file.
+    Placed in front of Django's handlers, which still store the files.
+    """
+    def __init__(self, request=None, max_images=None, max_bytes=None):
+        super().__init__(request)
+        self.max_images = max_images
+        self.max_bytes = max_bytes
+        self.files = 0
+        self.file_bytes = 0
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.files += 1
+        self.file_bytes = 0
+        if self.files > self.max_images:
+            raise BatchRequestError(f"More than {self.max_images} images in one request", status=413)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_bytes += len(raw_data)
+        if self.file_bytes > self.max_bytes:
+            raise BatchRequestError(f"{self.file_name} is larger than {self.max_bytes} bytes", status=413)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def get_path_roots():
+    return [os.path.realpath(root) for root in getattr(settings, "PHOTO_VALIDATOR_API_PATH_ROOTS", ())]
+
+
+def _allowed_path(path, roots):
+    real_path = os.path.realpath(path)
+    return any(os.path.commonpath([root, real_path]) == root for root in roots)
+
+
+def parse_batch_request(request):
+    """
+    (RequestSource, {image path: [request indexes]}, [error records]) for a
+    request. Paths that cannot be validated get an error record instead.
+    """
+    source = RequestSource()
+    indexes = {}
+    errors = []
+    if request.content_type.startswith("multipart/"):
+        max_images, max_bytes = get_max_images(), get_max_bytes()
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        max_length = max_images * (max_bytes + PART_OVERHEAD)
+        if content_length > max_length:
+            raise BatchRequestError(f"Request larger than {max_length} bytes", status=413)
+        request.upload_handlers = [LimitedUploadHandler(request, max_images, max_bytes), *request.upload_handlers]
+        files = request.FILES.getlist(IMAGES_FIELD)
+        if not files:
+            raise BatchRequestError(f"No '{IMAGES_FIELD}' files uploaded")
+        _check_limits(len(files), [(uploaded.name, uploaded.size) for uploaded in files])
+        for index, uploaded in enumerate(files):
+            indexes[source.add_upload(uploaded)] = [index]
+        return source, indexes, errors
+
+    if request.content_type != "application/json":
+        raise BatchRequestError("Expected multipart 'images' files or a JSON list of paths", status=415)
+    try:
+        paths = json.loads(request.body)["paths"]
+    except (ValueError, KeyError, TypeError):
+        raise BatchRequestError("Expected a JSON body {\"paths\": [...]}")
+    if not isinstance(paths, list) or not paths or not all(isinstance(path, str) for path in paths):
+        raise BatchRequestError("'paths' must be a non-empty list of strings")
+    _check_limits(len(paths), [])
+    roots = get_path_roots()
+    if not roots:
+        raise BatchRequestError("Server-side paths are not enabled", status=403)
+    for index, path in enumerate(paths):
+        if not _allowed_path(path, roots):
+            raise BatchRequestError(f"Path not allowed: {path}", status=403)
+        if not os.path.isfile(path) or not is_image_name(path):
+            errors.append({"index": index, "image": os.path.basename(path), "path": path,
+                           "valid": False, "error": "Not an image file"})
+            continue
+        _check_limits(1, [(path, os.path.getsize(path))])
+        indexes.setdefault(source.add_path(path), []).append(index)
+    return source, indexes, errors
+
+
+def result_record(result):
+    """The NDJSON object of one ValidationResult"""
+    if result.report is not None:
+        record = format_json_report(result.report)
+    else:
+        # Failed before any check ran: a crash or the watchdog
+        record = {
+            "image": result.image_name,
+            "valid": False,
+            "processing_time": result.processing_time,
+            "checks": [],
+            "reasons": [
+                {"check": check_name, "code": reason.code, "message": reason.render(), "params": reason.params}
+                for check_name, reason in result.reasons
+            ],
+        }
+    record["timed_out"] = result.timed_out
+    return record
+
+
+def iter_batch_ndjson(source, indexes, errors, config=None):
+    """One line per requested image, as each is validated"""
+    for record in errors:
+        yield (json.dumps(record) + "\n").encode("utf-8")
+    if config is None:
+        config = get_cached_config()
+    image_paths, _ = schedule_largest_first(source.list_images(), source)
+    if not image_paths:
+        source.close()
+        return
+    plan = build_plan(config)
+    time_budget = getattr(settings, "PHOTO_VALIDATOR_IMAGE_TIMEOUT", None)
+    max_workers = min(get_optimal_thread_count(), len(image_paths))
+    try:
+        completed = iter_thread_engine(image_paths, config, plan, build_cascade(plan), max_workers,
+                                       time_budget, source, pregenerate=False)
+        for image_path, result in completed:
+            record = result_record(result)
+            if not source.is_upload(image_path):
+                record["path"] = image_path
+            for index in indexes[image_path]:
+                yield (json.dumps({"index": index, **record}) + "\n").encode("utf-8")
+    finally:
+        source.close()
@@ -0,0 +1,283 @@
+"""
+Where the images of a batch come from.
+
+``DirectorySource`` validates files already on disk and moves each one to its
+output folder. ``ZipSource`` reads members straight out of the uploaded
+archive instead of extracting it: a member is inflated into memory for
+decoding, and only the final valid/invalid copy is ever written to disk.
+``StreamingSource`` is filled while an upload is still arriving and hands
+each image to the engine as soon as it is complete. ``RequestSource`` holds
+the images of one JSON API request and commits nothing.
+
+All sources hand out image paths; ``os.path.basename`` of a path is the image name.
+For archive members the path is ``<archive>/<member>`` and never exists on
+disk, so callers go through ``read`` and ``commit`` rather than opening it.
+``commit`` returns how the file got there (see file_commit), or None.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import zipfile
+
+from .file_commit import COMMIT_EXISTS, move_file, write_file
+from .performance_utils import estimate_image_cost
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+
+def is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class UploadAborted(Exception):
+    """A streaming upload ended without completing its batch"""
+
+
+class DirectorySource:
+    """Image files sitting directly in a directory"""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def list_images(self):
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if os.path.isfile(os.path.join(self.directory, name)) and is_image_name(name)
+        )
+
+    def read(self, image_path):
+        """None: the decoders read the file from disk themselves"""
+        return None
+
+    def estimate_cost(self, image_path):
+        return estimate_image_cost(image_path)
+
+    def commit(self, image_path, destination_dir):
+        return move_file(image_path, destination_dir)
+
+    def close(self):
+        pass
+
+
+class ZipSource:
+    """
+    Image members of a ZIP archive, read in place. Folder structure inside the
+    archive is flattened. Reads are safe from several threads at once.
+
+    The central directory is screened first (see archive_prescreen): members
+    it rejects are never read and are reported through ``rejected`` as
+    (image path, ImageReport) pairs. Passing ``config`` also applies its
+    size limits to the declared sizes.
+    """
+    def __init__(self, archive_path, config=None):
+        from .archive_prescreen import prescreen_archive
+
+        self.archive_path = archive_path
+        self._zip = zipfile.ZipFile(archive_path)
+        self.prescreen = prescreen_archive(archive_path, self._zip.infolist(), config)
+        self._members = self.prescreen.accepted
+        self.rejected = self.prescreen.rejected
+        if self.rejected:
+            logging.debug(f"Archive pre-screen of {os.path.basename(archive_path)}: {self.prescreen.summary()}")
+
+    def list_images(self):
+        return sorted(self._members)
+
+    def member(self, image_path):
+        return self._members[image_path]
+
+    def read(self, image_path):
+        """The member's decompressed bytes"""
+        return self._zip.read(self._members[image_path])
+
+    def estimate_cost(self, image_path):
+        info = self._members[image_path]
+        try:
+            # Only the image header is inflated to read the dimensions
+            with self._zip.open(info) as member:
+                return estimate_image_cost(member, file_size=info.file_size)
+        except Exception:
+            return estimate_image_cost(None, file_size=info.file_size)
+
+    def commit(self, image_path, destination_dir):
+        """Write the member to destination_dir; the archive itself is left untouched"""
+        image_name = os.path.basename(image_path)
+        if os.path.exists(os.path.join(destination_dir, image_name)):
+            # Not worth inflating; write_file would refuse to overwrite it anyway
+            logging.debug(f"File {image_name} already exists in destination, skipping")
+            return COMMIT_EXISTS
+        try:
+            with self._zip.open(self._members[image_path]) as member:
+                return write_file(member, destination_dir, image_name)
+        except Exception as e:
+            logging.error(f"Error writing {image_name}: {e}")
+            return None
+
+    def close(self):
+        self._zip.close()
+
+
+class StreamingSource(DirectorySource):
+    """
+    Images that are still being uploaded. The upload side screens every file
+    with ``prescreen`` (see archive_prescreen), calls ``add`` for every
+    accepted one and ``finish`` at the end, or ``abort`` when the upload
+    fails; the engine consumes ``iter_images``, which blocks until the next
+    image arrives. Rejected files are in ``rejected`` once the upload is over.
+
+    Each image is written once to the staging directory (so committing it is
+    a rename) and kept in memory for its worker while the buffered total
+    stays under ``max_buffered_bytes``; beyond that workers read it back from
+    the staging copy. With an ``idle_timeout``, an upload that sends nothing
+    for that many seconds is aborted rather than waited for forever.
+    """
+    streaming = True
+    max_buffered_bytes = 256 * 1024 * 1024
+
+    def __init__(self, staging_dir, config=None, idle_timeout=None):
+        from .archive_prescreen import ArchivePrescreen
+
+        super().__init__(staging_dir)
+        os.makedirs(staging_dir, exist_ok=True)
+        self.prescreen = ArchivePrescreen(staging_dir, config)
+        self.idle_timeout = idle_timeout
+        self.received = 0
+        self.finished = False
+        self.error = None
+        self.last_activity = time.monotonic()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._names = set()
+        self._buffered = {}
+        self._buffered_bytes = 0
+
+    @property
+    def rejected(self):
+        return self.prescreen.rejected
+
+    def touch(self):
+        """The upload is still sending; called for every chunk received"""
+        self.last_activity = time.monotonic()
+
+    def add(self, name, data):
+        """Stage one uploaded file; members are flattened to their file name"""
+        image_name = os.path.basename(name)
+        if not is_image_name(image_name) or image_name.startswith(".") or name.startswith("__MACOSX/"):
+            return False
+        image_path = os.path.join(self.directory, image_name)
+        with self._lock:
+            if self.finished:
+                raise ValueError("Upload batch is already complete")
+            if image_name in self._names:
+                logging.warning(f"Duplicate file name {image_name} in upload, keeping the first")
+                return False
+            self._names.add(image_name)
+            with open(image_path, "wb") as f:
+                f.write(data)
+            if self._buffered_bytes + len(data) <= self.max_buffered_bytes:
+                self._buffered[image_path] = data
+                self._buffered_bytes += len(data)
+            self.received += 1
+            self.last_activity = time.monotonic()
+        self._queue.put(image_path)
+        return True
+
+    def finish(self):
+        """No more files will be added; iter_images stops once it has drained"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        self._queue.put(None)
+
+    def abort(self, error):
+        """No more files will be added and the batch is abandoned; iter_images raises UploadAborted"""
+        with self._lock:
+            if self.error is None:
+                self.error = error
+            if self.finished:
+                return
+            self.finished = True
+        self._queue.put(None)
+
+    def iter_images(self):
+        while True:
+            try:
+                image_path = self._queue.get(timeout=1.0 if self.idle_timeout else None)
+            except queue.Empty:
+                if time.monotonic() - self.last_activity > self.idle_timeout:
+                    self.abort(f"Upload sent nothing for {self.idle_timeout}s")
+                continue
+            if self.error is not None:
+                raise UploadAborted(self.error)
+            if image_path is None:
+                return
+            yield image_path
+
+    def list_images(self):
+        raise TypeError("StreamingSource has no up-front image list, use iter_images")
+
+    def read(self, image_path):
+        """The buffered bytes, handed out once; None means read the staged file"""
+        with self._lock:
+            data = self._buffered.pop(image_path, None)
+            if data is not None:
+                self._buffered_bytes -= len(data)
+        return data
+
+    def close(self):
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass
+
+
+class RequestSource:
+    """
+    The images of one stateless API request: uploaded files, read into
+    memory by the worker validating them, and files already on the server,
+    read in place. Nothing is written anywhere; ``commit`` does nothing.
+    Upload paths are ``upload/<n>/<file name>`` and never exist on disk.
+    """
+    def __init__(self):
+        # image path -> uploaded file, or None for a file on the server
+        self._images = {}
+
+    def add_upload(self, uploaded):
+        image_path = f"upload/{len(self._images)}/{os.path.basename(uploaded.name)}"
+        self._images[image_path] = uploaded
+        return image_path
+
+    def add_path(self, image_path):
+        self._images.setdefault(image_path, None)
+        return image_path
+
+    def is_upload(self, image_path):
+        return self._images[image_path] is not None
+
+    def list_images(self):
+        return list(self._images)
+
+    def read(self, image_path):
+        """The uploaded bytes; None means read the server-side file"""
+        uploaded = self._images[image_path]
+        if uploaded is None:
+            return None
+        uploaded.seek(0)
+        return uploaded.read()
+
+    def estimate_cost(self, image_path):
+        uploaded = self._images[image_path]
+        if uploaded is None:
+            return estimate_image_cost(image_path)
+        uploaded.seek(0)
+        return estimate_image_cost(uploaded, file_size=uploaded.size)
+
+    def commit(self, image_path, destination_dir):
+        return None
+
+    def close(self):
+        for uploaded in self._images.values():
+            if uploaded is not None:
+                uploaded.close()
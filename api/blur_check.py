@@ -2,8 +2,9 @@ import cv2
 import numpy as np
 from .models import Config
 
-def check_image_blurness(image, config=None):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+def check_image_blurness(image, config=None, gray=None):
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
     is_blur_result, blur_value, blur_threshold = check_if_blur(gray, config)
     is_pixelated_result, pixelated_value, pixelated_threshold = check_if_pixalated(gray, config)
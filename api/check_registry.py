@@ -0,0 +1,736 @@
+"""
+Declarative registry of validation checks.
+
+Every check declares the shared inputs it needs (path, file size, header,
+decoded BGR, gray, saturation, face detections) and a cost class.
+``compile_plan`` turns the checks enabled in ``Config`` into an
+``ExecutionPlan`` so each input is computed at most once per image and inputs
+no enabled check needs are never computed at all.
+
+Each check also has a working resolution: pixel checks analyse a copy
+downscaled to that longest side, detector checks that need detail keep the
+full image. ``settings.PHOTO_VALIDATOR_WORKING_RESOLUTION`` overrides it per
+check name.
+
+Checks flagged ``prescreen`` are trusted to reject obvious failures from a
+tiny thumbnail decode (see ``validation_engine.PrescreenCascade``).
+
+Failures are ``Reason`` objects: a code from ``REASONS`` plus the numbers
+behind it. Text is only rendered for display, so results can be counted
+and grouped by code however many distinct values the parameters take.
+"""
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import wait
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .performance_utils import resize_for_processing, load_thumbnail
+
+import api.background_check as background_check
+import api.blur_check as blur_check
+import api.file_format_check as file_format_check
+import api.file_size_check as file_size_check
+import api.grey_black_and_white_check as grey_black_and_white_check
+import api.head_check as head_check
+import api.symmetry_check as symmetry_check
+
+# Cost classes, cheapest first
+COST_METADATA = "metadata"    # path / header only, no pixel decode
+COST_PIXEL = "pixel"          # a few passes over the decoded pixels
+COST_DETECTOR = "detector"    # cascade / dlib / SSIM analysis
+COST_ORDER = (COST_METADATA, COST_PIXEL, COST_DETECTOR)
+
+PIXEL_INPUTS = ("bgr", "gray", "saturation", "faces")
+
+# Longest side (px) used by checks that do not need full detail
+DEFAULT_WORKING_RESOLUTION = 800
+
+# EXIF tag holding the rotation/flip the image is stored with
+EXIF_ORIENTATION = 0x0112
+
+
+# Reason code -> (short label used when aggregating, message template)
+REASONS = {
+    "format.unsupported": ("Unsupported file format", "File format check failed"),
+    "size.out_of_range": ("File size out of range",
+                          "File size check failed ({size_kb:.1f}KB, required: {min_kb}-{max_kb}KB)"),
+    "height.unreadable": ("Height unreadable", "File height check failed"),
+    "height.out_of_range": ("Height out of range",
+                            "Height check failed ({height}px, required: {min_height}-{max_height}px)"),
+    "width.unreadable": ("Width unreadable", "File width check failed"),
+    "width.out_of_range": ("Width out of range",
+                           "Width check failed ({width}px, required: {min_width}-{max_width}px)"),
+    "corrupted.corrupted": ("Corrupted image", "Corrupted Image"),
+    "greyness.grey": ("Greyscale image", "Greyscale check failed (image should be in color)"),
+    "blurness.blurry": ("Blurry image",
+                        "Blurness check failed ({sharpness:.1f}% sharpness, min required: {min_sharpness:.1f}%)"),
+    "blurness.pixelated": ("Pixelated image",
+                           "Pixelation check failed ({lines} lines detected, max allowed: {max_lines})"),
+    "background.not_plain": ("Background not plain", "Background check failed"),
+    "head.too_small": ("Head too small",
+                       "Head check failed ({head_percent:.1f}% head coverage, min required: 10%)"),
+    "head.too_large": ("Head too large",
+                       "Head check failed ({head_percent:.1f}% head coverage, max allowed: 80%)"),
+    "head.out_of_range": ("Head size out of range",
+                          "Head check failed ({head_percent:.1f}% head coverage, required: 10-80%)"),
+    "head.no_face": ("No face detected", "Head check failed (no face detected)"),
+    "head.multiple_faces": ("Multiple faces detected", "Head check failed (multiple faces detected)"),
+    "eye.not_visible": ("Eyes not visible", "Eye check failed (eyes not visible or covered)"),
+    "symmetry.asymmetric": ("Face not symmetric",
+                            "Symmetry check failed ({symmetry:.1f}% symmetric, min required: {min_symmetry:.1f}%)"),
+    "timeout.budget": ("Timed out", "Timed out (time budget exceeded before the {stage} check)"),
+    "timeout.watchdog": ("Timed out", "Timed out after {elapsed:.1f}s (time budget {budget:.1f}s), quarantined"),
+    "load.failed": ("Image could not be loaded", "{error}"),
+    "error.check": ("Check error", "{label} check error: {error}"),
+    "error.worker_crashed": ("Worker crashed", "Processing error: worker process crashed"),
+    "error.unexpected": ("Unexpected error", "Unexpected error: {error}"),
+    "archive.unsafe_path": ("Unsafe path in archive", "Unsafe path in archive ({member})"),
+    "archive.duplicate": ("Duplicate file name in archive", "Duplicate file name in archive"),
+    "archive.too_large": ("Archive member too large",
+                          "Member too large ({size_mb:.1f}MB declared, limit {limit_mb:.0f}MB)"),
+    "archive.ratio": ("Suspicious compression ratio",
+                      "Suspicious compression ratio ({ratio:.0f}:1, limit {limit}:1)"),
+    "unknown": ("Issue details unavailable", "Issue details unavailable"),
+}
+
+# Stands in for the reasons of an image that failed without stating any
+UNKNOWN_REASON = "unknown"
+
+
+def reason_label(code):
+    return REASONS[code][0] if code in REASONS else code
+
+
+def render_reason(code, params):
+    """The display text of a reason code and its parameters"""
+    if code not in REASONS:
+        return code
+    try:
+        return REASONS[code][1].format(**params)
+    except (KeyError, IndexError, ValueError):
+        return REASONS[code][0]
+
+
+class Reason:
+    """Why a check failed: a code from REASONS and its numeric parameters"""
+    __slots__ = ("code", "params")
+
+    def __init__(self, code, **params):
+        self.code = code
+        # NumPy scalars become plain numbers so the parameters serialize as JSON
+        self.params = {name: value.item() if isinstance(value, np.generic) else value
+                       for name, value in params.items()}
+
+    def render(self):
+        return render_reason(self.code, self.params)
+
+    def __repr__(self):
+        return f"<Reason {self.code} {self.params}>"
+
+
+class ImageLoadError(Exception):
+    """Raised by an input provider when the image cannot be decoded"""
+
+
+class CheckResult:
+    """Outcome of a single check; ``reasons`` says why it failed"""
+    def __init__(self, name, label, passed, reasons=None, details="", metrics=None):
+        self.name = name
+        self.label = label
+        self.passed = passed
+        self.reasons = reasons or []
+        self.details = details
+        self.metrics = metrics or {}
+        self.elapsed = 0.0
+
+    @property
+    def messages(self):
+        return [reason.render() for reason in self.reasons]
+
+
+class Check:
+    """A registered validation check and the inputs it consumes"""
+    def __init__(self, name, label, bypass_field, inputs, cost, func,
+                 working_resolution=None, errors_fail=True, prescreen=False):
+        self.name = name
+        self.label = label
+        self.bypass_field = bypass_field
+        self.inputs = tuple(inputs)
+        self.cost = cost
+        self.func = func
+        # Longest side the check analyses; None means full resolution
+        self.working_resolution = working_resolution
+        # When False an exception inside the check is logged and the check skipped
+        self.errors_fail = errors_fail
+        # Whether a failure on the thumbnail is decisive enough to reject early
+        self.prescreen = prescreen
+
+    def result(self, passed, reasons=None, details="", metrics=None):
+        return CheckResult(self.name, self.label, passed, reasons, details, metrics)
+
+    def __repr__(self):
+        return f"<Check {self.name} ({self.cost})>"
+
+
+# name -> (dependencies, provider function)
+INPUT_PROVIDERS = {}
+CHECK_REGISTRY = []
+
+
+def input_provider(name, requires=()):
+    """Register a function that computes a shared input from an ImageContext"""
+    def decorator(func):
+        INPUT_PROVIDERS[name] = (tuple(requires), func)
+        return func
+    return decorator
+
+
+def register_check(name, label, bypass_field, inputs, cost, working_resolution=None, errors_fail=True,
+                   prescreen=False):
+    """Register a check; checks run in registration order"""
+    def decorator(func):
+        CHECK_REGISTRY.append(Check(name, label, bypass_field, inputs, cost, func,
+                                    working_resolution=working_resolution, errors_fail=errors_fail,
+                                    prescreen=prescreen))
+        return func
+    return decorator
+
+
+class ImageContext:
+    """
+    Lazily computes and caches the shared inputs for one image.
+    Pixel inputs are cached per working resolution so checks sharing a
+    resolution share the downscaled copy and everything derived from it.
+
+    ``data`` holds the encoded image when it was read from somewhere other
+    than ``path`` (e.g. an archive member); ``path`` then only names it.
+
+    Checks running in parallel may ask for the same input at once: it is
+    still computed once, the others wait for it. An input that failed (an
+    image that cannot be decoded) is not tried again: every later ``get``
+    raises the same error.
+    """
+    def __init__(self, path, config, deadline=None, data=None):
+        self.path = path
+        self.config = config
+        # time.monotonic() value after which no further check is started
+        self.deadline = deadline
+        self.data = data
+        self._cache = {}
+        self._failures = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def open(self):
+        """Something PIL can open: the in-memory bytes if present, else the path"""
+        return io.BytesIO(self.data) if self.data is not None else self.path
+
+    def get(self, name, max_dimension=None):
+        key = (name, self._scale(name, max_dimension))
+        if key in self._cache:
+            return self._cache[key]
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key in self._failures:
+                raise self._failures[key]
+            if key not in self._cache:
+                requires, provider = INPUT_PROVIDERS[name]
+                try:
+                    self._cache[key] = provider(self, key[1])
+                except Exception as e:
+                    self._failures[key] = e
+                    raise
+        return self._cache[key]
+
+    def at(self, max_dimension):
+        return InputView(self, max_dimension)
+
+    def decoded_bgr(self, min_dimension):
+        """
+        The smallest BGR copy already decoded whose longest side is at least
+        min_dimension (the largest one if the image is smaller); None if no
+        pixels were decoded. Never decodes anything itself. Thumbnail-scale
+        copies come from PIL, which ignores EXIF orientation, so they only
+        count when the header says the image is stored upright.
+        """
+        upright = self._upright()
+        copies = [image for (name, scale), image in self._cache.items()
+                  if name == "bgr" and (upright or not isinstance(scale, tuple))]
+        if not copies:
+            return None
+        large_enough = [image for image in copies if max(image.shape[:2]) >= min_dimension]
+        if large_enough:
+            return min(large_enough, key=lambda image: image.shape[0] * image.shape[1])
+        return max(copies, key=lambda image: image.shape[0] * image.shape[1])
+
+    def _upright(self):
+        header = self._cache.get(("header", None))
+        if header is None:
+            return False
+        try:
+            return header.getexif().get(EXIF_ORIENTATION, 1) == 1
+        except Exception:
+            return False
+
+    def provide(self, name, value):
+        """Supply an input that is already known, e.g. a size declared in an archive"""
+        self._cache[(name, None)] = value
+
+    def _scale(self, name, max_dimension):
+        if name not in PIXEL_INPUTS or not max_dimension:
+            return None
+        if isinstance(max_dimension, tuple):
+            # Thumbnail scales are decoded separately, never from the full image
+            return max_dimension
+        height, width = self.get("bgr").shape[:2]
+        return None if max(height, width) <= max_dimension else max_dimension
+
+    def close(self):
+        header = self._cache.get(("header", None))
+        if header is not None:
+            try:
+                header.close()
+            except Exception:
+                pass
+        self._cache.clear()
+
+
+class InputView:
+    """An ImageContext seen at one working resolution"""
+    def __init__(self, context, max_dimension):
+        self.context = context
+        self.max_dimension = max_dimension
+
+    @property
+    def path(self):
+        return self.context.path
+
+    def get(self, name):
+        return self.context.get(name, self.max_dimension)
+
+
+def thumbnail_scale(size):
+    """Scale key for inputs computed from a reduced-resolution thumbnail decode"""
+    return ("thumbnail", size)
+
+
+@input_provider("path")
+def _provide_path(context, scale):
+    return context.path
+
+
+@input_provider("file_size", requires=("path",))
+def _provide_file_size(context, scale):
+    if context.data is not None:
+        return len(context.data)
+    return os.path.getsize(context.get("path"))
+
+
+@input_provider("header", requires=("path",))
+def _provide_header(context, scale):
+    # PIL only parses the header here; pixels are decoded on demand
+    try:
+        return Image.open(context.open())
+    except Exception as e:
+        logging.debug(f"Could not read image header for {context.path}: {e}")
+        return None
+
+
+@input_provider("bgr", requires=("path",))
+def _provide_bgr(context, scale):
+    if isinstance(scale, tuple):
+        img = load_thumbnail(context.open(), scale[1])
+        if img is None:
+            raise ImageLoadError("Could not load image")
+        return img
+    if scale:
+        return resize_for_processing(context.get("bgr"), scale)
+
+    if context.data is not None:
+        img = cv2.imdecode(np.frombuffer(context.data, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        img = cv2.imread(context.get("path"))
+    if img is None:
+        logging.error(f"Failed to load image: {context.path}")
+        raise ImageLoadError("Could not load image")
+
+    # Normalise to 3-channel 8-bit BGR
+    if len(img.shape) == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    elif len(img.shape) == 3 and img.shape[2] == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    elif len(img.shape) != 3 or img.shape[2] != 3:
+        logging.error(f"Unsupported image format for {context.path}: shape {img.shape}")
+        raise ImageLoadError("Unsupported image format")
+
+    if img.dtype != 'uint8':
+        img = img.astype('uint8')
+    return img
+
+
+@input_provider("gray", requires=("bgr",))
+def _provide_gray(context, scale):
+    return cv2.cvtColor(context.get("bgr", scale), cv2.COLOR_BGR2GRAY)
+
+
+@input_provider("saturation", requires=("bgr",))
+def _provide_saturation(context, scale):
+    return cv2.cvtColor(context.get("bgr", scale), cv2.COLOR_BGR2HSV)[:, :, 1]
+
+
+@input_provider("faces", requires=("gray",))
+def _provide_faces(context, scale):
+    return head_check.detect_faces(None, gray=context.get("gray", scale))
+
+
+class CheckSchedule:
+    """
+    When each check of a parallel run started and finished, in seconds from
+    the start of the run. A check's span includes waiting for inputs another
+    check was computing (the decode), so the check that finished last ends
+    the critical path: the inputs it needed, then the check itself.
+    """
+    def __init__(self, spans, wall_time, inputs):
+        self.spans = spans
+        self.wall_time = wall_time
+        # check name -> the inputs it needs, dependencies first
+        self.inputs = inputs
+
+    @property
+    def critical_check(self):
+        if not self.spans:
+            return None
+        return max(self.spans, key=lambda name: self.spans[name][1])
+
+    @property
+    def critical_path(self):
+        critical = self.critical_check
+        if critical is None:
+            return []
+        return [name for name in self.inputs[critical] if name != "path"] + [critical]
+
+    def describe(self):
+        return {
+            "wall_time": self.wall_time,
+            "critical_path": self.critical_path,
+            "spans": {name: {"start": begin, "end": end} for name, (begin, end) in self.spans.items()},
+        }
+
+
+class ExecutionPlan:
+    """The enabled checks for a config plus the inputs they need, in order"""
+    def __init__(self, checks, bypassed, resolutions):
+        self.checks = tuple(checks)
+        self.bypassed = tuple(bypassed)
+        self.resolutions = dict(resolutions)
+        self.inputs = _resolve_inputs(self.checks)
+
+    def run(self, context, checks=None, resolutions=None):
+        """
+        Run the checks (all of the plan's by default) against the context;
+        stops early if the image cannot be decoded. ``resolutions`` overrides
+        the plan's working resolution per check name.
+        """
+        results = []
+        for check in (self.checks if checks is None else checks):
+            result, stop = self._run_check(check, context, resolutions)
+            if result is not None:
+                results.append(result)
+            if stop:
+                break
+        return results
+
+    def run_parallel(self, context, executor, checks=None, resolutions=None):
+        """
+        The same checks and results as ``run``, with the checks fanned out to
+        a concurrent.futures executor: once the image is decoded they are
+        independent, so with spare cores the wall time tends towards that of
+        the slowest chain rather than the sum; without them it is no better.
+        Detector checks are submitted first so they start right away.
+        Returns (results, CheckSchedule).
+        """
+        checks = self.checks if checks is None else tuple(checks)
+        started = time.perf_counter()
+
+        def run_one(check):
+            begin = time.perf_counter() - started
+            result, stop = self._run_check(check, context, resolutions)
+            return result, stop, begin, time.perf_counter() - started
+
+        by_cost = sorted(checks, key=lambda check: COST_ORDER.index(check.cost), reverse=True)
+        futures = {check.name: executor.submit(run_one, check) for check in by_cost}
+        # Every check finishes before the context can be closed
+        wait(futures.values())
+
+        results = []
+        spans = {}
+        for check in checks:
+            result, stop, begin, end = futures[check.name].result()
+            spans[check.name] = (begin, end)
+            if result is not None:
+                results.append(result)
+            if stop:
+                # As run would have: nothing after the check that stopped it
+                break
+        inputs = {check.name: _resolve_inputs((check,)) for check in checks}
+        return results, CheckSchedule(spans, time.perf_counter() - started, inputs)
+
+    def _run_check(self, check, context, resolutions=None):
+        """(CheckResult or None when its error is ignored, whether to stop) for one check"""
+        if context.deadline is not None and time.monotonic() > context.deadline:
+            # Cooperative watchdog: give up between stages once over budget
+            reason = Reason("timeout.budget", stage=check.label.lower())
+            return CheckResult("timeout", "Time budget", False, [reason]), True
+        resolution = self.resolutions.get(check.name)
+        if resolutions and check.name in resolutions:
+            resolution = resolutions[check.name]
+        started = time.perf_counter()
+        try:
+            result = check.func(check, context.at(resolution), context.config)
+            result.elapsed = time.perf_counter() - started
+            return result, False
+        except ImageLoadError as e:
+            return CheckResult("load", "Image load", False, [Reason("load.failed", error=str(e))]), True
+        except Exception as e:
+            logging.error(f"Error in {check.label.lower()} check for {os.path.basename(context.path)}: {e}")
+            if check.errors_fail:
+                reason = Reason("error.check", label=check.label, error=str(e))
+                return check.result(False, [reason], f"error: {str(e)}"), False
+            return None, False
+
+    def describe(self):
+        return {
+            "checks": [check.name for check in self.checks],
+            "bypassed": [check.name for check in self.bypassed],
+            "inputs": list(self.inputs),
+            "resolutions": {check.name: self.resolutions.get(check.name) for check in self.checks},
+        }
+
+
+def _resolve_inputs(checks):
+    """Inputs needed by the checks, dependencies first"""
+    ordered = []
+
+    def visit(name):
+        if name in ordered:
+            return
+        for dependency in INPUT_PROVIDERS[name][0]:
+            visit(dependency)
+        ordered.append(name)
+
+    for check in checks:
+        for name in check.inputs:
+            visit(name)
+    return tuple(ordered)
+
+
+def get_working_resolutions(overrides=None):
+    """Working resolution per check: registry default, then settings, then overrides"""
+    configured = getattr(settings, "PHOTO_VALIDATOR_WORKING_RESOLUTION", None) or {}
+    resolutions = {}
+    for check in CHECK_REGISTRY:
+        resolution = configured.get(check.name, check.working_resolution)
+        if overrides and check.name in overrides:
+            resolution = overrides[check.name]
+        resolutions[check.name] = int(resolution) if resolution else None
+    return resolutions
+
+
+def compile_plan(config, resolutions=None):
+    """Compile the checks enabled in config into an ExecutionPlan"""
+    enabled = tuple(
+        check.name for check in CHECK_REGISTRY
+        if not getattr(config, check.bypass_field, False)
+    )
+    if resolutions is None:
+        resolutions = get_working_resolutions()
+    return _compile_plan(enabled, tuple(sorted(resolutions.items())))
+
+
+@lru_cache(maxsize=32)
+def _compile_plan(enabled_names, resolutions):
+    checks = [check for check in CHECK_REGISTRY if check.name in enabled_names]
+    bypassed = [check for check in CHECK_REGISTRY if check.name not in enabled_names]
+    return ExecutionPlan(checks, bypassed, resolutions)
+
+
+# ---------------------------------------------------------------------------
+# Registered checks
+# ---------------------------------------------------------------------------
+
+@register_check("format", "File format", "bypass_format_check", ("header",), COST_METADATA)
+def _check_format(check, inputs, config):
+    header = inputs.get("header")
+    if header is None:
+        return check.result(False, [Reason("format.unsupported")], "unsupported format")
+    if file_format_check.check_image(inputs.path, config, img=header):
+        return check.result(True, details="supported format", metrics={"format": header.format})
+    return check.result(False, [Reason("format.unsupported")], "unsupported format",
+                        metrics={"format": header.format})
+
+
+@register_check("size", "File size", "bypass_size_check", ("file_size",), COST_METADATA)
+def _check_size(check, inputs, config):
+    file_size = inputs.get("file_size")
+    file_size_kb = file_size / 1024
+    min_size = getattr(config, 'min_size', 10)
+    max_size = getattr(config, 'max_size', 5000)
+    metrics = {"size_kb": file_size_kb}
+    if file_size_check.check_image(inputs.path, config, size=file_size):
+        return check.result(True, details=f"{file_size_kb:.1f}KB", metrics=metrics)
+    return check.result(
+        False,
+        [Reason("size.out_of_range", size_kb=file_size_kb, min_kb=min_size, max_kb=max_size)],
+        f"{file_size_kb:.1f}KB, required: {min_size}-{max_size}KB",
+        metrics,
+    )
+
+
+@register_check("height", "File height", "bypass_height_check", ("header",), COST_METADATA)
+def _check_height(check, inputs, config):
+    header = inputs.get("header")
+    if header is None or not file_size_check.check_height(inputs.path, config, im=header):
+        if header is None:
+            return check.result(False, [Reason("height.unreadable")])
+        height = header.size[1]
+        min_height = getattr(config, 'min_height', 100)
+        max_height = getattr(config, 'max_height', 2000)
+        return check.result(
+            False,
+            [Reason("height.out_of_range", height=height, min_height=min_height, max_height=max_height)],
+            f"{height}px, required: {min_height}-{max_height}px",
+            {"height": height},
+        )
+    return check.result(True, details=f"{header.size[1]}px", metrics={"height": header.size[1]})
+
+
+@register_check("width", "File width", "bypass_width_check", ("header",), COST_METADATA)
+def _check_width(check, inputs, config):
+    header = inputs.get("header")
+    if header is None or not file_size_check.check_width(inputs.path, config, im=header):
+        if header is None:
+            return check.result(False, [Reason("width.unreadable")])
+        width = header.size[0]
+        min_width = getattr(config, 'min_width', 100)
+        max_width = getattr(config, 'max_width', 2000)
+        return check.result(
+            False,
+            [Reason("width.out_of_range", width=width, min_width=min_width, max_width=max_width)],
+            f"{width}px, required: {min_width}-{max_width}px",
+            {"width": width},
+        )
+    return check.result(True, details=f"{header.size[0]}px", metrics={"width": header.size[0]})
+
+
+@register_check("corrupted", "Corruption", "bypass_corrupted_check", ("bgr",), COST_PIXEL,
+                working_resolution=DEFAULT_WORKING_RESOLUTION)
+def _check_corrupted(check, inputs, config):
+    if file_format_check.is_corrupted_image(inputs.get("bgr")):
+        return check.result(False, [Reason("corrupted.corrupted")], "corrupted image")
+    return check.result(True, details="image loads correctly")
+
+
+@register_check("greyness", "Greyness", "bypass_greyness_check", ("saturation",), COST_PIXEL,
+                working_resolution=DEFAULT_WORKING_RESOLUTION, prescreen=True)
+def _check_greyness(check, inputs, config):
+    saturation = inputs.get("saturation")
+    if grey_black_and_white_check.is_grey(None, config, saturation=saturation):
+        return check.result(False, [Reason("greyness.grey")],
+                            "image too grey/black and white")
+    return check.result(True, details="sufficient color variation")
+
+
+@register_check("blurness", "Blurness", "bypass_blurness_check", ("gray",), COST_PIXEL,
+                working_resolution=DEFAULT_WORKING_RESOLUTION, prescreen=True)
+def _check_blurness(check, inputs, config):
+    gray = inputs.get("gray")
+    is_blur, blur_details = blur_check.check_image_blurness(None, config, gray=gray)
+    metrics = {
+        "blur_value": blur_details['blur_value'],
+        "pixelated_value": blur_details['pixelated_value'],
+    }
+    if not is_blur:
+        return check.result(True, details="no blur or pixelation", metrics=metrics)
+
+    # Convert blur value to percentage (higher laplacian variance = sharper image)
+    sharpness_percentage = min(100, (blur_details['blur_value'] / 500) * 100)
+    min_sharpness_percent = (blur_details['blur_threshold'] / 500) * 100
+
+    reasons = []
+    if blur_details['is_blur']:
+        reasons.append(Reason("blurness.blurry", sharpness=sharpness_percentage, min_sharpness=min_sharpness_percent))
+    if blur_details['is_pixelated']:
+        reasons.append(Reason("blurness.pixelated", lines=blur_details['pixelated_value'],
+                              max_lines=blur_details['pixelated_threshold']))
+    return check.result(False, reasons, "; ".join(reason.render() for reason in reasons), metrics)
+
+
+@register_check("background", "Background", "bypass_background_check", ("bgr",), COST_PIXEL,
+                working_resolution=DEFAULT_WORKING_RESOLUTION, prescreen=True)
+def _check_background(check, inputs, config):
+    if background_check.background_check(inputs.get("bgr"), config):
+        return check.result(True)
+    return check.result(False, [Reason("background.not_plain")])
+
+
+@register_check("head", "Head", "bypass_head_check", ("bgr", "faces"), COST_DETECTOR,
+                errors_fail=False)
+def _check_head(check, inputs, config):
+    bgr = inputs.get("bgr")
+    faces = inputs.get("faces")
+    is_head_valid, head_percent = head_check.valid_head_check(bgr, faces=faces)
+    metrics = {"head_percent": head_percent} if head_percent <= 100 else {}
+    if is_head_valid:
+        return check.result(True, details=f"{head_percent:.1f}% head coverage", metrics=metrics)
+
+    if head_percent < 10:
+        reason = Reason("head.too_small", head_percent=head_percent)
+        details = f"{head_percent:.1f}% head coverage, min required: 10%"
+    elif 100 > head_percent > 80:
+        reason = Reason("head.too_large", head_percent=head_percent)
+        details = f"{head_percent:.1f}% head coverage, max allowed: 80%"
+    elif head_percent == 101:
+        reason = Reason("head.no_face")
+        details = "no face detected"
+    elif head_percent == 102:
+        reason = Reason("head.multiple_faces")
+        details = "multiple faces detected"
+    else:
+        reason = Reason("head.out_of_range", head_percent=head_percent)
+        details = f"{head_percent:.1f}% head coverage, required: 10-80%"
+    return check.result(False, [reason], details, metrics)
+
+
+@register_check("eye", "Eye", "bypass_eye_check", ("gray",), COST_DETECTOR,
+                errors_fail=False)
+def _check_eye(check, inputs, config):
+    if head_check.detect_eyes(None, gray=inputs.get("gray")):
+        return check.result(False, [Reason("eye.not_visible")],
+                            "eyes not visible or covered")
+    return check.result(True, details="eyes visible")
+
+
+@register_check("symmetry", "Symmetry", "bypass_symmetry_check", ("bgr", "gray"), COST_DETECTOR,
+                working_resolution=DEFAULT_WORKING_RESOLUTION)
+def _check_symmetry(check, inputs, config):
+    is_symmetric, symmetry_percentage, threshold_percentage = symmetry_check.check_symmetry_with_head(
+        inputs.get("bgr"), config, gray=inputs.get("gray")
+    )
+    metrics = {"symmetry_percentage": symmetry_percentage}
+    if is_symmetric:
+        return check.result(True, details=f"{symmetry_percentage:.1f}% symmetric", metrics=metrics)
+    return check.result(
+        False,
+        [Reason("symmetry.asymmetric", symmetry=symmetry_percentage, min_symmetry=threshold_percentage)],
+        f"{symmetry_percentage:.1f}% symmetric, min required: {threshold_percentage:.1f}%",
+        metrics,
+    )
@@ -0,0 +1,232 @@
+"""
+Resumable chunked uploads for large batch archives.
+
+A client creates an upload (file name and total size), then sends the file
+in order as raw chunks, each with the offset it starts at and its SHA-256.
+The server appends a chunk only if its offset matches what it already has
+and its checksum matches, so after a dropped connection the client asks for
+the current offset and carries on from there.
+
+Chunks are appended to ``<id>.part`` under ``media/photo_folder/.uploads``;
+the upload's metadata, including the offset up to which the part file has
+been verified, sits next to it in ``<id>.json``, so uploads survive a server
+restart. Completing an upload renames the part file into
+``media/photo_folder`` - the same place a regular upload ends up - without
+copying it.
+
+The API needs no login, so an upload may not declare more than
+``PHOTO_VALIDATOR_ARCHIVE_MAX_SIZE`` bytes, and one that has not received a
+chunk for ``PHOTO_VALIDATOR_UPLOAD_EXPIRY`` seconds is deleted: when it is
+next asked for, or when any new upload is created.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .archive_prescreen import get_archive_max_size
+
+UPLOAD_DIR_NAME = ".uploads"
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+READ_BLOCK_SIZE = 64 * 1024
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class ChunkedUploadError(Exception):
+    """A request the upload cannot accept; ``status`` is the HTTP status to answer with"""
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def get_chunk_size():
+    return getattr(settings, "PHOTO_VALIDATOR_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+
+
+def get_upload_expiry():
+    return getattr(settings, "PHOTO_VALIDATOR_UPLOAD_EXPIRY", 24 * 60 * 60)
+
+
+def _upload_dir():
+    return os.path.join(settings.MEDIA_ROOT, "photo_folder", UPLOAD_DIR_NAME)
+
+
+def _is_stale(meta_path):
+    """No chunk has been stored for longer than the expiry; the metadata is rewritten with each one"""
+    try:
+        return time.time() - os.path.getmtime(meta_path) > get_upload_expiry()
+    except OSError:
+        return False
+
+
+def _delete_upload(upload_id):
+    for suffix in (".part", ".json"):
+        try:
+            os.remove(os.path.join(_upload_dir(), upload_id + suffix))
+        except FileNotFoundError:
+            pass
+    with _locks_lock:
+        _locks.pop(upload_id, None)
+
+
+def expire_stale_uploads():
+    """Delete the uploads that have not received a chunk within the expiry; returns how many"""
+    try:
+        names = os.listdir(_upload_dir())
+    except FileNotFoundError:
+        return 0
+    expired = 0
+    for name in names:
+        upload_id, extension = os.path.splitext(name)
+        if extension == ".json" and UPLOAD_ID_PATTERN.match(upload_id) and _is_stale(os.path.join(_upload_dir(), name)):
+            with _lock_for(upload_id):
+                _delete_upload(upload_id)
+            expired += 1
+    if expired:
+        logging.info(f"Deleted {expired} stale chunked uploads")
+    return expired
+
+
+def _lock_for(upload_id):
+    with _locks_lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+class ChunkedUpload:
+    """One upload in progress"""
+    def __init__(self, upload_id, filename, size, offset=0):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        # Bytes received and checksum-verified so far
+        self.offset = offset
+
+    @property
+    def part_path(self):
+        return os.path.join(_upload_dir(), self.upload_id + ".part")
+
+    @property
+    def meta_path(self):
+        return os.path.join(_upload_dir(), self.upload_id + ".json")
+
+    @classmethod
+    def create(cls, filename, size):
+        filename = os.path.basename(filename or "")
+        if not filename.lower().endswith(".zip"):
+            raise ChunkedUploadError("Only ZIP archives can be uploaded")
+        if size is None or size <= 0:
+            raise ChunkedUploadError("Upload size must be a positive number of bytes")
+        max_size = get_archive_max_size()
+        if size > max_size:
+            raise ChunkedUploadError(f"Upload larger than {max_size} bytes", status=413)
+        expire_stale_uploads()
+        upload = cls(uuid.uuid4().hex, filename, size)
+        os.makedirs(_upload_dir(), exist_ok=True)
+        open(upload.part_path, "wb").close()
+        upload._save()
+        return upload
+
+    @classmethod
+    def load(cls, upload_id):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ""):
+            raise ChunkedUploadError("Unknown upload", status=404)
+        meta_path = os.path.join(_upload_dir(), upload_id + ".json")
+        if _is_stale(meta_path):
+            _delete_upload(upload_id)
+            raise ChunkedUploadError("Upload expired", status=404)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise ChunkedUploadError("Unknown upload", status=404)
+        return cls(upload_id, meta["filename"], meta["size"], meta.get("offset", 0))
+
+    def _save(self):
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"filename": self.filename, "size": self.size, "offset": self.offset}, f)
+        os.replace(temp_path, self.meta_path)
+
+    def status(self):
+        offset = self.offset
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": offset,
+            "complete": offset == self.size,
+            "chunk_size": get_chunk_size(),
+        }
+
+    def append(self, stream, offset, length, checksum):
+        """
+        Append ``length`` bytes read from ``stream`` that belong at ``offset``.
+        The chunk is streamed to disk while hashing and truncated away again
+        if its SHA-256 does not match ``checksum``. Returns the new offset.
+        """
+        if length is None or length <= 0:
+            raise ChunkedUploadError("Empty chunk")
+        if length > get_chunk_size():
+            raise ChunkedUploadError(f"Chunk larger than {get_chunk_size()} bytes", status=413)
+        if not checksum:
+            raise ChunkedUploadError("Missing chunk checksum")
+
+        with _lock_for(self.upload_id):
+            # Another request may have advanced the upload since this one loaded it
+            current = ChunkedUpload.load(self.upload_id).offset
+            if offset != current:
+                # Duplicate or out-of-order chunk: tell the client where to resume
+                raise ChunkedUploadError("Chunk does not start at the current offset", status=409, offset=current)
+            if offset + length > self.size:
+                raise ChunkedUploadError("Chunk runs past the declared upload size", offset=current)
+
+            digest = hashlib.sha256()
+            received = 0
+            with open(self.part_path, "r+b") as f:
+                # Drop anything past the verified offset, e.g. a chunk cut off by a crash
+                f.truncate(current)
+                f.seek(current)
+                while received < length:
+                    block = stream.read(min(READ_BLOCK_SIZE, length - received))
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+                    received += len(block)
+                if received != length or digest.hexdigest() != checksum.lower():
+                    f.truncate(current)
+                    if received != length:
+                        raise ChunkedUploadError("Chunk ended early", offset=current)
+                    raise ChunkedUploadError("Chunk checksum mismatch", status=422, offset=current)
+                f.flush()
+                os.fsync(f.fileno())
+            self.offset = current + length
+            self._save()
+            return self.offset
+
+    def complete(self):
+        """
+        Move the finished archive into media/photo_folder and return its
+        (storage name, path). The part file is renamed, not copied.
+        """
+        with _lock_for(self.upload_id):
+            offset = ChunkedUpload.load(self.upload_id).offset
+            if offset != self.size:
+                raise ChunkedUploadError("Upload is incomplete", status=409, offset=offset)
+            name = default_storage.get_available_name(os.path.join("photo_folder", self.filename))
+            archive_path = default_storage.path(name)
+            os.replace(self.part_path, archive_path)
+            os.remove(self.meta_path)
+        with _locks_lock:
+            _locks.pop(self.upload_id, None)
+        return name, archive_path
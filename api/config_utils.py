@@ -39,3 +39,8 @@ def warm_config_cache():
 
 def clear_config_cache():
     get_cached_config.cache_clear()
+
+
+def config_changed(sender, **kwargs):
+    """post_save / post_delete receiver: edits made anywhere, e.g. the admin, apply to the next read"""
+    clear_config_cache()
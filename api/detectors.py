@@ -0,0 +1,54 @@
+"""
+Face and eye detectors, loaded once and reused instead of once per image.
+
+Building a detector (dlib's HOG face detector, an OpenCV Haar cascade read
+from its XML file) costs more than running it on a working-resolution
+image. Neither is safe to use from two threads at once, so each kind is
+kept in a small pool: a check borrows one for the call and returns it.
+The pool only grows to the number of threads detecting at the same time,
+and request threads that come and go (the development server starts one
+per request) still find a loaded detector waiting.
+"""
+import threading
+from contextlib import contextmanager
+
+import cv2
+import dlib
+
+EYE_CASCADE_FILE = "haarcascade_eye.xml"
+FACE_CASCADE_FILE = "haarcascade_frontalface_default.xml"
+
+
+class DetectorPool:
+    """Idle instances of one detector, created on demand"""
+    def __init__(self, load):
+        self._load = load
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def borrow(self):
+        with self._lock:
+            detector = self._idle.pop() if self._idle else None
+        if detector is None:
+            detector = self._load()
+        try:
+            yield detector
+        finally:
+            with self._lock:
+                self._idle.append(detector)
+
+    def warm(self):
+        with self.borrow():
+            pass
+
+
+FACE_DETECTORS = DetectorPool(dlib.get_frontal_face_detector)
+EYE_CASCADES = DetectorPool(lambda: cv2.CascadeClassifier(cv2.data.haarcascades + EYE_CASCADE_FILE))
+FACE_CASCADES = DetectorPool(lambda: cv2.CascadeClassifier(cv2.data.haarcascades + FACE_CASCADE_FILE))
+
+
+def warm_detectors():
+    """Load one of each detector now rather than on the first image; see ApiConfig.ready"""
+    for pool in (FACE_DETECTORS, EYE_CASCADES, FACE_CASCADES):
+        pool.warm()
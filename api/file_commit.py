@@ -0,0 +1,131 @@
+"""
+Atomic, lock-free commits of images into their output folders.
+
+A file is never visible in a destination half-written and an existing file
+is never overwritten, without any lock shared between threads:
+
+* moves - a batch's input and output folders share its workspace (see
+  workspace), so the file is hard-linked to its destination and the source
+  unlinked: a rename that fails instead of overwriting (plain ``os.rename``
+  where the filesystem has no hard links). Only a source outside the
+  destination's filesystem, e.g. a folder handed to ``main_threaded``, is
+  copied instead, through a temporary file as below
+* writes (archive members) - the data goes to a temporary file in the
+  destination folder, which is then published the same way, so it is only
+  ever seen complete
+
+Every commit reports how it went: ``COMMIT_RENAME``, ``COMMIT_COPY`` or
+``COMMIT_EXISTS``; None means the source was missing or the commit failed.
+"""
+import errno
+import logging
+import os
+import shutil
+import tempfile
+
+COMMIT_RENAME = "rename"
+COMMIT_COPY = "copy"
+COMMIT_EXISTS = "exists"
+
+# Copy buffer used when writing file objects out
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# os.link errors that mean the filesystem cannot hard-link at all
+_NO_LINK_ERRNOS = {errno.EPERM, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS}
+
+
+def _temp_path(destination_dir, image_name):
+    """A new empty file next to the destination; hidden, and not an image name"""
+    fd, temp_path = tempfile.mkstemp(prefix=f".{image_name}.", suffix=".part", dir=destination_dir)
+    os.close(fd)
+    return temp_path
+
+
+def _publish(temp_path, destination_path):
+    """
+    Give the finished temp file its final name. Returns False, leaving the
+    temp file in place, if something already has that name.
+    """
+    try:
+        os.link(temp_path, destination_path)
+    except FileExistsError:
+        return False
+    except OSError as e:
+        if e.errno not in _NO_LINK_ERRNOS:
+            raise
+        if os.path.exists(destination_path):
+            return False
+        os.replace(temp_path, destination_path)
+        return True
+    os.unlink(temp_path)
+    return True
+
+
+def _copy_into(write, destination_dir, image_name):
+    """Fill a temp file in destination_dir with write(temp_path), then publish it"""
+    temp_path = _temp_path(destination_dir, image_name)
+    try:
+        write(temp_path)
+        published = _publish(temp_path, os.path.join(destination_dir, image_name))
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return COMMIT_COPY if published else COMMIT_EXISTS
+
+
+def move_file(source_path, destination_dir, image_name=None):
+    """Move source_path into destination_dir; returns the commit method or None"""
+    if image_name is None:
+        image_name = os.path.basename(source_path)
+    destination_path = os.path.join(destination_dir, image_name)
+    try:
+        try:
+            os.link(source_path, destination_path)
+            os.unlink(source_path)
+            method = COMMIT_RENAME
+        except FileExistsError:
+            method = COMMIT_EXISTS
+        except FileNotFoundError:
+            logging.debug(f"Source file {source_path} no longer exists")
+            return None
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                method = _copy_into(lambda temp_path: shutil.copy2(source_path, temp_path),
+                                    destination_dir, image_name)
+                if method == COMMIT_COPY:
+                    os.unlink(source_path)
+            elif e.errno in _NO_LINK_ERRNOS:
+                if os.path.exists(destination_path):
+                    method = COMMIT_EXISTS
+                else:
+                    os.rename(source_path, destination_path)
+                    method = COMMIT_RENAME
+            else:
+                raise
+    except Exception as e:
+        logging.error(f"Error moving {image_name}: {e}")
+        return None
+
+    if method == COMMIT_EXISTS:
+        logging.debug(f"File {image_name} already exists in destination, skipping move")
+    else:
+        logging.debug(f"Moved {image_name} to {destination_dir} ({method})")
+    return method
+
+
+def write_file(fileobj, destination_dir, image_name):
+    """Write a readable file object into destination_dir; returns the commit method or None"""
+    def write(temp_path):
+        with open(temp_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f, COPY_BUFFER_SIZE)
+
+    try:
+        method = _copy_into(write, destination_dir, image_name)
+    except Exception as e:
+        logging.error(f"Error writing {image_name}: {e}")
+        return None
+    if method == COMMIT_EXISTS:
+        logging.debug(f"File {image_name} already exists in destination, skipping")
+    else:
+        logging.debug(f"Wrote {image_name} to {destination_dir}")
+    return method
@@ -2,12 +2,13 @@ from PIL import Image
 from .config_utils import get_cached_config
 
 
-def check_image(path, config=None):
+def check_image(path, config=None, img=None):
     try:
         if not config:
             config = get_cached_config()
         
-        img = Image.open(path)
+        if img is None:
+            img = Image.open(path)
         format = img.format
         
         # Handle different format variations
@@ -4,8 +4,10 @@ from PIL import Image
 from .config_utils import get_cached_config
 
 
-def check_image(path, config=None):
-    size = os.path.getsize(path) / 1000.00#TO KILOBYTES
+def check_image(path, config=None, size=None):
+    if size is None:
+        size = os.path.getsize(path)
+    size = size / 1000.00#TO KILOBYTES
 
     tolerance = 10.00
 
@@ -28,9 +30,10 @@ def check_image(path, config=None):
         return True
     return False
 
-def check_height(path, config=None):
+def check_height(path, config=None, im=None):
     try:
-        im = Image.open(path)
+        if im is None:
+            im = Image.open(path)
         width, height = im.size
 
         tolerance = 10.00
@@ -48,9 +51,10 @@ def check_height(path, config=None):
         logging.debug(f"Error in check_height: {e}")
         return False
 
-def check_width(path, config=None):
+def check_width(path, config=None, im=None):
     try:
-        im = Image.open(path)
+        if im is None:
+            im = Image.open(path)
         width, height = im.size
 
         tolerance = 10.00
@@ -3,7 +3,7 @@ import numpy as np
 import logging
 from .config_utils import get_cached_config
 
-def is_grey(img, config=None):
+def is_grey(img, config=None, saturation=None):
     try:
         # Load config or use defaults
         if config is None:
@@ -16,8 +16,9 @@ def is_grey(img, config=None):
         grey_percentage_cutoff = 90  # fixed, not user-configurable
 
         # Convert image to HSV and extract saturation channel
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        saturation = hsv[:, :, 1]
+        if saturation is None:
+            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+            saturation = hsv[:, :, 1]
 
         # Count pixels considered "grey"
         grey_pixels = np.sum(saturation <= saturation_threshold)
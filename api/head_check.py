@@ -1,6 +1,5 @@
-import dlib
 import cv2
-# from .detectors import FACE_DETECTOR, EYE_CASCADE
+from .detectors import EYE_CASCADES, FACE_DETECTORS
 
 # def detect_faces(image):
 #     import cv2
@@ -13,9 +12,9 @@ import cv2
 #     eyes = EYE_CASCADE.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
 #     return eyes
 
-def valid_head_check(image):
-    import cv2
-    faces = detect_faces(image)
+def valid_head_check(image, faces=None):
+    if faces is None:
+        faces = detect_faces(image)
     num_faces = len(faces)
     
     # Initialize head percentage
@@ -24,8 +23,6 @@ def valid_head_check(image):
     # Calculate head percentage only if exactly one face is detected
     if num_faces == 1:
         rect = faces[0]  # Get the first (and only) face
-        x, y, w, h = rect.left(), rect.top(), rect.width(), rect.height()
-        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
         proper_head_percentage = calculate_head_percentage(rect, image)
         
         # Check if head percentage is within acceptable range
@@ -45,25 +42,23 @@ def calculate_head_percentage(face, image):
     head_percentage = (face_area / image_area) * 100
     return head_percentage
 
-def detect_eyes(image):
-    # Load the pre-trained eye cascade classifier from OpenCV
-    eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-    
+def detect_eyes(image, gray=None):
     # Convert the image to grayscale for eye detection
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Detect eyes using the eye cascade classifier
-    eyes = eye_cascade.detectMultiScale(gray_image, scaleFactor=1.1, minNeighbors=5)
+    # Detect eyes using a pooled pre-trained eye cascade classifier from OpenCV
+    with EYE_CASCADES.borrow() as eye_cascade:
+        eyes = eye_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
     #print("no of eyes", len(eyes))
     return len(eyes) == 0
 
-def detect_faces(image):
-    # Load the pre-trained face detection model from dlib
-    face_detector = dlib.get_frontal_face_detector()
-    
+def detect_faces(image, gray=None):
     # Convert the image to grayscale for face detection
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Detect faces in the grayscale image
-    faces = face_detector(gray_image)
+    # Detect faces in the grayscale image with a pooled pre-trained dlib model
+    with FACE_DETECTORS.borrow() as face_detector:
+        faces = face_detector(gray)
     return faces
@@ -0,0 +1,180 @@
+"""
+HTTP caching for everything the app serves from a batch.
+
+Files (originals, thumbnails) go through ``serve_file``:
+
+* strong validators - ``ETag`` from inode, size and mtime, which identify
+  the bytes because files are only ever published whole (see file_commit)
+  and never rewritten in place; ``Last-Modified`` from the mtime
+* conditional requests - If-None-Match / If-Modified-Since answer 304,
+  If-Match / If-Unmodified-Since 412 (Django's get_conditional_response)
+* byte ranges - a single ``Range: bytes=...`` gets a 206, honouring
+  If-Range; unsatisfiable ranges get a 416; multiple ranges get the whole
+  file, as the spec allows
+* ``Cache-Control`` - ``immutable`` for a year when the URL names the batch
+  (``?batch=<batch_id>``: a name in a batch always has the same bytes),
+  otherwise ``no-cache`` so the browser revalidates cheaply
+
+With ``PHOTO_VALIDATOR_SENDFILE`` set, the body is left to a front proxy:
+``"x-sendfile"`` (Apache mod_xsendfile, lighttpd) sends the file path,
+``"x-accel-redirect"`` (nginx) the path below SENDFILE_ROOT mapped onto the
+internal SENDFILE_URL location. The proxy then handles the ranges.
+
+Generated downloads (CSV, ZIP) use ``conditional_response`` with an ETag
+derived from the batch's state.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+SENDFILE_X_SENDFILE = "x-sendfile"
+SENDFILE_X_ACCEL = "x-accel-redirect"
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+BATCH_QUERY_PARAMETER = "batch"
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_sendfile_settings():
+    """(mode or None, root directory, internal URL prefix) from settings"""
+    return (
+        getattr(settings, "PHOTO_VALIDATOR_SENDFILE", None),
+        getattr(settings, "PHOTO_VALIDATOR_SENDFILE_ROOT", None) or settings.MEDIA_ROOT,
+        getattr(settings, "PHOTO_VALIDATOR_SENDFILE_URL", "/protected-media/"),
+    )
+
+
+def file_etag(stat):
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def batch_url(url, batch_id):
+    """url pinned to one batch, so its response can be cached as immutable"""
+    return f"{url}?{BATCH_QUERY_PARAMETER}={batch_id}"
+
+
+def is_batch_pinned(request, batch_id):
+    return batch_id is not None and request.GET.get(BATCH_QUERY_PARAMETER) == batch_id
+
+
+def _set_validators(response, etag, last_modified=None, immutable=False):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def conditional_response(request, etag, last_modified=None, immutable=False):
+    """The 304/412 answer to a conditional request, or None if the full response is needed"""
+    headers = _set_validators(HttpResponse(), etag, last_modified, immutable)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified, response=headers)
+    # Handed back unchanged when no precondition applies
+    return None if response is headers else response
+
+
+def with_validators(response, etag, last_modified=None, immutable=False):
+    """Add ETag, Last-Modified and Cache-Control to a generated response"""
+    return _set_validators(response, etag, last_modified, immutable)
+
+
+def _requested_range(request, etag, size):
+    """
+    (start, end) inclusive for a satisfiable single range, None to send the
+    whole file, or False when the range cannot be satisfied.
+    """
+    header = request.headers.get("Range")
+    if not header or request.method != "GET":
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range is not None and if_range.strip() != etag:
+        # The client's partial copy is stale; it needs all of it
+        return None
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match:
+        # Multiple or malformed ranges: the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(RANGE_CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _sendfile_response(path, content_type):
+    mode, root, url = get_sendfile_settings()
+    if mode == SENDFILE_X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+        return response
+    if mode == SENDFILE_X_ACCEL:
+        root = os.path.abspath(root)
+        path = os.path.abspath(path)
+        if os.path.commonpath([root, path]) != root:
+            # Outside the location the proxy knows about; serve it ourselves
+            return None
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = url.rstrip("/") + "/" + quote(os.path.relpath(path, root).replace(os.sep, "/"))
+        return response
+    return None
+
+
+def serve_file(request, path, content_type, filename=None, immutable=False):
+    """A file with validators, conditional and range support, or its X-Sendfile handoff"""
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    not_modified = conditional_response(request, etag, last_modified, immutable)
+    if not_modified is not None:
+        return not_modified
+
+    response = _sendfile_response(path, content_type)
+    if response is None:
+        byte_range = _requested_range(request, etag, stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+        if byte_range is None:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_iter_range(path, start, length), status=206,
+                                             content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = str(length)
+        response["Accept-Ranges"] = "bytes"
+    if filename is not None:
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
+    return _set_validators(response, etag, last_modified, immutable)
@@ -0,0 +1,91 @@
+"""
+Sharded on-disk storage for the images of a batch.
+
+A batch can hold hundreds of thousands of images, far too many for one flat
+directory. ``ShardedImageStore`` spreads them over ``SHARD_COUNT``
+subdirectories named by a hash prefix of the file name::
+
+    valid/3f/IMG_0042.jpg
+    valid/a0/IMG_0043.jpg
+
+so finding, opening or moving one image only ever touches its own shard.
+Image names stay unique within a store, exactly as in a flat folder.
+"""
+import hashlib
+import os
+
+from .batch_sources import is_image_name
+from .file_commit import move_file
+
+# Hex characters of the name's MD5 used as the shard: 2 -> 256 shards
+SHARD_PREFIX_LENGTH = 2
+SHARD_COUNT = 16 ** SHARD_PREFIX_LENGTH
+
+
+def shard_of(image_name):
+    return hashlib.md5(image_name.encode("utf-8")).hexdigest()[:SHARD_PREFIX_LENGTH]
+
+
+class ShardedImageStore:
+    """The images under one root (a workspace's valid/, invalid/ or quarantine/)"""
+    def __init__(self, root):
+        self.root = root
+
+    def shard_dir(self, image_name, create=False):
+        """The directory image_name lives in; ``create`` makes sure it exists"""
+        directory = os.path.join(self.root, shard_of(image_name))
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, image_name):
+        if not image_name or os.path.basename(image_name) != image_name:
+            raise ValueError(f"Invalid image name: {image_name!r}")
+        return os.path.join(self.shard_dir(image_name), image_name)
+
+    def exists(self, image_name):
+        try:
+            return os.path.isfile(self.path(image_name))
+        except ValueError:
+            return False
+
+    def _shards(self):
+        try:
+            with os.scandir(self.root) as entries:
+                return sorted(entry.path for entry in entries
+                              if entry.is_dir() and len(entry.name) == SHARD_PREFIX_LENGTH)
+        except FileNotFoundError:
+            return []
+
+    def iter_entries(self):
+        """(image name, path) of every image, shard by shard"""
+        for shard in self._shards():
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if entry.is_file() and is_image_name(entry.name) and not entry.name.startswith("."):
+                        yield entry.name, entry.path
+
+    def list_names(self):
+        return sorted(name for name, _ in self.iter_entries())
+
+    def count(self):
+        return sum(1 for _ in self.iter_entries())
+
+    def fingerprint(self):
+        """
+        Changes whenever an image is added or removed: a hash of the root's
+        and every shard's mtime, without listing a single image.
+        """
+        digest = hashlib.md5()
+        for directory in [self.root] + self._shards():
+            try:
+                digest.update(f"{directory}:{os.stat(directory).st_mtime_ns};".encode("utf-8"))
+            except FileNotFoundError:
+                pass
+        return digest.hexdigest()
+
+    def move_to(self, image_name, other):
+        """Move an image into another store; returns the file_commit method or None"""
+        if not self.exists(image_name):
+            return None
+        return move_file(self.path(image_name), other.shard_dir(image_name, create=True), image_name)
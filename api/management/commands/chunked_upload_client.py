@@ -0,0 +1,147 @@
+import hashlib
+import http.cookiejar
+import json
+import os
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _decode(content):
+    """A JSON reply; for NDJSON (validate/ sends progress lines first), its last line"""
+    lines = content.strip().splitlines()
+    try:
+        return json.loads(lines[-1] if lines else b"{}")
+    except ValueError:
+        return {"message": content[:200].decode("utf-8", "replace")}
+
+
+class InProcessTransport:
+    """Talks to the app through django.test.Client, no server needed"""
+    def __init__(self):
+        from django.test import Client
+        self.client = Client(HTTP_HOST="localhost")
+
+    def request(self, method, path, body=b"", headers=None, content_type="application/octet-stream"):
+        extra = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in (headers or {}).items()}
+        response = self.client.generic(method, path, body, content_type=content_type, **extra)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, _decode(content)
+
+    def csrf_headers(self):
+        # The test client skips CSRF checks
+        return {}
+
+
+class HttpTransport:
+    """Talks to a running server; session cookies are kept between requests"""
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def request(self, method, path, body=b"", headers=None, content_type="application/octet-stream"):
+        request = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                         headers={"Content-Type": content_type, **(headers or {})})
+        try:
+            with self.opener.open(request) as response:
+                return response.status, _decode(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, _decode(e.read())
+
+    def csrf_headers(self):
+        """Views that change the session need the CSRF cookie the start page sets"""
+        with self.opener.open(self.base_url + "/") as response:
+            response.read()
+        token = next((cookie.value for cookie in self.cookies if cookie.name == "csrftoken"), "")
+        return {"X-CSRFToken": token, "Referer": self.base_url + "/"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a ZIP through the resumable chunked upload API, deliberately "
+        "interrupting it part way (a corrupted chunk, then a client restart "
+        "that has to ask the server where to resume) to exercise recovery."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="ZIP file to upload")
+        parser.add_argument("--url", help="Base URL of a running server (default: in-process test client)")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Chunk size in bytes")
+        parser.add_argument("--interrupt-after", type=int, default=2,
+                            help="Chunks to send before the simulated connection drop")
+        parser.add_argument("--validate", action="store_true", help="Run validation once the upload completes")
+
+    def handle(self, *args, **options):
+        archive = options["archive"]
+        if not os.path.isfile(archive):
+            raise CommandError(f"{archive} does not exist")
+        transport = HttpTransport(options["url"]) if options["url"] else InProcessTransport()
+        size = os.path.getsize(archive)
+
+        status, upload = transport.request(
+            "POST", "/upload/chunked/", json.dumps({"filename": os.path.basename(archive), "size": size}).encode(),
+            content_type="application/json",
+        )
+        if status != 201:
+            raise CommandError(f"Could not start upload: {upload}")
+        upload_id = upload["upload_id"]
+        chunk_size = options["chunk_size"] or upload["chunk_size"]
+        chunk_url = f"/upload/chunked/{upload_id}/"
+        self.stdout.write(f"Started upload {upload_id}: {size} bytes in chunks of {chunk_size}")
+
+        with open(archive, "rb") as f:
+            def send(offset, corrupt=False):
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+                checksum = hashlib.sha256(chunk).hexdigest()
+                if corrupt:
+                    # Flip a byte in transit: the server must refuse the chunk
+                    chunk = bytes([chunk[0] ^ 0xFF]) + chunk[1:]
+                return transport.request("PUT", chunk_url, chunk,
+                                         {"Upload-Offset": str(offset), "X-Chunk-SHA256": checksum})
+
+            offset = 0
+            for _ in range(options["interrupt_after"]):
+                if offset >= size:
+                    break
+                status, reply = send(offset)
+                if status != 200:
+                    raise CommandError(f"Chunk at {offset} rejected: {reply}")
+                offset = reply["offset"]
+                self.stdout.write(f"  sent chunk, server offset {offset}")
+
+            if offset < size:
+                status, reply = send(offset, corrupt=True)
+                self.stdout.write(f"  corrupted chunk at {offset}: HTTP {status} ({reply.get('message')})")
+                if status != 422 or reply.get("offset") != offset:
+                    raise CommandError("Server accepted a corrupted chunk")
+
+            # Simulated client restart: local progress is lost, ask the server
+            status, reply = transport.request("GET", chunk_url)
+            offset = reply["offset"]
+            self.stdout.write(f"Connection dropped; server says resume from offset {offset}")
+
+            if offset:
+                status, reply = send(offset - min(chunk_size, offset))
+                self.stdout.write(f"  re-sent an earlier chunk: HTTP {status}, resume offset {reply.get('offset')}")
+                if status != 409 or reply.get("offset") != offset:
+                    raise CommandError("Server accepted a chunk at the wrong offset")
+
+            while offset < size:
+                status, reply = send(offset)
+                if status != 200:
+                    raise CommandError(f"Chunk at {offset} rejected: {reply}")
+                offset = reply["offset"]
+            self.stdout.write(f"Resumed and sent the remaining chunks, server offset {offset}")
+
+        status, reply = transport.request("POST", chunk_url + "complete/", headers=transport.csrf_headers())
+        if status != 200:
+            raise CommandError(f"Could not complete upload: {reply}")
+        self.stdout.write(f"Upload complete: {reply['total_images']} images handed to validation")
+
+        if options["validate"]:
+            status, reply = transport.request("POST", "/validate/", headers=transport.csrf_headers())
+            self.stdout.write(f"Validation: {reply}")
+        self.stdout.write(self.style.SUCCESS("Interrupted upload resumed successfully"))
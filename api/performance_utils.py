@@ -1,7 +1,9 @@
+import os
 import cv2
 import numpy as np
 import time
 import logging
+from PIL import Image, ImageOps
 
 from .config_utils import get_cached_config
 
@@ -51,4 +53,48 @@ def optimize_image_loading(image_path, max_dimension=800):
         return None
     
     # Resize if too large
-    return resize_for_processing(image, max_dimension) 
+    return resize_for_processing(image, max_dimension)
+
+
+def load_thumbnail(image_path, max_dimension=256):
+    """
+    Decode a small BGR thumbnail without decoding the full image.
+    JPEGs use PIL's draft mode so libjpeg decodes at 1/2, 1/4 or 1/8 scale.
+    The EXIF orientation is applied, as ``cv2.imread`` does for the full
+    image, so thumbnail checks see the image the right way up.
+    ``image_path`` may also be a file object holding the encoded image.
+    Returns None if the image cannot be decoded.
+    """
+    try:
+        with Image.open(image_path) as img:
+            img.draft("RGB", (max_dimension, max_dimension))
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            img.thumbnail((max_dimension, max_dimension), Image.BILINEAR)
+            return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+    except Exception as e:
+        logging.debug(f"Could not decode thumbnail for {image_path}: {e}")
+        return None
+
+
+def estimate_image_cost(image_path, file_size=None):
+    """
+    Estimate the relative validation cost of an image from its file size and
+    header dimensions, without decoding it. Units are roughly megapixels:
+    decode and pixel checks scale with pixel count, entropy decoding with
+    compressed bytes. ``image_path`` may also be an open file, in which case
+    ``file_size`` must be given.
+    """
+    if file_size is None:
+        try:
+            file_size = os.path.getsize(image_path)
+        except OSError:
+            return 0.0
+    pixels = 0
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+            pixels = width * height
+    except Exception:
+        # Unreadable header: assume a typical JPEG compression ratio
+        pixels = file_size * 10
+    return pixels / 1e6 + file_size / 4e6
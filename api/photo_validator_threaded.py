@@ -1,24 +1,19 @@
 import logging
 import os
 import time
-import datetime
-import cv2
-import csv
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from multiprocessing import cpu_count
 import threading
-from shutil import move
+from functools import lru_cache
 from django.conf import settings
 from .config_utils import get_cached_config
-
-import api.background_check as background_check
-import api.blur_check as blur_check
-import api.file_format_check as file_format_check
-import api.file_size_check as file_size_check
-import api.grey_black_and_white_check as grey_black_and_white_check
-import api.head_check as head_check
-import api.symmetry_check as symmetry_check
+from .batch_sources import DirectorySource
+from .workspace import BatchWorkspace
+from .check_registry import Reason
+from .validation_engine import build_cascade, build_plan, validate_image, format_batch_messages
+from .process_engine import iter_process_engine
+from .thumbnails import pregeneration_cache
 
 progress_logger = logging.getLogger("validation_progress")
 if not progress_logger.handlers:
@@ -28,58 +23,169 @@ if not progress_logger.handlers:
 progress_logger.setLevel(logging.INFO)
 progress_logger.propagate = False
 
-# Thread-safe locks for file operations
-file_move_lock = threading.Lock()
-csv_write_lock = threading.Lock()
-progress_lock = threading.Lock()
+# Results are written to the batch's results store this many at a time, or
+# after this many seconds, so the report's aggregates keep up with a slow batch
+RESULTS_FLUSH_SIZE = 500
+RESULTS_FLUSH_INTERVAL = 2.0
+
+# Threads stuck on abandoned images, in pool sizes, before a batch is failed
+# rather than given yet another thread pool
+MAX_ABANDONED_POOLS = 4
 
 class ValidationResult:
     """Container for validation results"""
-    def __init__(self, image_name, is_valid, messages, processing_time):
+    def __init__(self, image_name, is_valid, messages, processing_time, report=None, reasons=None):
         self.image_name = image_name
         self.is_valid = is_valid
         self.messages = messages
         self.processing_time = processing_time
+        self.report = report
+        self.estimated_cost = None
+        self.timed_out = bool(report is not None and report.timed_out)
+        self._reasons = reasons
+
+    @property
+    def reasons(self):
+        """(check name, Reason) per failure"""
+        if self.report is not None:
+            return self.report.reasons
+        return self._reasons or []
+
+def failed_result(image_name, check_name, reason, processing_time):
+    """Result for an image that failed without a report, e.g. a crash"""
+    return ValidationResult(image_name, False, [reason.render()], processing_time,
+                            reasons=[(check_name, reason)])
+
+def timed_out_result(image_path, elapsed, time_budget):
+    """Result for an image the watchdog gave up on"""
+    result = failed_result(
+        os.path.basename(image_path), "timeout",
+        Reason("timeout.watchdog", elapsed=elapsed, budget=time_budget), elapsed,
+    )
+    result.timed_out = True
+    return result
 
 class ProgressTracker:
-    """Thread-safe progress tracker"""
+    """
+    Progress of one batch, for the log and the live progress stream.
+
+    Only the thread collecting results calls ``increment``, so the counters
+    are plain integers and need no lock; readers take a ``snapshot`` and
+    never hold up the batch. Rate and ETA are worked out when read, not on
+    every image.
+    """
     def __init__(self, total_items):
         self.total_items = total_items
         self.completed_items = 0
         self.failed_items = 0
+        self.quarantined_items = 0
+        # check name -> images that failed it
+        self.check_failures = {}
         self.start_time = time.time()
         self.last_update = 0
-        
-    def increment(self, success=True):
-        with progress_lock:
-            if success:
-                self.completed_items += 1
-            else:
-                self.failed_items += 1
-            
-            # Log progress every 10 items or every 2 seconds
-            total_processed = self.completed_items + self.failed_items
-            current_time = time.time()
-            
-            if (total_processed % 10 == 0 or current_time - self.last_update >= 2.0 or 
+        self.finished = False
+        self.error = None
+
+    def increment(self, success=True, result=None):
+        if success:
+            self.completed_items += 1
+        else:
+            self.failed_items += 1
+            if result is not None:
+                if result.timed_out:
+                    self.quarantined_items += 1
+                for check_name in {check_name for check_name, _ in result.reasons}:
+                    self.check_failures[check_name] = self.check_failures.get(check_name, 0) + 1
+
+        # Log progress every 10 items or every 2 seconds
+        total_processed = self.completed_items + self.failed_items
+        current_time = time.time()
+        if (total_processed % 10 == 0 or current_time - self.last_update >= 2.0 or
                 total_processed >= self.total_items):
-                
-                elapsed_time = current_time - self.start_time
-                rate = total_processed / elapsed_time if elapsed_time > 0 else 0
-                eta = (self.total_items - total_processed) / rate if rate > 0 else 0
-                percentage = (total_processed / self.total_items) * 100 if self.total_items > 0 else 0
-                
-                progress_logger.info(
-                    f"PROGRESS {total_processed}/{self.total_items} "
-                    f"({percentage:.1f}%) - "
-                    f"Rate: {rate:.1f} images/sec - "
-                    f"ETA: {eta:.0f}s - "
-                    f"Valid: {self.completed_items}, Invalid: {self.failed_items}"
-                )
-                self.last_update = current_time
+            snapshot = self.snapshot()
+            progress_logger.info(
+                f"PROGRESS {snapshot['processed']}/{snapshot['total']} "
+                f"({snapshot['percentage']:.1f}%) - "
+                f"Rate: {snapshot['rate']:.1f} images/sec - "
+                f"ETA: {snapshot['eta']:.0f}s - "
+                f"Valid: {snapshot['valid']}, Invalid: {snapshot['invalid']}"
+            )
+            self.last_update = current_time
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished = True
+
+    def snapshot(self):
+        """The current progress as a dict; safe to call from any thread"""
+        valid = self.completed_items
+        invalid = self.failed_items
+        total = self.total_items
+        processed = valid + invalid
+        elapsed_time = time.time() - self.start_time
+        rate = processed / elapsed_time if elapsed_time > 0 else 0
+        eta = max(total - processed, 0) / rate if rate > 0 else 0
+        return {
+            "status": "error" if self.error else "done" if self.finished else "running",
+            "processed": processed,
+            "total": total,
+            "percentage": (processed / total) * 100 if total > 0 else 0,
+            "valid": valid,
+            "invalid": invalid,
+            "quarantined": self.quarantined_items,
+            "rate": rate,
+            "eta": eta,
+            "elapsed": elapsed_time,
+            # A dict copy happens under the GIL, in one piece
+            "check_failures": dict(self.check_failures),
+            "error": self.error,
+        }
+
+
+# Trackers of recent batches by batch id, for progress readers
+PROGRESS_HISTORY = 64
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def register_progress(batch_id, tracker):
+    with _trackers_lock:
+        _trackers.pop(batch_id, None)
+        _trackers[batch_id] = tracker
+        while len(_trackers) > PROGRESS_HISTORY:
+            del _trackers[next(iter(_trackers))]
+
+
+def get_progress(batch_id):
+    """The batch's ProgressTracker, or None before its validation has started"""
+    with _trackers_lock:
+        return _trackers.get(batch_id)
+
+
+def finish_progress(batch_id, error=None):
+    """Mark a batch's progress finished, also when validation ended before tracking it"""
+    tracker = get_progress(batch_id)
+    if tracker is None:
+        tracker = ProgressTracker(0)
+        register_progress(batch_id, tracker)
+    if not tracker.finished:
+        tracker.finish(error)
+
 
+def archive_reject_results(source):
+    """ValidationResults of the images a source's archive pre-screen rejected, never extracted"""
+    return [
+        ValidationResult(report.image_name, False, format_batch_messages(report), 0.0, report)
+        for _, report in getattr(source, "rejected", ())
+    ]
+
+
+@lru_cache(maxsize=None)
 def get_optimal_thread_count():
-    """Get optimal thread count optimized for Lenovo Legion 5 Pro with i7-13620H"""
+    """
+    Get optimal thread count optimized for Lenovo Legion 5 Pro with i7-13620H
+    Worked out (and logged) once per process; the core count does not change
+    """
     cpu_cores = cpu_count()
     
     
@@ -93,286 +199,162 @@ def get_optimal_thread_count():
     progress_logger.info(f"PROGRESS Using {optimal_threads} threads for parallel processing (detected {cpu_cores} CPU cores)")
     return optimal_threads
 
-def validate_single_image_threaded(image_path, config):
+def validate_single_image_threaded(image_path, config, plan=None, cascade=None, time_budget=None, data=None,
+                                   pregenerate=True):
     """
     Validate a single image in a thread-safe manner
+    ``data`` is the encoded image when it does not come from image_path
     Returns ValidationResult object
     """
     start_time = time.time()
     image_name = os.path.basename(image_path)
-    messages = []
-    
+    deadline = time.monotonic() + time_budget if time_budget else None
+    # Gallery thumbnails are written while the pixels are still decoded
+    thumbnails = pregeneration_cache() if pregenerate else None
+
     try:
         logging.debug(f"Processing image: {image_name}")
+        if cascade is not None:
+            report = cascade.validate(image_path, config, deadline, data, thumbnails)
+        else:
+            report = validate_image(image_path, config, plan, deadline, data, thumbnails)
+        
+        logging.debug(f"Completed {image_name} in {report.processing_time:.2f}s - {'VALID' if report.is_valid else 'INVALID'}")
+        return ValidationResult(image_name, report.is_valid, format_batch_messages(report),
+                                report.processing_time, report)
 
-        # Check image file format
-        if not getattr(config, 'bypass_format_check', False):
-            try:
-                is_file_format_valid = file_format_check.check_image(image_path,config)
-                if not is_file_format_valid:
-                    messages.append("File format check failed")
-            except Exception as e:
-                logging.error(f"Error in file format check for {image_name}: {e}")
-                messages.append(f"File format check error: {str(e)}")
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logging.error(f"Unexpected error processing {image_name}: {e}")
+        return failed_result(image_name, "error", Reason("error.unexpected", error=str(e)), processing_time)
 
-        # Check file size
-        if not getattr(config, 'bypass_size_check', False):
-            try:
-                is_file_size_valid = file_size_check.check_image(image_path,config)
-                if not is_file_size_valid:
-                    # Get detailed size info for enhanced message
-                    try:
-                        file_size_bytes = os.path.getsize(image_path)
-                        file_size_kb = file_size_bytes / 1024
-                        min_size = getattr(config, 'min_size', 10)
-                        max_size = getattr(config, 'max_size', 5000)
-                        messages.append(f"File size check failed ({file_size_kb:.1f}KB, required: {min_size}-{max_size}KB)")
-                    except:
-                        messages.append("File size check failed")
-            except Exception as e:
-                logging.error(f"Error in file size check for {image_name}: {e}")
-                messages.append(f"File size check error: {str(e)}")
 
-        # Check height
-        if not getattr(config, 'bypass_height_check', False):
-            try:
-                is_file_height_valid = file_size_check.check_height(image_path,config)
-                if not is_file_height_valid:
-                    # Get detailed height info for enhanced message
-                    try:
-                        img_temp = cv2.imread(image_path)
-                        if img_temp is not None:
-                            height = img_temp.shape[0]
-                            min_height = getattr(config, 'min_height', 100)
-                            max_height = getattr(config, 'max_height', 2000)
-                            messages.append(f"Height check failed ({height}px, required: {min_height}-{max_height}px)")
-                        else:
-                            messages.append("File height check failed")
-                    except:
-                        messages.append("File height check failed")
-            except Exception as e:
-                logging.error(f"Error in file height check for {image_name}: {e}")
-                messages.append(f"File height check error: {str(e)}")
+def schedule_largest_first(image_paths, source=None):
+    """
+    Order images by estimated cost, biggest first (LPT scheduling), so the
+    expensive originals start early instead of trailing at the end of the batch.
+    Returns (ordered_paths, {path: estimated_cost}).
+    """
+    if source is None:
+        source = DirectorySource(None)
+    estimated_costs = {image_path: source.estimate_cost(image_path) for image_path in image_paths}
+    ordered_paths = sorted(image_paths, key=lambda image_path: estimated_costs[image_path], reverse=True)
+    return ordered_paths, estimated_costs
 
-        # Check width
-        if not getattr(config, 'bypass_width_check', False):
-            try:
-                is_file_width_valid = file_size_check.check_width(image_path,config)
-                if not is_file_width_valid:
-                    # Get detailed width info for enhanced message
-                    try:
-                        img_temp = cv2.imread(image_path)
-                        if img_temp is not None:
-                            width = img_temp.shape[1]
-                            min_width = getattr(config, 'min_width', 100)
-                            max_width = getattr(config, 'max_width', 2000)
-                            messages.append(f"Width check failed ({width}px, required: {min_width}-{max_width}px)")
-                        else:
-                            messages.append("File width check failed")
-                    except:
-                        messages.append("File width check failed")
-            except Exception as e:
-                logging.error(f"Error in file width check for {image_name}: {e}")
-                messages.append(f"File width check error: {str(e)}")
-
-        # Load the image with proper validation
-        try:
-            img = cv2.imread(image_path)
-            if img is None:
-                messages.append("Could not load image")
-                logging.error(f"Failed to load image: {image_path}")
-                processing_time = time.time() - start_time
-                return ValidationResult(image_name, False, messages, processing_time)
-            
-            # Validate image format and convert if necessary
-            if len(img.shape) != 3 or img.shape[2] != 3:
-                # Try to convert to BGR format if it's not already
-                if len(img.shape) == 2:
-                    # Grayscale to BGR
-                    img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-                elif len(img.shape) == 3 and img.shape[2] == 4:
-                    # RGBA to BGR
-                    img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-                else:
-                    messages.append("Unsupported image format")
-                    logging.error(f"Unsupported image format for {image_path}: shape {img.shape}")
-                    processing_time = time.time() - start_time
-                    return ValidationResult(image_name, False, messages, processing_time)
-            
-            # Ensure the image is 8-bit
-            if img.dtype != 'uint8':
-                img = img.astype('uint8')
-                
-        except Exception as e:
-            messages.append(f"Error loading image: {str(e)}")
-            logging.error(f"Exception loading image {image_path}: {e}")
-            processing_time = time.time() - start_time
-            return ValidationResult(image_name, False, messages, processing_time)
-
-        # Check if corrupted image
-        if not getattr(config, 'bypass_corrupted_check', False):
-            try:
-                if file_format_check.is_corrupted_image(img):
-                    messages.append("Corrupted Image")
-            except Exception as e:
-                logging.error(f"Error in corrupted image check for {image_name}: {e}")
-                messages.append(f"Corruption check error: {str(e)}")
+def summarize_schedule(results, makespan, max_workers):
+    """Compare estimated and actual per-image cost and the batch makespan to its lower bound"""
+    total_cpu_time = sum(result.processing_time for result in results)
+    ideal_makespan = total_cpu_time / max_workers if max_workers else total_cpu_time
+    estimated = np.array([result.estimated_cost or 0.0 for result in results])
+    actual = np.array([result.processing_time for result in results])
+    if len(results) > 1 and estimated.std() > 0 and actual.std() > 0:
+        cost_correlation = float(np.corrcoef(estimated, actual)[0, 1])
+    else:
+        cost_correlation = None
+    return {
+        'order': 'largest_first',
+        'total_cpu_time': total_cpu_time,
+        'ideal_makespan': ideal_makespan,
+        'makespan': makespan,
+        'efficiency': ideal_makespan / makespan if makespan > 0 else 1.0,
+        'cost_correlation': cost_correlation,
+        'image_costs': [
+            {'image': result.image_name, 'estimated': result.estimated_cost, 'actual': result.processing_time}
+            for result in results
+        ],
+    }
 
-        # Check for grey image
-        if not getattr(config, 'bypass_greyness_check', False):
-            try:
-                if grey_black_and_white_check.is_grey(img, config):
-                    messages.append("Greyscale check failed (image should be in color)")
-            except Exception as e:
-                logging.error(f"Error in greyness check for {image_name}: {e}")
-                messages.append(f"Greyness check error: {str(e)}")
+def iter_thread_engine(image_paths, config, plan, cascade, max_workers, time_budget=None, source=None,
+                       pregenerate=True):
+    """
+    Validate images on a thread pool and yield ValidationResults as they finish.
+    Images are submitted in the given order with at most max_workers in flight,
+    and each worker reads its own image from source.
+    With a time_budget, workers stop cooperatively between checks once over
+    budget, and an image stuck inside a single check is abandoned by the
+    watchdog (its thread finishes in the background) so the batch moves on.
+    An image's budget runs from when a worker picks it up, never while it
+    waits. Abandoned threads keep their pool slot until they return, so once
+    they have taken all the spare slots the pool is replaced by a fresh one;
+    past MAX_ABANDONED_POOLS pools' worth of stuck threads the batch fails.
+    ``pregenerate=False`` leaves the gallery thumbnail cache alone.
+    """
+    # Spare threads take over the slots of abandoned images
+    pool_size = max_workers * 2 if time_budget else max_workers
+    executors = [ThreadPoolExecutor(max_workers=pool_size)]
+    # Abandoned futures still running, in all pools and in the current one
+    stuck = set()
+    stuck_in_pool = set()
+    started_at = {}
 
-        # Check image for blurness
-        if not getattr(config, 'bypass_blurness_check', False):
-            try:
-                is_blur, blur_details = blur_check.check_image_blurness(img, config)
-                if is_blur:
-                    # Use the actual blur values from the check
-                    blur_value = blur_details['blur_value']
-                    blur_threshold = blur_details['blur_threshold']
-                    pixelated_value = blur_details['pixelated_value']
-                    pixelated_threshold = blur_details['pixelated_threshold']
-                    
-                    # Convert blur value to percentage (higher laplacian variance = sharper image)
-                    sharpness_percentage = min(100, (blur_value / 500) * 100)
-                    min_sharpness_percent = (blur_threshold / 500) * 100
-                    
-                    # Create detailed message based on which check failed
-                    if blur_details['is_blur']:
-                        messages.append(f"Blurness check failed ({sharpness_percentage:.1f}% sharpness, min required: {min_sharpness_percent:.1f}%)")
-                    if blur_details['is_pixelated']:
-                        messages.append(f"Pixelation check failed ({pixelated_value} lines detected, max allowed: {pixelated_threshold})")
-            except Exception as e:
-                logging.error(f"Error in blurness check for {image_name}: {e}")
-                messages.append(f"Blurness check error: {str(e)}")
+    def run(image_path):
+        started_at[image_path] = time.monotonic()
+        data = source.read(image_path) if source is not None else None
+        return validate_single_image_threaded(image_path, config, plan, cascade, time_budget, data, pregenerate)
 
-        # Check the background of image
-        if not getattr(config, 'bypass_background_check', False):
-            try:
-                if not background_check.background_check(img, config):
-                    # Simplified background check failure message
-                    messages.append("Background check failed")
-            except Exception as e:
-                logging.error(f"Error in background check for {image_name}: {e}")
-                messages.append(f"Background check error: {str(e)}")
+    queue = iter(image_paths)
+    in_flight = {}
 
-        # Check image for head position and coverage
-        if not getattr(config, 'bypass_head_check', False):
-            try:
-                # Additional validation for head check
-                if img is not None and len(img.shape) == 3 and img.shape[2] == 3:
-                    # Make a copy to avoid modifying the original
-                    img_copy = img.copy()
-                    is_head_valid, head_percent = head_check.valid_head_check(img_copy)
-                    if not is_head_valid:
-                        if head_percent < 10:
-                            messages.append(f"Head check failed ({head_percent:.1f}% head coverage, min required: 10%)")
-                        elif 100 > head_percent > 80:
-                            messages.append(f"Head check failed ({head_percent:.1f}% head coverage, max allowed: 80%)")
-                        elif head_percent == 101:
-                            messages.append("Head check failed (no face detected)")
-                        elif head_percent == 102:
-                            messages.append("Head check failed (multiple faces detected)")
-                        else:
-                            messages.append(f"Head check failed ({head_percent:.1f}% head coverage, required: 10-80%)")
-                else:
-                    messages.append("Invalid image format for head check")
-            except Exception as e:
-                logging.error(f"Error in head check for {image_name}: {e}")
-                # Don't add this as a validation failure, just skip the check
-                logging.debug(f"Skipping head check for {image_name} due to format issues")
+    def submit_next():
+        for image_path in queue:
+            in_flight[executors[-1].submit(run, image_path)] = image_path
+            return
 
-        # Check eyes
-        if not getattr(config, 'bypass_eye_check', False):
-            try:
-                # Additional validation for eye check
-                if img is not None and len(img.shape) == 3 and img.shape[2] == 3:
-                    # Make a copy to avoid modifying the original
-                    img_copy = img.copy()
-                    if head_check.detect_eyes(img_copy):
-                        messages.append("Eye check failed (eyes not visible or covered)")
-                else:
-                    messages.append("Invalid image format for eye check")
-            except Exception as e:
-                logging.error(f"Error in eye check for {image_name}: {e}")
-                # Don't add this as a validation failure, just skip the check
-                logging.debug(f"Skipping eye check for {image_name} due to format issues")
+    def abandon(future):
+        nonlocal stuck_in_pool
+        stuck.add(future)
+        stuck_in_pool.add(future)
+        future.add_done_callback(stuck.discard)
+        future.add_done_callback(stuck_in_pool.discard)
+        if len(stuck) >= pool_size * MAX_ABANDONED_POOLS:
+            raise RuntimeError(f"{len(stuck)} images are stuck past the {time_budget}s budget, giving up on the batch")
+        if len(stuck_in_pool) >= pool_size - max_workers:
+            # No spare slot left: new images would only queue behind stuck threads
+            logging.error(f"Watchdog: {len(stuck_in_pool)} abandoned threads fill the spare slots, starting a new pool")
+            executors.append(ThreadPoolExecutor(max_workers=pool_size))
+            stuck_in_pool = set()
 
-        # Check for symmetry
-        if not getattr(config, 'bypass_symmetry_check', False):
-            try:
-                is_symmetric, symmetry_percentage, threshold_percentage = symmetry_check.check_symmetry_with_head(img, config)
-                if not is_symmetric:
-                    messages.append(f"Symmetry check failed ({symmetry_percentage:.1f}% symmetric, min required: {threshold_percentage:.1f}%)")
-            except Exception as e:
-                logging.error(f"Error in symmetry check for {image_name}: {e}")
-                messages.append(f"Symmetry check error: {str(e)}")
+    for _ in range(max_workers):
+        submit_next()
 
-        processing_time = time.time() - start_time
-        is_valid = len(messages) == 0
-        
-        logging.debug(f"Completed {image_name} in {processing_time:.2f}s - {'VALID' if is_valid else 'INVALID'}")
-        return ValidationResult(image_name, is_valid, messages, processing_time)
+    try:
+        while in_flight:
+            done, _ = wait(in_flight, timeout=0.5 if time_budget else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                image_path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    image_name = os.path.basename(image_path)
+                    logging.error(f"Error processing {image_name}: {e}")
+                    result = failed_result(image_name, "error", Reason("error.unexpected", error=str(e)), 0)
+                yield image_path, result
+                submit_next()
 
-    except Exception as e:
-        processing_time = time.time() - start_time
-        logging.error(f"Unexpected error processing {image_name}: {e}")
-        return ValidationResult(image_name, False, [f"Unexpected error: {str(e)}"], processing_time)
-
-
-def move_image_thread_safe(image_path, destination_dir, image_name):
-    """Thread-safe image moving function"""
-    with file_move_lock:
-        try:
-            destination_path = os.path.join(destination_dir, image_name)
-            if os.path.exists(destination_path):
-                logging.debug(f"File {image_name} already exists in destination, skipping move")
-                return True
-            
-            if os.path.exists(image_path):
-                move(image_path, destination_dir)
-                logging.debug(f"Moved {image_name} to {destination_dir}")
-                return True
-            else:
-                logging.debug(f"Source file {image_path} no longer exists")
-                return False
-        except Exception as e:
-            logging.error(f"Error moving {image_name}: {e}")
-            return False
-
-def write_csv_results_thread_safe(csv_file_path, error_messages):
-    """Thread-safe CSV writing function"""
-    with csv_write_lock:
-        try:
-            csv_string = ""
-            if len(error_messages) > 0:
-                for name, messages in error_messages.items():
-                    csv_string += name
-                    for message in messages:
-                        csv_string += "," + message
-                    csv_string += "\n"
-            else:
-                csv_string = f"# Validation Summary: No invalid images found\n"
-                csv_string += f"# Validation completed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                csv_string += "# All images passed validation!\n"
-
-            with open(csv_file_path, "a", encoding='utf-8') as f:
-                f.write(csv_string)
-            
-            logging.debug("Successfully wrote validation results to CSV")
-            return True
-        except Exception as e:
-            logging.error(f"Error writing CSV results: {e}")
-            return False
-
-def main_threaded(directory, max_workers=None, config=None):
+            if time_budget:
+                now = time.monotonic()
+                for future, image_path in list(in_flight.items()):
+                    # Not started yet: the budget only runs once a worker has it
+                    started = started_at.get(image_path)
+                    if started is not None and now - started > time_budget:
+                        in_flight.pop(future)
+                        logging.error(f"Watchdog: {os.path.basename(image_path)} exceeded {time_budget}s, abandoning")
+                        abandon(future)
+                        yield image_path, timed_out_result(image_path, now - started, time_budget)
+                        submit_next()
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def main_threaded(directory, max_workers=None, config=None, engine=None, source=None, workspace=None):
     """
     Thread-based parallel validation function - stable and fast
+    ``engine`` is "thread" (default) or "process"; the process engine
+    enforces the per-image time budget with hard kills.
+    ``source`` supplies the images (default: the files in directory, see
+    batch_sources). Outputs go to the batch's ``workspace``; without one,
+    valid/, invalid/, quarantine/ and the results database are created in
+    directory.
     """
     # Ensure directory exists
     if not os.path.exists(directory):
@@ -385,32 +367,28 @@ def main_threaded(directory, max_workers=None, config=None):
     if config is None:
         config = get_cached_config()
     
-    # Setup directories
-    valid_directory = os.path.join(directory, "valid")
-    invalid_images_static_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    result_file_static_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-    )
+    # Setup directories; nothing is shared with other batches
+    if workspace is None:
+        workspace = BatchWorkspace(directory, input_dir=directory)
+    valid_store = workspace.valid_store
+    invalid_store = workspace.invalid_store
+    quarantine_store = workspace.quarantine_store
+    results_store = workspace.results
     
     # Ensure all required directories exist
-    os.makedirs(valid_directory, exist_ok=True)
-    os.makedirs(invalid_images_static_directory, exist_ok=True)
-    os.makedirs(os.path.dirname(result_file_static_directory), exist_ok=True)
-    
-    # Initialize empty CSV file
-    if not os.path.exists(result_file_static_directory):
-        with open(result_file_static_directory, "w", newline="", encoding='utf-8') as csv_file:
-            csv_writer = csv.writer(csv_file)
-            csv_writer.writerows([])
+    workspace.ensure_dirs()
     
     # Get list of image files
-    file_lists = sorted([f for f in os.listdir(directory) 
-                        if os.path.isfile(os.path.join(directory, f)) 
-                        and f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif'))])
+    if source is None:
+        source = DirectorySource(directory)
+    streaming = getattr(source, "streaming", False)
+    file_lists = [] if streaming else source.list_images()
+    # Archive members rejected from the central directory alone, never extracted;
+    # a streaming upload's rejects are only all known once it is over
+    archive_rejects = [] if streaming else archive_reject_results(source)
+    results_store.add_results(archive_rejects)
     
-    if not file_lists:
+    if not file_lists and not streaming and not archive_rejects:
         progress_logger.info("PROGRESS No image files found to process")
         return {
             'total_processed': 0,
@@ -420,100 +398,174 @@ def main_threaded(directory, max_workers=None, config=None):
             'avg_time_per_image': 0
         }
     
-    progress_logger.info(f"PROGRESS Found {len(file_lists)} image files to process")
+    if streaming:
+        progress_logger.info("PROGRESS Validating images as they are uploaded")
+    else:
+        progress_logger.info(f"PROGRESS Found {len(file_lists)} image files to process")
     
-    # Initialize progress tracking
-    progress_tracker = ProgressTracker(len(file_lists))
+    # Initialize progress tracking; archive rejects are already done
+    progress_tracker = ProgressTracker(len(file_lists) + len(archive_rejects))
+    if workspace.batch_id is not None:
+        register_progress(workspace.batch_id, progress_tracker)
+    for result in archive_rejects:
+        progress_tracker.increment(success=False, result=result)
     
     # Determine optimal thread count
     if max_workers is None:
         max_workers = get_optimal_thread_count()
     
-    progress_logger.info(f"PROGRESS Validation engine starting with {max_workers} threads")
+    if engine is None:
+        engine = getattr(settings, "PHOTO_VALIDATOR_ENGINE", "thread")
+    time_budget = getattr(settings, "PHOTO_VALIDATOR_IMAGE_TIMEOUT", None)
+
+    progress_logger.info(f"PROGRESS Validation engine starting with {max_workers} {engine} workers")
+
+    # Compile the enabled checks once for the whole batch
+    plan = build_plan(config)
+    cascade = build_cascade(plan)
+    logging.debug(f"Execution plan: {plan.describe()}")
     
-    # Process images with ThreadPoolExecutor
+    # Process images with ThreadPoolExecutor, biggest estimated cost first;
+    # a streaming upload can only be taken in arrival order
     results = []
-    image_paths = [os.path.join(directory, image) for image in file_lists]
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_image = {
-            executor.submit(validate_single_image_threaded, image_path, config): image_path 
-            for image_path in image_paths
-        }
-        
-        # Process completed tasks as they finish
-        for future in as_completed(future_to_image):
-            try:
-                result = future.result()
-                results.append(result)
-                progress_tracker.increment(success=result.is_valid)
-                
-            except Exception as e:
-                image_path = future_to_image[future]
-                image_name = os.path.basename(image_path)
-                logging.error(f"Error processing {image_name}: {e}")
-                results.append(ValidationResult(image_name, False, [f"Processing error: {str(e)}"], 0))
-                progress_tracker.increment(success=False)
-    
-    # Process results and move files
-    progress_logger.info("PROGRESS Processing validation results and organizing files")
+    if streaming:
+        image_paths, estimated_costs = source.iter_images(), {}
+    else:
+        image_paths, estimated_costs = schedule_largest_first(file_lists, source)
+    validation_start = time.time()
     
+    if engine == "process":
+        completed = iter_process_engine(image_paths, config, max_workers, time_budget, source)
+        # Pre-screen counters live in the worker processes
+        cascade = None
+    else:
+        completed = iter_thread_engine(image_paths, config, plan, cascade, max_workers, time_budget, source)
+
     error_messages = {}
+    pending_results = []
+    last_flush = time.time()
     valid_count = 0
     invalid_count = 0
-    
-    # Use ThreadPoolExecutor for file operations too
+    quarantined_count = 0
+
+    # Files are moved to their output folder as soon as each result is in,
+    # on a ThreadPoolExecutor of their own
     with ThreadPoolExecutor(max_workers=4) as file_executor:
         move_tasks = []
-        
-        for result in results:
-            original_path = os.path.join(directory, result.image_name)
-            
+
+        # Process completed tasks as they finish
+        for image_path, result in completed:
+            if image_path not in estimated_costs:
+                estimated_costs[image_path] = source.estimate_cost(image_path)
+            result.estimated_cost = estimated_costs[image_path]
+            logging.debug(f"{result.image_name}: estimated cost {result.estimated_cost:.2f}, actual {result.processing_time:.3f}s")
+            results.append(result)
+            # Bulk inserts; results become queryable while the batch runs
+            pending_results.append(result)
+            if (len(pending_results) >= RESULTS_FLUSH_SIZE
+                    or time.time() - last_flush >= RESULTS_FLUSH_INTERVAL):
+                results_store.add_results(pending_results)
+                pending_results = []
+                last_flush = time.time()
+            if streaming:
+                progress_tracker.total_items = source.received
+            progress_tracker.increment(success=result.is_valid, result=result)
+
             if result.is_valid:
                 valid_count += 1
                 # Move to valid directory
-                task = file_executor.submit(move_image_thread_safe, original_path, valid_directory, result.image_name)
+                task = file_executor.submit(
+                    source.commit, image_path, valid_store.shard_dir(result.image_name, create=True))
+                move_tasks.append(task)
+            elif result.timed_out:
+                invalid_count += 1
+                quarantined_count += 1
+                error_messages[result.image_name] = result.messages
+                # Pathological files go to quarantine, not the reviewable invalid gallery
+                task = file_executor.submit(
+                    source.commit, image_path, quarantine_store.shard_dir(result.image_name, create=True))
                 move_tasks.append(task)
             else:
                 invalid_count += 1
                 error_messages[result.image_name] = result.messages
                 # Move to invalid directory
-                task = file_executor.submit(move_image_thread_safe, original_path, invalid_images_static_directory, result.image_name)
+                task = file_executor.submit(
+                    source.commit, image_path, invalid_store.shard_dir(result.image_name, create=True))
                 move_tasks.append(task)
-        
-        # Wait for all move operations to complete
+
+        if streaming:
+            archive_rejects = archive_reject_results(source)
+            pending_results.extend(archive_rejects)
+            progress_tracker.total_items = source.received + len(archive_rejects)
+            for result in archive_rejects:
+                progress_tracker.increment(success=False, result=result)
+        results_store.add_results(pending_results)
+        schedule_summary = summarize_schedule(results, time.time() - validation_start, max_workers)
+        if streaming:
+            schedule_summary['order'] = 'arrival'
+
+        # Wait for all move operations to complete, counting renames vs copies
+        progress_logger.info("PROGRESS Organizing remaining files")
+        commit_counts = {}
         for task in as_completed(move_tasks):
             try:
-                task.result()
+                method = task.result() or "failed"
             except Exception as e:
                 logging.error(f"Error in file move operation: {e}")
+                method = "failed"
+            commit_counts[method] = commit_counts.get(method, 0) + 1
+    progress_tracker.finish()
     
-    # Write CSV results
-    write_csv_results_thread_safe(result_file_static_directory, error_messages)
+    for result in archive_rejects:
+        invalid_count += 1
+        error_messages[result.image_name] = result.messages
+    if archive_rejects:
+        progress_logger.info(f"PROGRESS Archive pre-screen rejected {len(archive_rejects)} images without extracting them")
+    total_images = len(results) + len(archive_rejects)
     
     # Calculate comprehensive statistics
     end_time = time.time()
     total_time = end_time - start_time
-    avg_time_per_image = total_time / len(file_lists) if file_lists else 0
-    images_per_second = len(file_lists) / total_time if total_time > 0 else 0
+    avg_time_per_image = total_time / total_images if total_images else 0
+    images_per_second = total_images / total_time if total_time > 0 else 0
     
     # Log completion summary
     logging.debug("" + "=" * 58 + "")
     progress_logger.info("PROGRESS Validation completed")
     logging.debug("" + "=" * 58 + "")
-    progress_logger.info(f"PROGRESS Total images processed: {len(file_lists)}")
+    progress_logger.info(f"PROGRESS Total images processed: {total_images}")
     progress_logger.info(f"PROGRESS Valid images: {valid_count}")
     progress_logger.info(f"PROGRESS Invalid images: {invalid_count}")
+    if quarantined_count:
+        progress_logger.info(f"PROGRESS Timed out and quarantined: {quarantined_count}")
     progress_logger.info(f"PROGRESS Total processing time: {total_time:.2f} seconds")
     progress_logger.info(f"PROGRESS Average time per image: {avg_time_per_image:.3f} seconds")
     progress_logger.info(f"PROGRESS Processing speed: {images_per_second:.2f} images/second")
     progress_logger.info(f"PROGRESS Threads utilized: {max_workers}")
+    progress_logger.info(
+        f"PROGRESS Files committed: {commit_counts.get('rename', 0)} renamed, "
+        f"{commit_counts.get('copy', 0)} copied, {commit_counts.get('exists', 0)} already present, "
+        f"{commit_counts.get('failed', 0)} failed"
+    )
     
     # Calculate estimated speedup
-    estimated_sequential_time = len(file_lists) * 2.0 # Conservative 2s per image estimate
+    estimated_sequential_time = total_images * 2.0 # Conservative 2s per image estimate
     speedup_factor = estimated_sequential_time / total_time if total_time > 0 else 1
     progress_logger.info(f"PROGRESS Estimated speedup: {speedup_factor:.1f}x faster than sequential")
+
+    progress_logger.info(
+        f"PROGRESS Makespan: {schedule_summary['makespan']:.2f}s "
+        f"(lower bound {schedule_summary['ideal_makespan']:.2f}s = CPU time / {max_workers} workers, "
+        f"efficiency {schedule_summary['efficiency'] * 100:.0f}%)"
+    )
+
+    prescreen_summary = cascade.stats.summary() if cascade is not None else None
+    if prescreen_summary:
+        progress_logger.info(
+            f"PROGRESS Pre-screen: {prescreen_summary['early_rejected']} rejected early, "
+            f"{prescreen_summary['escalated']} escalated, "
+            f"{prescreen_summary['disagreements']}/{prescreen_summary['audited']} audited rejects disagreed with full analysis"
+        )
     
     if invalid_count > 0:
         logging.debug("Invalid images summary:")
@@ -523,12 +575,18 @@ def main_threaded(directory, max_workers=None, config=None):
     logging.debug(" THREADED PROCESSING MISSION ACCOMPLISHED! ")
     
     return {
-        'total_processed': len(file_lists),
+        'total_processed': total_images,
         'valid_count': valid_count,
         'invalid_count': invalid_count,
+        'quarantined_count': quarantined_count,
         'processing_time': total_time,
         'avg_time_per_image': avg_time_per_image,
         'images_per_second': images_per_second,
         'workers_used': max_workers,
-        'speedup_factor': speedup_factor
+        'engine': engine,
+        'speedup_factor': speedup_factor,
+        'prescreen': prescreen_summary,
+        'commits': commit_counts,
+        'archive_prescreen': source.prescreen.summary() if hasattr(source, "prescreen") else None,
+        'scheduling': schedule_summary
     }
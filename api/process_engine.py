@@ -0,0 +1,146 @@
+"""
+Process-based batch engine with hard per-image time limits.
+
+Each worker is a separate process validating one image at a time. The
+supervisor tracks when every image was handed out; a worker that exceeds the
+time budget is killed and replaced, and its image is reported as timed out.
+This catches the cases the thread engine cannot: a single dlib or
+detectMultiScale call that never returns.
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from multiprocessing.connection import wait as wait_connections
+
+
+def _worker_main(conn, config_bytes, time_budget):
+    """Worker process loop: receive image paths, send back ValidationResults"""
+    import django
+    django.setup()
+    # The Config instance can only be unpickled once the app registry is ready
+    config = pickle.loads(config_bytes)
+
+    from .photo_validator_threaded import validate_single_image_threaded
+    from .validation_engine import build_cascade, build_plan
+
+    plan = build_plan(config)
+    cascade = build_cascade(plan)
+    # Tell the supervisor start-up is over so imports don't count against the budget
+    conn.send(None)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        image_path, data = message
+        conn.send(validate_single_image_threaded(image_path, config, plan, cascade, time_budget, data))
+
+
+class _Worker:
+    """One worker process and the image it is currently validating"""
+    def __init__(self, context, config, time_budget):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, config, time_budget), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.image_path = None
+        self.started_at = None
+
+    def submit(self, image_path, data=None):
+        self.conn.send((image_path, data))
+        self.image_path = image_path
+        # The clock starts once the worker has finished starting up
+        self.started_at = time.monotonic() if self.ready else None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+def iter_process_engine(image_paths, config, max_workers, time_budget=None, source=None):
+    """
+    Validate images in worker processes and yield (image_path, ValidationResult)
+    as they finish. Images are handed out in the given order; images a source
+    holds in memory (archive members) are sent to the worker with the path.
+    """
+    from .check_registry import Reason
+    from .photo_validator_threaded import failed_result, timed_out_result
+
+    context = multiprocessing.get_context("spawn")
+    config = pickle.dumps(config)
+    if hasattr(image_paths, "__len__"):
+        max_workers = min(max_workers, len(image_paths))
+    # A plain iterator may block until the next streamed image arrives
+    pending = iter(image_paths)
+    workers = [_Worker(context, config, time_budget) for _ in range(max_workers)]
+
+    def submit_next(worker):
+        for image_path in pending:
+            worker.submit(image_path, source.read(image_path) if source is not None else None)
+            return
+
+    try:
+        for worker in workers:
+            submit_next(worker)
+
+        while any(worker.image_path for worker in workers):
+            busy = [worker for worker in workers if worker.image_path]
+            ready = wait_connections([worker.conn for worker in busy], timeout=0.5)
+            now = time.monotonic()
+
+            for index, worker in enumerate(workers):
+                if not worker.image_path:
+                    continue
+                image_path = worker.image_path
+                elapsed = now - worker.started_at if worker.started_at is not None else 0.0
+
+                if worker.conn in ready:
+                    try:
+                        result = worker.conn.recv()
+                        if result is None:
+                            worker.ready = True
+                            worker.started_at = now
+                            continue
+                    except (EOFError, OSError):
+                        logging.error(f"Worker process died while validating {os.path.basename(image_path)}")
+                        result = failed_result(
+                            os.path.basename(image_path), "error", Reason("error.worker_crashed"), elapsed
+                        )
+                        worker.kill()
+                        worker = workers[index] = _Worker(context, config, time_budget)
+                elif time_budget and elapsed > time_budget:
+                    logging.error(f"Watchdog: killing worker stuck on {os.path.basename(image_path)} after {elapsed:.0f}s")
+                    result = timed_out_result(image_path, elapsed, time_budget)
+                    worker.kill()
+                    worker = workers[index] = _Worker(context, config, time_budget)
+                else:
+                    continue
+
+                worker.image_path = None
+                yield image_path, result
+                submit_next(worker)
+    finally:
+        for worker in workers:
+            if worker.image_path:
+                worker.kill()
+            else:
+                worker.stop()
@@ -0,0 +1,94 @@
+"""
+Co-occurrence analytics over every reason code of a batch.
+
+The failures of a batch form a boolean image x reason matrix ``M`` (one row
+per image that did not pass, one column per code). Everything here follows
+from one matrix product:
+
+* ``M.T @ M`` - images failing with both reasons of a pair; the diagonal is
+  each reason's own count
+* conditional failure rate ``P(column | row)`` - the product divided by its
+  diagonal, row by row
+* per-check correlation - the same product over check columns (a check
+  fails when any of its codes does), turned into phi coefficients over all
+  images of the batch, valid ones included
+
+Rows are taken from the results store's ``mask_counts`` - one row per
+distinct reason bitset, weighted by the images that have it - so the matrix
+stays small however many images failed; the arithmetic is the same as with
+one row per image.
+"""
+import numpy as np
+
+from .check_registry import reason_label
+from .results_store import REASON_BITS
+
+
+def check_of(code):
+    """The check a reason code belongs to: ``blurness.blurry`` -> ``blurness``"""
+    return code.split(".", 1)[0]
+
+
+def _bit_matrix(masks):
+    """(bool matrix of masks x REASON_BITS, column codes)"""
+    codes = list(REASON_BITS)
+    bits = np.array([REASON_BITS[code] for code in codes], dtype=np.int64)
+    return (masks[:, None] >> bits[None, :]) & 1 == 1, codes
+
+
+def _phi(counts, pair_counts, total):
+    """Phi coefficients of binary columns, from their counts and pair counts over total rows"""
+    counts = counts.astype(np.float64)
+    spread = np.sqrt(counts * (total - counts))
+    denominator = np.outer(spread, spread)
+    numerator = total * pair_counts - np.outer(counts, counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        phi = np.where(denominator > 0, numerator / denominator, 0.0)
+    return np.clip(phi, -1.0, 1.0)
+
+
+def cooccurrence_analytics(mask_counts, total_images):
+    """
+    Full co-occurrence analytics from ``[(reason bitset, images)]``.
+    ``total_images`` counts valid images too; it is the population of the
+    check correlations.
+    """
+    mask_counts = list(mask_counts)
+    masks = np.array([mask for mask, _ in mask_counts], dtype=np.int64)
+    weights = np.array([images for _, images in mask_counts], dtype=np.float64)
+    matrix, codes = _bit_matrix(masks)
+
+    # Only reasons that actually occur
+    present = matrix.T @ weights > 0
+    matrix = matrix[:, present]
+    codes = [code for code, keep in zip(codes, present) if keep]
+
+    rows = matrix.astype(np.float64)
+    cooccurrence = (rows * weights[:, None]).T @ rows
+    reason_counts = np.diag(cooccurrence).copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conditional = np.where(reason_counts[:, None] > 0, cooccurrence / reason_counts[:, None], 0.0)
+
+    checks = list(dict.fromkeys(check_of(code) for code in codes))
+    membership = np.array([[check_of(code) == check for check in checks] for code in codes],
+                          dtype=np.float64).reshape(len(codes), len(checks))
+    check_rows = (rows @ membership > 0).astype(np.float64)
+    check_cooccurrence = (check_rows * weights[:, None]).T @ check_rows
+    check_counts = np.diag(check_cooccurrence).copy()
+    total = max(total_images, int(weights.sum()))
+
+    return {
+        "total_images": total,
+        "invalid_images": int(weights.sum()),
+        "reasons": [
+            {"code": code, "label": reason_label(code), "images": int(count)}
+            for code, count in zip(codes, reason_counts)
+        ],
+        "cooccurrence": np.rint(cooccurrence).astype(np.int64).tolist(),
+        "conditional_failure_rate": np.round(conditional, 4).tolist(),
+        "checks": [
+            {"name": check, "images": int(count)}
+            for check, count in zip(checks, check_counts)
+        ],
+        "check_correlation": np.round(_phi(check_counts, check_cooccurrence, total), 4).tolist(),
+    }
@@ -0,0 +1,73 @@
+"""
+Streaming exports of a batch's results: CSV and newline-delimited JSON.
+
+Both are generators over ``ResultsStore.iter_records``, so a download
+starts with the first rows and memory stays flat however large the batch
+is. Rows are encoded into a buffer that is handed out every
+``EXPORT_CHUNK_SIZE`` bytes, rather than one tiny write per row.
+
+The CSV keeps the four columns it always had (name, status, issues, user
+action) and adds one column per metric and per check timing; NDJSON has one
+``iter_records`` object per line.
+"""
+import csv
+import io
+import json
+
+from .check_registry import CHECK_REGISTRY
+from .results_store import STATUS_QUARANTINED, STATUS_VALID
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+CSV_CONTENT_TYPE = "text/csv"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def _user_action(record):
+    if record["status"] == STATUS_VALID:
+        return "Manually approved" if record["reviewed"] else "Computer validated"
+    return "Quarantined" if record["status"] == STATUS_QUARANTINED else "Needs review"
+
+
+def _issues(record):
+    if record["status"] == STATUS_VALID:
+        return "Passed all checks"
+    messages = [reason["message"] for reason in record["reasons"]]
+    return ", ".join(messages) if messages else "Unknown issues"
+
+
+def iter_csv(store):
+    """The batch as CSV, one row per image, encoded as UTF-8"""
+    metrics = store.metric_names()
+    checks = [check.name for check in CHECK_REGISTRY]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Image Name", "Status", "Validation Issues", "User Action", "Processing Time (s)"]
+                    + metrics + [f"{check} time (s)" for check in checks])
+    for record in store.iter_records():
+        writer.writerow(
+            [record["name"], "VALID" if record["status"] == STATUS_VALID else "INVALID",
+             _issues(record), _user_action(record), f"{record['processing_time']:.4f}"]
+            + [record["metrics"].get(metric, "") for metric in metrics]
+            + [f"{record['timings'][check]:.4f}" if check in record["timings"] else "" for check in checks]
+        )
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(store):
+    """The batch as newline-delimited JSON, one iter_records object per line"""
+    chunk = []
+    size = 0
+    for record in store.iter_records():
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    yield b"".join(chunk)
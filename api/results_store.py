@@ -0,0 +1,582 @@
+"""
+Per-batch results in SQLite.
+
+Every image of a batch gets a row in ``images`` (its status: valid, invalid
+or quarantined) and one row per failure in ``reasons``: the check that
+failed, the reason code (see check_registry.REASONS) and its parameters as
+JSON. Messages are rendered from code and parameters when read. Each
+image's numeric check metrics go to ``image_metrics`` and the time each
+check took to ``check_timings``. The tables are indexed for the queries the
+views make: by name, by status, by reason code and by metric value
+(``page`` serves the galleries from these indexes).
+
+The engine writes in bulk (``add_results``); views query instead of
+re-parsing a CSV. CSV and NDJSON only exist as exports (report_export,
+reading ``iter_records``).
+
+Report aggregates are maintained in the same transactions as the rows they
+summarise, so reading them costs the same for ten images as for a million,
+and they are current while the batch is still running:
+
+* ``status_counts`` - images per status
+* ``reason_counts`` - per reason code, the images that did not pass with it
+  and its total occurrences
+* ``reason_pairs`` - images failing with both codes of a pair, counted from
+  each image's reason bitset (``images.reason_mask``, one bit per code)
+* ``mask_counts`` - images per distinct reason bitset, the compact form of
+  the image x reason matrix that report_analytics works on
+* ``metric_histogram`` - every image's raw check metrics, bucketed
+
+Reasons only count while an image has not passed; a reviewer approving an
+image (``mark_valid``) takes it out of the reason aggregates.
+"""
+import json
+import math
+import os
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+
+from .check_registry import REASONS, UNKNOWN_REASON, render_reason
+
+RESULTS_DB_NAME = "results.sqlite3"
+
+STATUS_VALID = "valid"
+STATUS_INVALID = "invalid"
+STATUS_QUARANTINED = "quarantined"
+
+# Bit of each reason code in images.reason_mask
+REASON_BITS = {code: bit for bit, code in enumerate(REASONS)}
+
+# Histogram bucket width per metric; other numeric metrics use 1
+METRIC_BUCKET_WIDTHS = {
+    "size_kb": 25,
+    "height": 50,
+    "width": 50,
+    "blur_value": 25,
+    "pixelated_value": 1,
+    "head_percent": 5,
+    "symmetry_percentage": 5,
+}
+
+# Names per IN (...) query
+QUERY_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    name TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    processing_time REAL NOT NULL DEFAULT 0,
+    tier TEXT,
+    reviewed INTEGER NOT NULL DEFAULT 0,
+    reason_mask INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS images_status ON images (status, name);
+CREATE TABLE IF NOT EXISTS reasons (
+    image_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    check_name TEXT NOT NULL,
+    code TEXT NOT NULL,
+    params TEXT NOT NULL,
+    PRIMARY KEY (image_name, position)
+);
+CREATE INDEX IF NOT EXISTS reasons_code ON reasons (code, image_name);
+CREATE TABLE IF NOT EXISTS image_metrics (
+    image_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (image_name, metric)
+);
+CREATE INDEX IF NOT EXISTS image_metrics_value ON image_metrics (metric, value, image_name);
+CREATE TABLE IF NOT EXISTS check_timings (
+    image_name TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (image_name, check_name)
+);
+CREATE TABLE IF NOT EXISTS status_counts (
+    status TEXT PRIMARY KEY,
+    images INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reason_counts (
+    code TEXT PRIMARY KEY,
+    images INTEGER NOT NULL,
+    occurrences INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reason_pairs (
+    code_a TEXT NOT NULL,
+    code_b TEXT NOT NULL,
+    images INTEGER NOT NULL,
+    PRIMARY KEY (code_a, code_b)
+);
+CREATE TABLE IF NOT EXISTS mask_counts (
+    mask INTEGER PRIMARY KEY,
+    images INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metric_histogram (
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    images INTEGER NOT NULL,
+    PRIMARY KEY (metric, bucket)
+);
+"""
+
+
+def result_status(result):
+    if result.is_valid:
+        return STATUS_VALID
+    return STATUS_QUARANTINED if result.timed_out else STATUS_INVALID
+
+
+def result_metrics(result):
+    """{metric: value} of the numeric metrics of every check run on the image"""
+    if result.report is None:
+        return {}
+    metrics = {}
+    for check_result in result.report.results:
+        for metric, value in check_result.metrics.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                metrics[metric] = value
+    return metrics
+
+
+def result_timings(result):
+    """{check name: seconds} of every check run on the image"""
+    return result.report.timings if result.report is not None else {}
+
+
+def reason_mask(codes):
+    """The reason bitset of an image; codes outside REASONS count as unknown"""
+    mask = 0
+    for code in codes:
+        mask |= 1 << REASON_BITS.get(code, REASON_BITS[UNKNOWN_REASON])
+    return mask
+
+
+def mask_codes(mask):
+    """The reason codes set in a bitset, in REASONS order"""
+    return [code for code, bit in REASON_BITS.items() if mask >> bit & 1]
+
+
+def metric_bucket(metric, value):
+    return math.floor(value / METRIC_BUCKET_WIDTHS.get(metric, 1))
+
+
+def empty_aggregates():
+    return {"statuses": {}, "reasons": [], "pairs": {}, "histograms": {}}
+
+
+def _chunks(items, size=QUERY_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class _MergedRows:
+    """Rows of a cursor ordered by image name, taken one image at a time"""
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._next = next(self._rows, None)
+
+    def take(self, name):
+        """The rows of name, without the name; rows of names before it are skipped"""
+        rows = []
+        # Python orders str like SQLite's BINARY collation orders UTF-8
+        while self._next is not None and self._next[0] <= name:
+            if self._next[0] == name:
+                rows.append(self._next[1:])
+            self._next = next(self._rows, None)
+        return rows
+
+
+class _AggregateDelta:
+    """What one transaction adds to (or takes from) the running aggregates"""
+    def __init__(self):
+        self.statuses = Counter()
+        self.reason_images = Counter()
+        self.reason_occurrences = Counter()
+        self.pairs = Counter()
+        self.masks = Counter()
+        self.histogram = Counter()
+
+    def add_image(self, status, codes, metrics, sign=1):
+        """Count one image in (sign 1) or out (sign -1)"""
+        self.statuses[status] += sign
+        if status != STATUS_VALID:
+            self.add_reasons(codes, sign)
+        for metric, value in metrics.items():
+            self.histogram[(metric, metric_bucket(metric, value))] += sign
+
+    def add_reasons(self, codes, sign=1):
+        # An image that failed without a stated reason still counts somewhere
+        codes = codes or [UNKNOWN_REASON]
+        for code in codes:
+            self.reason_occurrences[code] += sign
+        mask = reason_mask(codes)
+        self.masks[mask] += sign
+        present = mask_codes(mask)
+        for i, code in enumerate(present):
+            self.reason_images[code] += sign
+            for other in present[i + 1:]:
+                self.pairs[(code, other)] += sign
+
+    def apply(self, conn):
+        # Every write bumps the revision, which downloads use as their validator
+        conn.execute(
+            "INSERT INTO batch_meta (key, value) VALUES ('revision', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+        conn.executemany(
+            "INSERT INTO status_counts (status, images) VALUES (?, ?) "
+            "ON CONFLICT (status) DO UPDATE SET images = images + excluded.images",
+            [item for item in self.statuses.items() if item[1]],
+        )
+        codes = set(self.reason_images) | set(self.reason_occurrences)
+        conn.executemany(
+            "INSERT INTO reason_counts (code, images, occurrences) VALUES (?, ?, ?) "
+            "ON CONFLICT (code) DO UPDATE SET images = images + excluded.images, "
+            "occurrences = occurrences + excluded.occurrences",
+            [(code, self.reason_images[code], self.reason_occurrences[code]) for code in codes
+             if self.reason_images[code] or self.reason_occurrences[code]],
+        )
+        conn.executemany(
+            "INSERT INTO reason_pairs (code_a, code_b, images) VALUES (?, ?, ?) "
+            "ON CONFLICT (code_a, code_b) DO UPDATE SET images = images + excluded.images",
+            [(a, b, count) for (a, b), count in self.pairs.items() if count],
+        )
+        conn.executemany(
+            "INSERT INTO mask_counts (mask, images) VALUES (?, ?) "
+            "ON CONFLICT (mask) DO UPDATE SET images = images + excluded.images",
+            [item for item in self.masks.items() if item[1]],
+        )
+        conn.executemany(
+            "INSERT INTO metric_histogram (metric, bucket, images) VALUES (?, ?, ?) "
+            "ON CONFLICT (metric, bucket) DO UPDATE SET images = images + excluded.images",
+            [(metric, bucket, count) for (metric, bucket), count in self.histogram.items() if count],
+        )
+
+
+class ResultsStore:
+    """
+    The results database of one batch. ``create`` sets it up once, when the
+    batch's workspace is; every other connection is a plain one, so reads
+    (gallery pages, exports) do no DDL and never wait on the writer's lock.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def create(self):
+        """Create the database and its schema if they do not exist yet"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Persistent in the file: readers (the views) never block the engine's writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _stored_images(self, conn, names):
+        """{name: (status, [codes], metrics)} of the names already stored"""
+        stored = {}
+        for chunk in _chunks(names):
+            placeholders = ", ".join("?" * len(chunk))
+            for name, status in conn.execute(
+                    f"SELECT name, status FROM images WHERE name IN ({placeholders})", chunk):
+                stored[name] = (status, [], {})
+            for name, code in conn.execute(
+                    f"SELECT image_name, code FROM reasons WHERE image_name IN ({placeholders}) "
+                    f"ORDER BY image_name, position", chunk):
+                stored[name][1].append(code)
+            for name, metric, value in conn.execute(
+                    f"SELECT image_name, metric, value FROM image_metrics WHERE image_name IN ({placeholders})",
+                    chunk):
+                stored[name][2][metric] = value
+        return stored
+
+    def add_results(self, results):
+        """Store ValidationResults in one transaction; a name stored again is replaced"""
+        images = {}
+        reason_rows = []
+        metric_rows = []
+        timing_rows = []
+        delta = _AggregateDelta()
+        for result in results:
+            if result.image_name in images:
+                # Stored again within the batch: only the last one counts
+                reason_rows = [row for row in reason_rows if row[0] != result.image_name]
+                old_status, old_codes, old_metrics = images[result.image_name][1:]
+                delta.add_image(old_status, old_codes, old_metrics, -1)
+            status = result_status(result)
+            codes = [reason.code for _, reason in result.reasons]
+            metrics = result_metrics(result)
+            images[result.image_name] = (result, status, codes, metrics)
+            delta.add_image(status, codes, metrics)
+            for position, (check_name, reason) in enumerate(result.reasons):
+                reason_rows.append((result.image_name, position, check_name, reason.code, json.dumps(reason.params)))
+        if not images:
+            return
+        image_rows = []
+        for name, (result, status, codes, metrics) in images.items():
+            image_rows.append((
+                name, status, result.processing_time, result.report.tier if result.report is not None else None,
+                reason_mask(codes) if status != STATUS_VALID else 0,
+            ))
+            metric_rows.extend((name, metric, value) for metric, value in metrics.items())
+            timing_rows.extend((name, check_name, seconds) for check_name, seconds in result_timings(result).items())
+        with self._connect() as conn:
+            for old_status, old_codes, old_metrics in self._stored_images(conn, list(images)).values():
+                delta.add_image(old_status, old_codes, old_metrics, -1)
+            conn.executemany("DELETE FROM reasons WHERE image_name = ?", [(row[0],) for row in image_rows])
+            conn.executemany("DELETE FROM image_metrics WHERE image_name = ?", [(row[0],) for row in image_rows])
+            conn.executemany("DELETE FROM check_timings WHERE image_name = ?", [(row[0],) for row in image_rows])
+            conn.executemany(
+                "INSERT OR REPLACE INTO images (name, status, processing_time, tier, reason_mask) "
+                "VALUES (?, ?, ?, ?, ?)",
+                image_rows,
+            )
+            conn.executemany(
+                "INSERT INTO reasons (image_name, position, check_name, code, params) VALUES (?, ?, ?, ?, ?)",
+                reason_rows,
+            )
+            conn.executemany(
+                "INSERT INTO image_metrics (image_name, metric, value) VALUES (?, ?, ?)",
+                metric_rows,
+            )
+            conn.executemany(
+                "INSERT INTO check_timings (image_name, check_name, seconds) VALUES (?, ?, ?)",
+                timing_rows,
+            )
+            delta.apply(conn)
+
+    def revision(self):
+        """Incremented by every write; 0 for an empty store"""
+        if not self.exists():
+            return 0
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM batch_meta WHERE key = 'revision'").fetchone()
+            return row[0] if row else 0
+
+    def counts(self):
+        """{status: number of images}"""
+        if not self.exists():
+            return {}
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, images FROM status_counts WHERE images > 0"))
+
+    def aggregates(self):
+        """
+        The running report aggregates, read in one go::
+
+            statuses    {status: images}
+            reasons     [(code, images, occurrences)], most images first
+            pairs       {(code_a, code_b): images}, codes in REASONS order
+            histograms  {metric: [(bucket start, bucket end, images)]}
+        """
+        aggregates = empty_aggregates()
+        if not self.exists():
+            return aggregates
+        with self._connect() as conn:
+            aggregates["statuses"] = dict(conn.execute(
+                "SELECT status, images FROM status_counts WHERE images > 0"))
+            aggregates["reasons"] = list(conn.execute(
+                "SELECT code, images, occurrences FROM reason_counts WHERE images > 0 "
+                "ORDER BY images DESC, occurrences DESC, code"))
+            aggregates["pairs"] = {
+                (code_a, code_b): images for code_a, code_b, images in conn.execute(
+                    "SELECT code_a, code_b, images FROM reason_pairs WHERE images > 0")
+            }
+            for metric, bucket, images in conn.execute(
+                    "SELECT metric, bucket, images FROM metric_histogram WHERE images > 0 ORDER BY metric, bucket"):
+                width = METRIC_BUCKET_WIDTHS.get(metric, 1)
+                aggregates["histograms"].setdefault(metric, []).append((bucket * width, (bucket + 1) * width, images))
+        return aggregates
+
+    def mask_counts(self):
+        """[(reason bitset, images)] over every image that has not passed"""
+        if not self.exists():
+            return []
+        with self._connect() as conn:
+            return list(conn.execute("SELECT mask, images FROM mask_counts WHERE images > 0"))
+
+    def page(self, status, limit, after=None, reason=None, sort=None, descending=False):
+        """
+        One page of the images with ``status``: by name, or by the value of
+        metric ``sort`` (images without that metric are left out), optionally
+        only those that failed with reason code ``reason``.
+
+        ``after`` is the sort key the previous page ended on. Returns
+        (entries, sort key of the last entry, or None on the last page);
+        entries are dicts with name, reasons (messages), codes and metrics.
+        """
+        if not self.exists():
+            return [], None
+        direction = "DESC" if descending else "ASC"
+        comparison = "<" if descending else ">"
+        params = []
+        if sort is None:
+            query = "SELECT images.name FROM images WHERE images.status = ?"
+            params.append(status)
+            if after is not None:
+                query += f" AND images.name {comparison} ?"
+                params.append(after[0])
+            order = f" ORDER BY images.name {direction}"
+        else:
+            query = (
+                "SELECT image_metrics.image_name, image_metrics.value FROM image_metrics "
+                "JOIN images ON images.name = image_metrics.image_name "
+                "WHERE image_metrics.metric = ? AND images.status = ?"
+            )
+            params.extend([sort, status])
+            if after is not None:
+                query += f" AND (image_metrics.value, image_metrics.image_name) {comparison} (?, ?)"
+                params.extend(after)
+            order = f" ORDER BY image_metrics.value {direction}, image_metrics.image_name {direction}"
+        if reason is not None:
+            query += " AND images.name IN (SELECT image_name FROM reasons WHERE code = ?)"
+            params.append(reason)
+        query += order + " LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            entries = {row[0]: {"name": row[0], "reasons": [], "codes": [], "metrics": {}} for row in rows}
+            names = list(entries)
+            if names:
+                placeholders = ", ".join("?" * len(names))
+                if status != STATUS_VALID:
+                    for name, code, params_json in conn.execute(
+                            f"SELECT image_name, code, params FROM reasons WHERE image_name IN ({placeholders}) "
+                            f"ORDER BY image_name, position", names):
+                        entries[name]["codes"].append(code)
+                        entries[name]["reasons"].append(render_reason(code, json.loads(params_json)))
+                for name, metric, value in conn.execute(
+                        f"SELECT image_name, metric, value FROM image_metrics WHERE image_name IN ({placeholders})",
+                        names):
+                    entries[name]["metrics"][metric] = value
+        next_after = None
+        if more:
+            last = rows[-1]
+            next_after = (last[1], last[0]) if sort is not None else (last[0],)
+        return list(entries.values()), next_after
+
+    def names(self, status):
+        if not self.exists():
+            return []
+        with self._connect() as conn:
+            return [name for name, in conn.execute(
+                "SELECT name FROM images WHERE status = ? ORDER BY name", (status,))]
+
+    def _invalid_reason_rows(self):
+        with self._connect() as conn:
+            yield from conn.execute(
+                "SELECT images.name, reasons.code, reasons.params FROM images "
+                "LEFT JOIN reasons ON reasons.image_name = images.name "
+                "WHERE images.status != ? ORDER BY images.name, reasons.position",
+                (STATUS_VALID,),
+            )
+
+    def invalid_reasons(self):
+        """{image name: [messages]} for every image that did not pass"""
+        if not self.exists():
+            return {}
+        reasons = {}
+        for name, code, params in self._invalid_reason_rows():
+            messages = reasons.setdefault(name, [])
+            if code is not None:
+                messages.append(render_reason(code, json.loads(params)))
+        return reasons
+
+    def invalid_reason_codes(self):
+        """{image name: [reason codes]} for every image that did not pass; nothing is rendered"""
+        if not self.exists():
+            return {}
+        codes = {}
+        for name, code, _ in self._invalid_reason_rows():
+            image_codes = codes.setdefault(name, [])
+            if code is not None:
+                image_codes.append(code)
+        return codes
+
+    def mark_valid(self, names):
+        """Reviewer override: the images count as valid from now on"""
+        names = list(names)
+        if not names:
+            return 0
+        with self._connect() as conn:
+            delta = _AggregateDelta()
+            for status, codes, _ in self._stored_images(conn, names).values():
+                if status != STATUS_VALID:
+                    delta.statuses[status] -= 1
+                    delta.statuses[STATUS_VALID] += 1
+                    delta.add_reasons(codes, -1)
+            cursor = conn.executemany(
+                "UPDATE images SET status = ?, reviewed = 1, reason_mask = 0 WHERE name = ?",
+                [(STATUS_VALID, name) for name in names],
+            )
+            delta.apply(conn)
+            return cursor.rowcount
+
+    def metric_names(self):
+        """Every metric stored for the batch, sorted"""
+        if not self.exists():
+            return []
+        with self._connect() as conn:
+            return [metric for metric, in conn.execute(
+                "SELECT DISTINCT metric FROM metric_histogram WHERE images > 0 ORDER BY metric")]
+
+    def iter_records(self):
+        """
+        Everything stored about each image, by name::
+
+            {"name", "status", "reviewed", "tier", "processing_time",
+             "reasons": [{"check", "code", "message"}], "metrics": {metric: value},
+             "timings": {check name: seconds}}
+
+        One cursor per table, each in primary key order, merged by name: the
+        batch is read as it is consumed, from one consistent snapshot.
+        Reasons are only listed while the image has not passed.
+        """
+        if not self.exists():
+            return
+        with self._connect() as conn:
+            reasons = _MergedRows(conn.execute(
+                "SELECT image_name, check_name, code, params FROM reasons ORDER BY image_name, position"))
+            metrics = _MergedRows(conn.execute(
+                "SELECT image_name, metric, value FROM image_metrics ORDER BY image_name, metric"))
+            timings = _MergedRows(conn.execute(
+                "SELECT image_name, check_name, seconds FROM check_timings ORDER BY image_name, check_name"))
+            images = conn.execute(
+                "SELECT name, status, reviewed, tier, processing_time FROM images ORDER BY name")
+            for name, status, reviewed, tier, processing_time in images:
+                image_reasons = reasons.take(name)
+                yield {
+                    "name": name,
+                    "status": status,
+                    "reviewed": bool(reviewed),
+                    "tier": tier,
+                    "processing_time": processing_time,
+                    "reasons": [
+                        {"check": check_name, "code": code, "message": render_reason(code, json.loads(params))}
+                        for check_name, code, params in image_reasons
+                    ] if status != STATUS_VALID else [],
+                    "metrics": dict(metrics.take(name)),
+                    "timings": dict(timings.take(name)),
+                }
@@ -0,0 +1,86 @@
+"""
+Validation of one image straight from the request, for interactive clients.
+
+The image is never written anywhere: a multipart ``image`` field is kept in
+memory (``InMemoryUploadHandler``) and a raw ``image/*`` body is read as it
+is. Its bytes go to the validation engine as they are,
+with the cached config snapshot, its compiled plan and the pooled detectors
+(see detectors), so a request does no database or disk work of its own. Its
+checks run in parallel on the shared check pool; whether that answers sooner
+than running them one after another depends on spare cores (the report's
+``schedule`` shows where the time went).
+The request size is bounded by ``PHOTO_VALIDATOR_SINGLE_IMAGE_MAX_BYTES``:
+up front from its Content-Length, and while it is read, since a chunked
+request need not declare one.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import MemoryFileUploadHandler
+
+from .config_utils import get_cached_config
+from .validation_engine import build_plan, get_check_pool, validate_image
+
+IMAGE_FIELD = "image"
+DEFAULT_IMAGE_NAME = "image"
+
+
+class SingleImageError(Exception):
+    """The request does not carry one acceptable image; ``status`` is the HTTP status to answer with"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class InMemoryUploadHandler(MemoryFileUploadHandler):
+    """Keeps uploaded files in memory, refusing the request past ``max_bytes`` of them in all"""
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.activated = True
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise SingleImageError(f"Image larger than {self.max_bytes} bytes", status=413)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def get_max_bytes():
+    return getattr(settings, "PHOTO_VALIDATOR_SINGLE_IMAGE_MAX_BYTES", 20 * 1024 * 1024)
+
+
+def read_image(request):
+    """(name, encoded bytes) of the image a request carries"""
+    max_bytes = get_max_bytes()
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_bytes:
+        raise SingleImageError(f"Image larger than {max_bytes} bytes", status=413)
+
+    if request.content_type.startswith("multipart/"):
+        request.upload_handlers = [InMemoryUploadHandler(request, max_bytes)]
+        image_file = request.FILES.get(IMAGE_FIELD)
+        if image_file is None:
+            raise SingleImageError("No image uploaded")
+        return image_file.name, image_file.read()
+
+    if request.content_type.startswith("image/"):
+        data = request.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise SingleImageError(f"Image larger than {max_bytes} bytes", status=413)
+        if not data:
+            raise SingleImageError("No image uploaded")
+        return request.GET.get("name") or DEFAULT_IMAGE_NAME, data
+
+    raise SingleImageError("Expected a multipart 'image' field or an image/* body", status=415)
+
+
+def validate_bytes(name, data, config=None):
+    """The ImageReport of an encoded image held in memory, its checks run in parallel"""
+    if config is None:
+        config = get_cached_config()
+    return validate_image(name, config, build_plan(config), data=data, executor=get_check_pool())
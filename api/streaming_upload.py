@@ -0,0 +1,163 @@
+"""
+Validation that overlaps the upload.
+
+``StreamingUploadHandler`` is a Django upload handler: instead of spooling
+the request body to a temporary file it feeds ZIP uploads through
+``ZipStreamParser`` and passes every completed member, or every individually
+uploaded image, to a ``StreamingSource``. A ``StreamingBatch`` runs
+``main_threaded`` on that source in the background from the moment the
+upload starts, so by the time the last byte has arrived most of the batch
+has already been validated.
+
+Every file goes through the archive pre-screen as it arrives (ZIP members
+from their local headers, see zip_stream), so oversize, ratio-bomb, unsafe
+and duplicate files are rejected without being buffered. A batch whose upload
+fails, or that receives nothing for ``PHOTO_VALIDATOR_UPLOAD_IDLE_TIMEOUT``
+seconds, is aborted and its workspace removed.
+
+Batches live in this process (``get_streaming_batch``), which matches the
+single-process server the rest of the app assumes (see ``validate_images``).
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from .batch_sources import StreamingSource, is_image_name
+from .zip_stream import ZipStreamParser
+
+# Finished batches kept around so validate_images can still collect them
+MAX_FINISHED_BATCHES = 8
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+
+class StreamingBatch:
+    """
+    A batch that is validated while its images are still being uploaded;
+    it shares its id with its workspace and stages images in the input folder
+    """
+    def __init__(self, workspace, config):
+        self.batch_id = workspace.batch_id
+        self.workspace = workspace
+        self.config = config
+        self.source = StreamingSource(workspace.input_dir, config,
+                                      getattr(settings, "PHOTO_VALIDATOR_UPLOAD_IDLE_TIMEOUT", None))
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        from .photo_validator_threaded import main_threaded
+        try:
+            self.result = main_threaded(self.workspace.input_dir, config=self.config,
+                                        source=self.source, workspace=self.workspace)
+        except Exception as e:
+            logging.error(f"Error in streaming batch {self.batch_id}: {e}")
+            self.error = str(e)
+            # Nothing will collect a failed batch's outputs
+            self.workspace.delete()
+        finally:
+            self.source.close()
+            self._done.set()
+
+    def abort(self, error):
+        """Give up on the batch; its thread stops and removes the workspace"""
+        self.source.abort(error)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the batch is validated and return main_threaded's summary"""
+        if not self._done.wait(timeout):
+            return None
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.result
+
+
+def start_streaming_batch(workspace, config):
+    """Create a batch writing to workspace and start validating it"""
+    batch = StreamingBatch(workspace, config)
+    with _batches_lock:
+        finished = [batch_id for batch_id, other in _batches.items() if other.done]
+        for batch_id in finished[:max(0, len(finished) - MAX_FINISHED_BATCHES + 1)]:
+            del _batches[batch_id]
+        _batches[batch.batch_id] = batch
+    batch.start()
+    return batch
+
+
+def get_streaming_batch(batch_id):
+    with _batches_lock:
+        return _batches.get(batch_id)
+
+
+class StreamingUploadHandler(FileUploadHandler):
+    """
+    Hands uploaded files to a StreamingSource as they arrive. ZIP files are
+    parsed incrementally and each member is added when complete; image files
+    are added as soon as their last chunk is in. Both are screened by the
+    source's prescreen first. Nothing is left in ``request.FILES``.
+    """
+    def __init__(self, source, request=None):
+        super().__init__(request)
+        self.source = source
+        self.parser = None
+        self.image_path = None
+        self.chunks = None
+        self.size = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        name = os.path.basename(self.file_name or "")
+        self.parser = None
+        self.image_path = None
+        self.chunks = None
+        self.size = 0
+        if name.lower().endswith(".zip"):
+            self.parser = ZipStreamParser(self.source.add, self.source.prescreen)
+        elif is_image_name(name):
+            self.image_path = self.source.prescreen.screen(name)
+            self.chunks = [] if self.image_path is not None else None
+        else:
+            logging.warning(f"Ignoring uploaded file {name}: not a ZIP archive or image")
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.source.touch()
+        if self.parser is not None:
+            self.parser.feed(raw_data)
+        elif self.chunks is not None:
+            self.size += len(raw_data)
+            prescreen = self.source.prescreen
+            if self.size <= prescreen.max_member_size:
+                self.chunks.append(raw_data)
+            else:
+                prescreen.reject(self.image_path, prescreen.too_large_report(
+                    os.path.basename(self.file_name), self.size, prescreen.max_member_size))
+                self.chunks = None
+        return None
+
+    def file_complete(self, file_size):
+        if self.parser is not None:
+            self.parser.close()
+        elif self.chunks is not None:
+            prescreen = self.source.prescreen
+            report = prescreen.check_sizes(os.path.basename(self.file_name), file_size)
+            if report is not None:
+                prescreen.reject(self.image_path, report)
+            else:
+                self.source.add(self.file_name, b"".join(self.chunks))
+        self.parser = None
+        self.chunks = None
+        return None
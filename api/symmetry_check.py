@@ -2,8 +2,9 @@ import cv2
 import numpy as np
 from skimage.metrics import structural_similarity as ssim
 from .config_utils import get_cached_config
+from .detectors import FACE_CASCADES
 
-def check_symmetry_with_head(image, config=None):
+def check_symmetry_with_head(image, config=None, gray=None):
     try:
         if config is None:
             config = get_cached_config()
@@ -17,9 +18,10 @@ def check_symmetry_with_head(image, config=None):
     height, width, _ = image.shape
 
     # ---- Step 1: Face detection (lightweight Haar cascade) ----
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    with FACE_CASCADES.borrow() as face_cascade:
+        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
 
     if len(faces) > 0:
         # Use the largest detected face
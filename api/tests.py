@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .archive_prescreen import ArchivePrescreen
+from .config_utils import DEFAULT_CONFIG, clear_config_cache, get_cached_config, get_or_create_config
+from .models import Config
+from .validation_engine import PrescreenCascade, build_plan, validate_image
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _config(**overrides):
+    return Config(**{**DEFAULT_CONFIG, "bypass_head_check": True, "bypass_eye_check": True,
+                     "bypass_symmetry_check": True, **overrides})
+
+
+class RotatedImageTests(SimpleTestCase):
+    """The pre-screen thumbnail must be oriented like the full decode"""
+    def setUp(self):
+        # Upright portrait: plain light background, dark clothes across the bottom
+        rng = np.random.default_rng(0)
+        upright = np.full((400, 300, 3), 200, dtype=np.uint8)
+        upright[330:] = 30
+        upright[120:330, 90:210] = rng.integers(0, 255, (210, 120, 3), dtype=np.uint8)
+        # Stored turned a quarter to the left, with EXIF Orientation 6 to right it
+        stored = Image.fromarray(np.rot90(upright).copy())
+        exif = stored.getexif()
+        exif[EXIF_ORIENTATION] = 6
+        handle, self.image_path = tempfile.mkstemp(suffix=".jpg")
+        os.close(handle)
+        stored.save(self.image_path, quality=95, exif=exif.tobytes())
+
+    def tearDown(self):
+        os.remove(self.image_path)
+
+    def test_cascade_agrees_with_full_analysis(self):
+        config = _config()
+        plan = build_plan(config)
+        full = validate_image(self.image_path, config, plan)
+        screened = PrescreenCascade(plan).validate(self.image_path, config)
+        self.assertTrue(full.result("background").passed)
+        self.assertEqual(screened.result("background").passed, full.result("background").passed)
+        self.assertEqual(screened.is_valid, full.is_valid)
+
+
+class ArchivePrescreenTests(SimpleTestCase):
+    def test_nested_duplicate_is_renamed_after_its_file_name(self):
+        prescreen = ArchivePrescreen("/batch/input")
+        self.assertIsNotNone(prescreen.screen("a.jpg", 1000, 900))
+        self.assertIsNone(prescreen.screen("sub/a.jpg", 1000, 900))
+        [(_, report)] = prescreen.rejected
+        self.assertEqual(report.image_name, "a (2).jpg")
+        self.assertEqual(report.result("archive").reasons[0].code, "archive.duplicate")
+        reverse("serve_invalid_image", args=[report.image_name])
+
+
+class ConfigCacheTests(TestCase):
+    def setUp(self):
+        clear_config_cache()
+
+    def test_saving_config_refreshes_the_cache(self):
+        config = get_or_create_config()
+        self.assertEqual(get_cached_config().max_width, config.max_width)
+        config.max_width = 1234
+        config.save()
+        self.assertEqual(get_cached_config().max_width, 1234)
@@ -0,0 +1,219 @@
+"""
+Gallery thumbnails, generated on demand and kept in a bounded disk cache.
+
+A thumbnail is a fixed-size JPEG or WebP preview, decoded at reduced
+resolution (PIL draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale).
+Thumbnails are cached on disk keyed by the content hash of the original,
+the size and the format::
+
+    thumbnails/3f/3fa0...c2_256.jpg
+
+so the same photo uploaded in two batches shares its thumbnails. The cache
+is bounded by ``PHOTO_VALIDATOR_THUMBNAIL_CACHE_MAX_BYTES``: a thumbnail's
+access time is set on every use (its mtime, and so its ETag, never change),
+and once the cache grows past the limit the least recently used ones are
+deleted.
+
+Batches can pre-generate the default size while the image is still decoded
+(``pregenerate``), so the first gallery view does not decode anything.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+THUMBNAIL_SIZES = (128, 256, 512)
+DEFAULT_THUMBNAIL_SIZE = 256
+
+# format -> (PIL format, content type, file extension, save options)
+THUMBNAIL_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg", {"quality": 80, "optimize": True}),
+    "webp": ("WEBP", "image/webp", "webp", {"quality": 75, "method": 4}),
+}
+DEFAULT_THUMBNAIL_FORMAT = "jpeg"
+
+# Eviction deletes down to this fraction of the limit, so it does not run on every write
+EVICTION_TARGET = 0.9
+
+# Originals whose content hash is remembered, keyed by path and stat
+HASH_MEMO_SIZE = 4096
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def get_thumbnail_settings():
+    """(cache directory, max cache size in bytes, pre-generate in batches) from settings"""
+    return (
+        getattr(settings, "PHOTO_VALIDATOR_THUMBNAIL_CACHE_DIR", None)
+        or os.path.join(settings.MEDIA_ROOT, "thumbnails"),
+        getattr(settings, "PHOTO_VALIDATOR_THUMBNAIL_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+        getattr(settings, "PHOTO_VALIDATOR_THUMBNAIL_PREGENERATE", True),
+    )
+
+
+def webp_supported():
+    return features.check("webp")
+
+
+def thumbnail_size(requested):
+    """The supported size closest to the requested one"""
+    return min(THUMBNAIL_SIZES, key=lambda size: abs(size - requested))
+
+
+class ThumbnailCache:
+    """The thumbnails under one directory, at most max_bytes of them"""
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bytes in the cache as far as this process knows; None until first scanned
+        self._bytes = None
+        self._hashes = OrderedDict()
+
+    def content_hash(self, image_path):
+        """Hex digest of the file, remembered until the file changes"""
+        stat = os.stat(image_path)
+        key = (image_path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._hashes:
+                self._hashes.move_to_end(key)
+                return self._hashes[key]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(image_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                digest.update(block)
+        with self._lock:
+            self._hashes[key] = digest.hexdigest()
+            if len(self._hashes) > HASH_MEMO_SIZE:
+                self._hashes.popitem(last=False)
+        return digest.hexdigest()
+
+    def path_for(self, digest, size, fmt):
+        extension = THUMBNAIL_FORMATS[fmt][2]
+        return os.path.join(self.root, digest[:2], f"{digest}_{size}.{extension}")
+
+    def thumbnail(self, image_path, size, fmt):
+        """(path of the cached thumbnail, content type), generating it if needed"""
+        path = self.path_for(self.content_hash(image_path), size, fmt)
+        if self._touch(path):
+            return path, THUMBNAIL_FORMATS[fmt][1]
+        with Image.open(image_path) as img:
+            img.draft("RGB", (size, size))
+            preview = ImageOps.exif_transpose(img).convert("RGB")
+        preview.thumbnail((size, size), Image.LANCZOS)
+        self._write(path, preview, fmt)
+        return path, THUMBNAIL_FORMATS[fmt][1]
+
+    def pregenerate(self, context, size=DEFAULT_THUMBNAIL_SIZE, fmt=DEFAULT_THUMBNAIL_FORMAT):
+        """
+        Write the thumbnail of a validated image from the pixels its checks
+        already decoded; does nothing if none were, and never raises.
+        """
+        try:
+            bgr = context.decoded_bgr(size)
+            if bgr is None:
+                return
+            if context.data is not None:
+                digest = hashlib.blake2b(context.data, digest_size=16).hexdigest()
+            else:
+                digest = self.content_hash(context.path)
+            path = self.path_for(digest, size, fmt)
+            if self._touch(path):
+                return
+            preview = Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+            preview.thumbnail((size, size), Image.LANCZOS)
+            self._write(path, preview, fmt)
+        except Exception as e:
+            logging.debug(f"Could not pre-generate thumbnail for {context.path}: {e}")
+
+    def _touch(self, path):
+        """Mark a cached thumbnail as just used; False if it is not cached"""
+        try:
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write(self, path, preview, fmt):
+        pil_format, _, _, options = THUMBNAIL_FORMATS[fmt]
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".part", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                preview.save(f, pil_format, **options)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._account(os.path.getsize(path))
+
+    def _entries(self):
+        """(last use, size, path) of every cached thumbnail"""
+        entries = []
+        try:
+            shards = [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except FileNotFoundError:
+            return entries
+        for shard in shards:
+            with os.scandir(shard) as files:
+                for entry in files:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        entries.append((stat.st_atime, stat.st_size, entry.path))
+        return entries
+
+    def _account(self, added):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._bytes += added
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used thumbnails down to EVICTION_TARGET of the limit"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._bytes = total
+        logging.debug(f"Thumbnail cache: evicted {evicted} thumbnails, {total} bytes left")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """The process-wide cache for the configured directory"""
+    root, max_bytes, _ = get_thumbnail_settings()
+    with _caches_lock:
+        cache = _caches.get(root)
+        if cache is None or cache.max_bytes != max_bytes:
+            cache = _caches[root] = ThumbnailCache(root, max_bytes)
+        return cache
+
+
+def pregeneration_cache():
+    """The cache batches pre-generate thumbnails into, or None when disabled"""
+    if not get_thumbnail_settings()[2]:
+        return None
+    return get_thumbnail_cache()
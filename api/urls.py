@@ -12,6 +12,10 @@ def redirect_root(request):
 urlpatterns = [
     path('', views.startPage, name='startPage'),
     path('photoValidator/', views.process_image, name='photoValidator'),
+    path('photoValidator/stream/', views.stream_upload, name='stream_upload'),
+    path('upload/chunked/', views.chunked_upload_start, name='chunked_upload_start'),
+    path('upload/chunked/<str:upload_id>/', views.chunked_upload_chunk, name='chunked_upload_chunk'),
+    path('upload/chunked/<str:upload_id>/complete/', views.chunked_upload_complete, name='chunked_upload_complete'),
     path('validate/', views.validate_images, name='validate_images'),
     path('displayCsv/',views.display_csv, name ='displayCsv'),
     #path('upload/', views.process_image, name='upload'),
@@ -22,15 +26,21 @@ urlpatterns = [
     path('health/', views.health_check, name='health_check'),
     path('process_rejected_images/', views.process_rejected_images, name='process_rejected_images'),
     path('download_csv/', views.download_and_delete_csv, name='download_csv'),
+    path('download_ndjson/', views.download_results_ndjson, name='download_ndjson'),
     path('download_valid/', views.download_valid_images, name='download_valid_images'),
     path('download_invalid/', views.download_invalid_images, name='download_invalid_images'),
     path('delete_all/', views.delete_all, name='delete_all'),
     path('clear_data/', views.clear_data, name='clear_data'),
     path('invalid_image/<str:filename>/', views.serve_invalid_image, name='serve_invalid_image'),
     path('valid_image/<str:filename>/', views.serve_valid_image, name='serve_valid_image'),
+    path('thumbnail/<str:status>/<str:filename>/', views.serve_thumbnail, name='serve_thumbnail'),
     path('valid_images/', views.valid_images_gallery, name='valid_images_gallery'),
+    path('gallery/images/', views.gallery_api, name='gallery_api'),
     path('validation_report/', views.validation_report, name='validation_report'),
+    path('validation_report/cooccurrence/', views.cooccurrence_report, name='cooccurrence_report'),
     path('test_config_image/', views.test_config_image, name='test_config_image'),
+    path('api/validate/', views.validate_single_image, name='validate_single_image'),
+    path('api/validate/batch/', views.validate_batch, name='validate_batch'),
     # path('image_gallery/<str:pathQuery>/', views.image_gallery, name='image_gallery'),
     # path('process_selected_images/<str:pathQueryTwo>/', views.process_selected_images, name='process_selected_images'),
     # re_path(r'^image_gallery/$', views.image_gallery, name='image_gallery'),
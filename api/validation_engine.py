@@ -0,0 +1,301 @@
+"""
+The validation engine shared by every entry point.
+
+``main_optimized`` (single image) and ``main_threaded`` (batch) both call
+``validate_image`` with a compiled plan, so they run the same checks at the
+same per-check working resolutions and reach the same verdict for the same
+image. They only differ in how the resulting ``ImageReport`` is formatted.
+
+Batches can additionally go through ``PrescreenCascade``: cheap checks run on
+a thumbnail first and only images that survive are decoded at full
+resolution for the face, eye and symmetry analysis.
+
+Interactive single-image validation is about latency rather than
+throughput: given the shared ``get_check_pool()``, ``validate_image`` runs
+the checks of one image in parallel and records their ``CheckSchedule``.
+"""
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .check_registry import (
+    COST_METADATA,
+    ImageContext,
+    compile_plan,
+    get_working_resolutions,
+    thumbnail_scale,
+)
+
+
+class ImageReport:
+    """Per-check results for one image"""
+    def __init__(self, image_name, results, bypassed, processing_time, tier="full", schedule=None):
+        self.image_name = image_name
+        self.results = results
+        self.bypassed = bypassed
+        self.processing_time = processing_time
+        # "prescreen" when the verdict was reached on the thumbnail alone
+        self.tier = tier
+        # CheckSchedule when the checks ran in parallel
+        self.schedule = schedule
+
+    @property
+    def is_valid(self):
+        return all(result.passed for result in self.results)
+
+    @property
+    def load_failed(self):
+        return any(result.name == "load" for result in self.results)
+
+    @property
+    def timed_out(self):
+        return any(result.name == "timeout" for result in self.results)
+
+    @property
+    def messages(self):
+        return [message for result in self.results if not result.passed for message in result.messages]
+
+    @property
+    def reasons(self):
+        """(check name, Reason) for every failure"""
+        return [(result.name, reason) for result in self.results if not result.passed for reason in result.reasons]
+
+    @property
+    def timings(self):
+        return {result.name: result.elapsed for result in self.results}
+
+    def result(self, name):
+        for result in self.results:
+            if result.name == name:
+                return result
+        return None
+
+
+def build_plan(config, max_image_dimension=None):
+    """
+    Compile the plan for config. ``max_image_dimension`` replaces the working
+    resolution of every check that runs downscaled.
+    """
+    overrides = None
+    if max_image_dimension:
+        overrides = {
+            name: max_image_dimension
+            for name, resolution in get_working_resolutions().items()
+            if resolution
+        }
+    return compile_plan(config, get_working_resolutions(overrides))
+
+
+def get_check_pool():
+    """
+    The pool interactive validation runs checks on, shared by all requests;
+    None when ``PHOTO_VALIDATOR_CHECK_WORKERS`` is below 2.
+    """
+    workers = getattr(settings, "PHOTO_VALIDATOR_CHECK_WORKERS", 4)
+    if not workers or workers < 2:
+        return None
+    with _check_pool_lock:
+        if workers not in _check_pools:
+            _check_pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="check")
+        return _check_pools[workers]
+
+
+_check_pools = {}
+_check_pool_lock = threading.Lock()
+
+
+def validate_image(image_path, config, plan=None, deadline=None, data=None, thumbnails=None, executor=None):
+    """
+    Run the plan against one image and return its ImageReport. ``data`` is
+    the encoded image when it is not read from ``image_path``. With a
+    ThumbnailCache as ``thumbnails``, the gallery thumbnail is written from
+    the pixels the checks decoded. With an ``executor`` the checks run in
+    parallel on it.
+    """
+    start_time = time.time()
+    if plan is None:
+        plan = build_plan(config)
+
+    context = ImageContext(image_path, config, deadline, data)
+    schedule = None
+    try:
+        if executor is not None:
+            results, schedule = plan.run_parallel(context, executor)
+        else:
+            results = plan.run(context)
+    finally:
+        if thumbnails is not None:
+            thumbnails.pregenerate(context)
+        context.close()
+
+    return ImageReport(
+        os.path.basename(image_path),
+        results,
+        [check.name for check in plan.bypassed],
+        time.time() - start_time,
+        schedule=schedule,
+    )
+
+
+class PrescreenStats:
+    """Thread-safe counters describing how the pre-screen tier performed"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prescreened = 0
+        self.early_rejected = 0
+        self.escalated = 0
+        # Early rejects that were also run through full analysis
+        self.audited = 0
+        # ...of which full analysis found the image valid
+        self.disagreements = 0
+        # Escalated images whose full analysis failed a pre-screen check
+        self.missed = 0
+
+    def record(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "prescreened": self.prescreened,
+                "early_rejected": self.early_rejected,
+                "escalated": self.escalated,
+                "audited": self.audited,
+                "disagreements": self.disagreements,
+                "disagreement_rate": self.disagreements / self.audited if self.audited else 0.0,
+                "missed": self.missed,
+                "miss_rate": self.missed / self.escalated if self.escalated else 0.0,
+            }
+
+
+class PrescreenCascade:
+    """
+    Two-tier validation. Tier one runs the metadata checks plus the
+    ``prescreen`` checks on a thumbnail; any failure rejects the image
+    without decoding it at full resolution. Everything else is escalated to
+    tier two, which runs the remaining checks at their working resolutions.
+
+    A deterministic ``audit_rate`` fraction of early rejects is escalated
+    anyway so ``stats`` can report how often the thumbnail verdict would have
+    disagreed with full analysis.
+    """
+    def __init__(self, plan, thumbnail_size=256, audit_rate=0.0):
+        self.plan = plan
+        self.tier_one = tuple(
+            check for check in plan.checks if check.cost == COST_METADATA or check.prescreen
+        )
+        self.tier_two = tuple(check for check in plan.checks if check.cost != COST_METADATA)
+        self.prescreen_names = {check.name for check in plan.checks if check.prescreen}
+        self.thumbnail_resolutions = {name: thumbnail_scale(thumbnail_size) for name in self.prescreen_names}
+        self.audit_rate = audit_rate
+        self.stats = PrescreenStats()
+
+    def _audited(self, image_name):
+        return zlib.crc32(image_name.encode("utf-8")) % 10000 < self.audit_rate * 10000
+
+    def validate(self, image_path, config, deadline=None, data=None, thumbnails=None):
+        start_time = time.time()
+        image_name = os.path.basename(image_path)
+        bypassed = [check.name for check in self.plan.bypassed]
+
+        context = ImageContext(image_path, config, deadline, data)
+        try:
+            screen = self.plan.run(context, self.tier_one, self.thumbnail_resolutions)
+            if any(result.name == "load" for result in screen):
+                # The thumbnail decoder gave up; let the full decode decide
+                screen = [result for result in screen
+                          if result.name != "load" and result.name not in self.prescreen_names]
+            if any(result.name == "timeout" for result in screen):
+                return ImageReport(image_name, screen, bypassed, time.time() - start_time, tier="prescreen")
+            rejected = any(not result.passed for result in screen)
+
+            if rejected and not self._audited(image_name):
+                self.stats.record(prescreened=1, early_rejected=1)
+                return ImageReport(image_name, screen, bypassed, time.time() - start_time, tier="prescreen")
+
+            metadata = [result for result in screen if result.name not in self.prescreen_names]
+            full = self.plan.run(context, self.tier_two)
+        finally:
+            # Early rejects included: their pre-screen thumbnail is enough for the gallery
+            if thumbnails is not None:
+                thumbnails.pregenerate(context)
+            context.close()
+
+        report = ImageReport(image_name, metadata + full, bypassed, time.time() - start_time)
+        if rejected:
+            self.stats.record(prescreened=1, early_rejected=1, audited=1, disagreements=int(report.is_valid))
+        else:
+            missed = any(not result.passed for result in full if result.name in self.prescreen_names)
+            self.stats.record(prescreened=1, escalated=1, missed=int(missed))
+        return report
+
+
+def build_cascade(plan):
+    """The batch pre-screen cascade for plan, or None when disabled in settings"""
+    if not getattr(settings, "PHOTO_VALIDATOR_PRESCREEN_ENABLED", True):
+        return None
+    return PrescreenCascade(
+        plan,
+        thumbnail_size=getattr(settings, "PHOTO_VALIDATOR_PRESCREEN_SIZE", 256),
+        audit_rate=getattr(settings, "PHOTO_VALIDATOR_PRESCREEN_AUDIT_RATE", 0.05),
+    )
+
+
+def format_batch_messages(report):
+    """Failure messages, as shown in the galleries and the CSV export"""
+    return report.messages
+
+
+def format_single_report(report, plan):
+    """One line per check, as shown by the configuration test page"""
+    if report.load_failed:
+        return "Failed to load image"
+    corrupted = report.result("corrupted")
+    if corrupted is not None and not corrupted.passed:
+        return "Corrupted image detected"
+
+    lines = ["Bypassed " + check.label.lower() + " check" for check in plan.bypassed]
+    for result in report.results:
+        line = f"{result.label} check: {'Passed' if result.passed else 'Failed'}"
+        if result.details:
+            line = line + f" ({result.details})"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def _plain(value):
+    """NumPy scalars as plain numbers, so the report serializes as JSON"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def format_json_report(report):
+    """Structured verdicts, metrics and timings per check, as returned by the JSON API"""
+    return {
+        "image": report.image_name,
+        "valid": report.is_valid,
+        "tier": report.tier,
+        "processing_time": report.processing_time,
+        "checks": [
+            {
+                "name": result.name,
+                "label": result.label,
+                "passed": result.passed,
+                "details": result.details,
+                "reasons": [
+                    {"code": reason.code, "message": reason.render(), "params": reason.params}
+                    for reason in result.reasons
+                ],
+                "metrics": {metric: _plain(value) for metric, value in result.metrics.items()},
+                "elapsed": result.elapsed,
+            }
+            for result in report.results
+        ],
+        "bypassed": report.bypassed,
+        "schedule": report.schedule.describe() if report.schedule is not None else None,
+    }
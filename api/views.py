@@ -1,37 +1,8 @@
 def clear_data(request):
     """Clear all uploaded and tested images and cache for a fresh start."""
     if request.method == "POST":
-        # Remove media/photos and media/photos/valid
-        media_photos = os.path.join(settings.MEDIA_ROOT, "photos")
-        if os.path.exists(media_photos):
-            try:
-                shutil.rmtree(media_photos)
-            except Exception as e:
-                logging.error(f"Error deleting media/photos: {e}")
-
-        # Remove media/photo_folder (contains uploaded ZIP files)
-        media_photo_folder = os.path.join(settings.MEDIA_ROOT, "photo_folder")
-        if os.path.exists(media_photo_folder):
-            try:
-                shutil.rmtree(media_photo_folder)
-            except Exception as e:
-                logging.error(f"Error deleting media/photo_folder: {e}")
-
-        # Remove api/static/api/images/invalid and result.csv
-        invalid_folder = os.path.join(settings.BASE_DIR, "api", "static", "api", "images", "invalid")
-        result_file = os.path.join(settings.BASE_DIR, "api", "static", "api", "images", "result.csv")
-        if os.path.exists(invalid_folder):
-            try:
-                shutil.rmtree(invalid_folder)
-            except Exception as e:
-                logging.error(f"Error deleting invalid images folder: {e}")
-        if not os.path.exists(invalid_folder):
-            os.makedirs(invalid_folder, exist_ok=True)
-        if os.path.exists(result_file):
-            try:
-                os.remove(result_file)
-            except Exception as e:
-                logging.error(f"Error deleting result.csv: {e}")
+        # Remove this session's batch workspace and uploaded ZIP; other batches are left alone
+        _delete_session_batch(request)
 
         # Optionally clear session data
         request.session.flush()
@@ -52,23 +23,49 @@ import logging
 import os
 from django.conf import settings
 from django import forms
-from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.urls import NoReverseMatch, reverse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.datastructures import MultiValueDict
+from django.views.decorators.csrf import csrf_exempt
 
-from api.photo_validator_threaded import main_threaded
+from api.photo_validator_threaded import finish_progress, get_progress, main_threaded
+from api.batch_sources import ZipSource
+from api.streaming_upload import StreamingUploadHandler, get_streaming_batch, start_streaming_batch
+from api.chunked_upload import ChunkedUpload, ChunkedUploadError
+from api.file_commit import COMMIT_EXISTS
+from api.workspace import BatchWorkspace
+from api.check_registry import REASONS, reason_label
+from api.report_analytics import cooccurrence_analytics
+from api.report_export import CSV_CONTENT_TYPE, NDJSON_CONTENT_TYPE, iter_csv, iter_ndjson
+from api.zip_export import iter_zip
+from api.http_cache import batch_url, conditional_response, is_batch_pinned, serve_file, with_validators
+from api.thumbnails import (
+    DEFAULT_THUMBNAIL_FORMAT,
+    DEFAULT_THUMBNAIL_SIZE,
+    get_thumbnail_cache,
+    thumbnail_size,
+    webp_supported,
+)
+from api.results_store import STATUS_INVALID, STATUS_QUARANTINED, STATUS_VALID, empty_aggregates
 from api.forms import PhotoFolderUploadForm
-from api.config_utils import get_or_create_config, warm_config_cache, clear_config_cache
+from api.config_utils import get_cached_config, get_or_create_config, warm_config_cache, clear_config_cache
+from api.single_image import SingleImageError, read_image, validate_bytes
+from api.batch_api import BatchRequestError, iter_batch_ndjson, parse_batch_request
+from api.validation_engine import build_plan, format_json_report, format_single_report
 
 # import api.tinkerdirectory as tinker
 from .models import PhotoFolder
 
 # import urllib.parse
+import base64
+import mimetypes
 import shutil
 import zipfile
 import json
 import threading
 import time
-from collections import Counter
 
 def health_check(request):
     return HttpResponse("OK")
@@ -105,6 +102,49 @@ def startPage(request):
 # def dialogueBox(request):
 
 
+def _delete_session_batch(request):
+    """Remove the session's batch workspace and its uploaded archive, if any"""
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is not None:
+        workspace.delete()
+    archive_path = request.session.pop("archive_path", None)
+    if archive_path and os.path.exists(archive_path):
+        try:
+            os.remove(archive_path)
+        except Exception as e:
+            logging.error(f"Error deleting uploaded archive: {e}")
+
+
+def _register_archive_upload(request, archive_path, upload_name):
+    """
+    Make an uploaded ZIP the session's batch; returns its number of images
+    and the central-directory pre-screen summary. The archive is not
+    extracted: validation reads its members in place and only the results
+    are written, into a new workspace for the batch.
+    """
+    # Check if the archive contains any image files; only the central directory is read
+    source = ZipSource(archive_path, warm_config_cache())
+    try:
+        image_files = source.list_images()
+        prescreen = source.prescreen.summary()
+    finally:
+        source.close()
+    logging.debug(f"Found {len(image_files)} image files in {archive_path}, pre-screen: {prescreen}")
+    if not image_files and not prescreen["rejected"]:
+        raise Exception(f"No image files found in {upload_name}")
+
+    workspace = BatchWorkspace.create()
+    logging.debug(f"Validating images from archive {archive_path} into batch {workspace.batch_id}")
+    workspace.bind(request)
+    request.session["archive_path"] = archive_path
+
+    # Store total count in session for later use
+    total_images = len(image_files) + prescreen["rejected"]
+    request.session["total_images_count"] = total_images
+    logging.debug(f"Stored total images count in session: {total_images}")
+    return total_images, prescreen
+
+
 def process_image(request):
     config = warm_config_cache()
 
@@ -112,104 +152,19 @@ def process_image(request):
         form = PhotoFolderUploadForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                # get the uploaded zip file and extract it
+                # get the uploaded zip file; saving the model stores it under media/photo_folder
                 folder = form.cleaned_data["folder"]
                 photo_folder = PhotoFolder(folder=folder)
                 photo_folder.save()
-                
-                # Ensure media directories exist
-                media_root = settings.MEDIA_ROOT
-                if not os.path.exists(media_root):
-                    os.makedirs(media_root)
-                
-                photo_folder_dir = os.path.join(media_root, "photo_folder")
-                if not os.path.exists(photo_folder_dir):
-                    os.makedirs(photo_folder_dir)
-                
-                photos_dir = os.path.join(media_root, "photos")
-                if not os.path.exists(photos_dir):
-                    os.makedirs(photos_dir)
-                
-                # Save the uploaded file to disk
-                folder_path = os.path.join(photo_folder_dir, folder.name)
-                logging.debug(f"Saving uploaded file to: {folder_path}")
-                with open(folder_path, 'wb+') as destination:
-                    for chunk in folder.chunks():
-                        destination.write(chunk)
-                
-                # Extract the ZIP file
-                logging.debug(f"Extracting ZIP file from: {folder_path} to: {photos_dir}")
-                with zipfile.ZipFile(folder_path, "r") as zip_ref:
-                    zip_ref.extractall(photos_dir)
-                
-                # List contents after extraction
-                logging.debug(f"Contents of photos_dir after extraction: {os.listdir(photos_dir)}")
+                archive_path = photo_folder.folder.path
+                logging.debug(f"Saved uploaded archive to: {archive_path}")
 
-                # Determine the extracted folder path
-                extracted_folder_name = os.path.splitext(folder.name)[0]
-                path = os.path.join(photos_dir, extracted_folder_name)
-                logging.debug(f"Initial path assumption: {path}")
-                
-                # Check if the extracted path exists
-                if not os.path.exists(path):
-                    logging.debug(f"Path {path} does not exist, checking for direct image files")
-                    # Check if images were extracted directly to photos_dir (no subfolder)
-                    image_files = [f for f in os.listdir(photos_dir) 
-                                 if os.path.isfile(os.path.join(photos_dir, f)) 
-                                 and f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif'))]
-                    
-                    logging.debug(f"Found {len(image_files)} image files directly in photos_dir: {image_files}")
-                    
-                    if image_files:
-                        # Images were extracted directly, use photos_dir as the path
-                        path = photos_dir
-                        logging.debug(f"Using photos_dir as path: {path}")
-                    else:
-                        logging.debug("No direct image files found, checking subdirectories")
-                        # Try to find the extracted content in subdirectories
-                        for item in os.listdir(photos_dir):
-                            item_path = os.path.join(photos_dir, item)
-                            if os.path.isdir(item_path) and item.startswith(extracted_folder_name):
-                                path = item_path
-                                logging.debug(f"Found matching subdirectory: {path}")
-                                break
-                        else:
-                            # If still not found, create the directory
-                            logging.debug(f"No matching subdirectory found, creating: {path}")
-                            os.makedirs(path, exist_ok=True)
-                else:
-                    logging.debug(f"Path {path} exists")
-                
-                # Ensure the invalid images directory exists
-                invalid_images_dir = os.path.join(
-                    settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-                )
-                if not os.path.exists(invalid_images_dir):
-                    os.makedirs(invalid_images_dir)
-                
-                # processing the image
-                logging.debug(f"Validating images from path: {path}")
-                request.session["path"] = path
-                
-                # Check if path contains any image files
-                total_images = 0
-                if os.path.exists(path):
-                    files_in_path = os.listdir(path)
-                    image_files = [f for f in files_in_path 
-                                 if os.path.isfile(os.path.join(path, f)) 
-                                 and f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif'))]
-                    logging.debug(f"Found {len(image_files)} image files in {path}")
-                    if not image_files:
-                        raise Exception(f"No image files found in {path}. Available files: {files_in_path}")
-                    
-                    # Store total count in session for later use
-                    total_images = len(image_files)
-                    request.session["total_images_count"] = total_images
-                    logging.debug(f"Stored total images count in session: {total_images}")
+                total_images, prescreen = _register_archive_upload(request, archive_path, folder.name)
 
                 return JsonResponse({
                     "status": "uploaded",
                     "total_images": total_images,
+                    "prescreen": prescreen,
                 })
                 
             except Exception as e:
@@ -238,24 +193,45 @@ def process_image(request):
 
 
 def validate_images(request):
+    """
+    Validate the session's batch. The response is NDJSON: a ``progress``
+    line (a ProgressTracker snapshot) every PROGRESS_INTERVAL seconds while
+    the batch runs, then one line with the result, status ``ok`` or ``error``.
+    """
     if request.method != "POST":
         return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
 
-    path = request.session.get("path")
-    if not path or not os.path.exists(path):
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
         return JsonResponse({"status": "error", "message": "No upload session found"}, status=400)
-
-    def run_validation(zip_path):
+    archive_path = request.session.get("archive_path")
+    if archive_path and not os.path.exists(archive_path):
+        return JsonResponse({"status": "error", "message": "Uploaded archive not found"}, status=400)
+    streaming_batch = get_streaming_batch(workspace.batch_id)
+
+    def run_validation(workspace):
+        if streaming_batch is not None:
+            # Validation started while the upload was arriving; collect its result
+            return streaming_batch.wait()
         config = warm_config_cache()
-        return main_threaded(zip_path, config=config)
+        if not archive_path:
+            return main_threaded(workspace.input_dir, config=config, workspace=workspace)
+        # Members are decoded straight from the archive; only the outputs are written
+        source = ZipSource(archive_path, config)
+        try:
+            return main_threaded(workspace.input_dir, config=config, source=source, workspace=workspace)
+        finally:
+            source.close()
 
-    def process_in_thread(result_container, zip_path):
+    def process_in_thread(result_container, workspace):
         try:
-            result_container["data"] = run_validation(zip_path)
+            result_container["data"] = run_validation(workspace)
             result_container["done"] = True
         except Exception as e:
             result_container["error"] = str(e)
             result_container["done"] = True
+        # Progress readers stop here, whatever happened
+        finish_progress(workspace.batch_id, result_container["error"])
 
     result_container = {
         "done": False,
@@ -265,7 +241,7 @@ def validate_images(request):
 
     thread = threading.Thread(
         target=process_in_thread,
-        args=(result_container, path),
+        args=(result_container, workspace),
         daemon=True,
     )
     thread.start()
@@ -273,12 +249,20 @@ def validate_images(request):
     total_images = request.session.get("total_images_count", 0)
 
     def stream():
+        # The batch's progress, read from its ProgressTracker in this process,
+        # goes out on this same response rather than on a second request
         while not result_container["done"]:
-            yield " "
-            time.sleep(1)
+            tracker = get_progress(workspace.batch_id)
+            if tracker is None or tracker.finished:
+                # Validation has not started yet (a finished tracker is a previous run's)
+                progress = {"status": "waiting"}
+            else:
+                progress = tracker.snapshot()
+            yield json.dumps({"status": "progress", "progress": progress}) + "\n"
+            time.sleep(PROGRESS_INTERVAL)
 
         if result_container["error"]:
-            yield json.dumps({"status": "error", "message": result_container["error"]})
+            yield json.dumps({"status": "error", "message": result_container["error"]}) + "\n"
         else:
             results = result_container["data"] or {}
             yield json.dumps({
@@ -286,9 +270,159 @@ def validate_images(request):
                 "total_images": total_images,
                 "valid_count": results.get("valid_count", 0),
                 "invalid_count": results.get("invalid_count", 0),
-            })
+            }) + "\n"
+
+    response = StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+    response["Cache-Control"] = "no-cache"
+    # Proxies must pass progress lines on as they come
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# Seconds between the progress lines of validate_images
+PROGRESS_INTERVAL = 0.5
+
+
+def _csrf_failure_before_body(request):
+    """
+    The CSRF middleware's verdict on a request whose body must not be read
+    yet: with an empty POST standing in for the body, the token is taken from
+    the X-CSRFToken header. None when the request passes, else the 403.
+    """
+    request._post, request._files = QueryDict(), MultiValueDict()
+    try:
+        return CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+    finally:
+        del request._post, request._files
+
+
+@csrf_exempt
+def stream_upload(request):
+    """
+    Upload a ZIP file, or any number of image files, and validate them while
+    the request body is still arriving. ``?append=1`` adds the files to the
+    session's open batch, ``?final=0`` keeps the batch open for more requests
+    (e.g. a client uploading files one request at a time). Results are
+    collected with validate_images as usual. A failed upload aborts its
+    batch.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    # The handler has to be in place before anything reads request.POST/FILES,
+    # so CSRF is checked from the header alone, before a batch exists
+    csrf_failure = _csrf_failure_before_body(request)
+    if csrf_failure is not None:
+        return csrf_failure
+    if not request.content_type.startswith("multipart/"):
+        return JsonResponse({"status": "error", "message": "Expected a multipart upload"}, status=415)
+
+    final = request.GET.get("final", "1") != "0"
+    if request.GET.get("append"):
+        workspace = BatchWorkspace.from_session(request)
+        batch = get_streaming_batch(workspace.batch_id) if workspace is not None else None
+        if batch is None or batch.source.finished:
+            return JsonResponse({"status": "error", "message": "No open upload batch"}, status=400)
+    else:
+        batch = start_streaming_batch(BatchWorkspace.create(), warm_config_cache())
+
+    request.upload_handlers = [StreamingUploadHandler(batch.source, request)]
+    try:
+        # Parsing the body is what feeds the batch, member by member
+        request.FILES
+    except Exception as e:
+        logging.error(f"Error in stream_upload: {e}")
+        batch.abort(str(e))
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if final:
+        batch.source.finish()
+
+    batch.workspace.bind(request)
+    request.session.pop("archive_path", None)
+    total_images = batch.source.received + len(batch.source.rejected)
+    request.session["total_images_count"] = total_images
+    return JsonResponse({
+        "status": "uploaded",
+        "total_images": total_images,
+        "prescreen": batch.source.prescreen.summary(),
+    })
+
+
+def _chunked_upload_error(e):
+    data = {"status": "error", "message": str(e)}
+    if e.offset is not None:
+        data["offset"] = e.offset
+    return JsonResponse(data, status=e.status)
+
+
+@csrf_exempt
+def chunked_upload_start(request):
+    """Create a resumable upload: JSON body {"filename": ..., "size": ...}"""
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    try:
+        data = json.loads(request.body or b"{}")
+        upload = ChunkedUpload.create(data.get("filename"), int(data.get("size") or 0))
+    except (ValueError, TypeError):
+        return JsonResponse({"status": "error", "message": "Invalid JSON body"}, status=400)
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return JsonResponse(upload.status(), status=201)
+
 
-    return StreamingHttpResponse(stream(), content_type="application/json")
+@csrf_exempt
+def chunked_upload_chunk(request, upload_id):
+    """
+    GET: where to resume. PUT: append one chunk; the raw request body is the
+    chunk, ``Upload-Offset`` the byte it starts at and ``X-Chunk-SHA256`` its
+    checksum. A mismatching offset answers 409 with the offset to resume from.
+    """
+    try:
+        upload = ChunkedUpload.load(upload_id)
+        if request.method == "GET":
+            return JsonResponse(upload.status())
+        if request.method != "PUT":
+            return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            length = int(request.headers.get("Content-Length", ""))
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Upload-Offset and Content-Length are required"},
+                                status=400)
+        upload.append(request, offset, length, request.headers.get("X-Chunk-SHA256"))
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return JsonResponse(upload.status())
+
+
+@csrf_exempt
+def chunked_upload_complete(request, upload_id):
+    """
+    Hand a fully received upload to the validation pipeline, like
+    process_image. This makes it the session's batch, so unlike the chunk
+    views it needs the CSRF token (X-CSRFToken header).
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    csrf_failure = _csrf_failure_before_body(request)
+    if csrf_failure is not None:
+        return csrf_failure
+    try:
+        name, archive_path = ChunkedUpload.load(upload_id).complete()
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+
+    try:
+        # The model row points at the renamed file; nothing is copied
+        PhotoFolder(folder=name).save()
+        total_images, prescreen = _register_archive_upload(request, archive_path, os.path.basename(name))
+    except Exception as e:
+        logging.error(f"Error in chunked_upload_complete: {e}")
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return JsonResponse({
+        "status": "uploaded",
+        "total_images": total_images,
+        "prescreen": prescreen,
+    })
 
 
 # def process_image(request):
@@ -387,55 +521,15 @@ def save_config(request):
         return HttpResponse("Method not allowed", status=405)
 
 
-def _list_image_files(directory_path):
-    if not directory_path or not os.path.exists(directory_path):
-        return []
-    return sorted(
-        [
-            filename
-            for filename in os.listdir(directory_path)
-            if filename.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp"))
-        ]
-    )
-
-
 def _build_validation_report(request):
-    path = request.session.get("path")
-    valid_directory = os.path.join(path, "valid") if path else None
-    invalid_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    result_file = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-    )
-
-    valid_images = _list_image_files(valid_directory)
-    invalid_images = _list_image_files(invalid_directory)
-
-    invalid_reasons_by_image = {}
-    if os.path.exists(result_file):
-        with open(result_file, "r", encoding="utf-8") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if not row:
-                    continue
-                image_filename = row[0].strip()
-                if not image_filename or image_filename.startswith("#"):
-                    continue
-                reasons = [reason.strip() for reason in row[1:] if reason and reason.strip()]
-                invalid_reasons_by_image[image_filename] = reasons or ["Issue details unavailable"]
-
-    invalid_records = []
-    for filename in invalid_images:
-        invalid_records.append(
-            {
-                "filename": filename,
-                "reasons": invalid_reasons_by_image.get(filename, ["Issue details unavailable"]),
-            }
-        )
-
-    valid_count = len(valid_images)
-    invalid_count = len(invalid_records)
+    # Everything comes from the aggregates the engine maintains as results are
+    # stored, so the cost does not grow with the batch, running or finished
+    workspace = BatchWorkspace.from_session(request)
+    aggregates = workspace.results.aggregates() if workspace else empty_aggregates()
+
+    statuses = aggregates["statuses"]
+    valid_count = statuses.get(STATUS_VALID, 0)
+    invalid_count = statuses.get(STATUS_INVALID, 0) + statuses.get(STATUS_QUARANTINED, 0)
     computed_total = valid_count + invalid_count
     session_total = request.session.get("total_images_count", 0)
     total_images = max(session_total, computed_total)
@@ -443,22 +537,15 @@ def _build_validation_report(request):
     valid_percentage = round((valid_count / total_images) * 100, 1) if total_images else 0.0
     invalid_percentage = round((invalid_count / total_images) * 100, 1) if total_images else 0.0
 
-    issue_image_counter = Counter()
-    issue_occurrence_counter = Counter()
-    for invalid_record in invalid_records:
-        unique_issues = set(invalid_record["reasons"])
-        for issue in unique_issues:
-            issue_image_counter[issue] += 1
-        for issue in invalid_record["reasons"]:
-            issue_occurrence_counter[issue] += 1
-
-    total_issue_occurrences = sum(issue_occurrence_counter.values())
+    # Issues are counted by reason code, so parameters (a measured size, a
+    # confidence) never split one issue into many; labels are only for display
+    total_issue_occurrences = sum(occurrences for _, _, occurrences in aggregates["reasons"])
     issue_distribution = []
-    for issue, affected_images in issue_image_counter.most_common():
-        occurrence_count = issue_occurrence_counter[issue]
+    for code, affected_images, occurrence_count in aggregates["reasons"]:
         issue_distribution.append(
             {
-                "issue": issue,
+                "issue": reason_label(code),
+                "code": code,
                 "affected_images": affected_images,
                 "affected_images_pct": round((affected_images / invalid_count) * 100, 1) if invalid_count else 0.0,
                 "occurrence_count": occurrence_count,
@@ -471,6 +558,7 @@ def _build_validation_report(request):
     top_issue_distribution = issue_distribution[:8]
 
     # Pareto data: issue count + cumulative contribution percentage
+    pareto_codes = [item["code"] for item in top_issue_distribution]
     pareto_labels = [item["issue"] for item in top_issue_distribution]
     pareto_values = [item["affected_images"] for item in top_issue_distribution]
     pareto_total = sum(pareto_values)
@@ -480,33 +568,34 @@ def _build_validation_report(request):
         running_total += value
         pareto_cumulative.append(round((running_total / pareto_total) * 100, 1) if pareto_total else 0.0)
 
-    # Co-occurrence matrix for top issues
-    cooccurrence_issues = pareto_labels[:6]
-    issue_index = {issue: idx for idx, issue in enumerate(cooccurrence_issues)}
-    matrix_size = len(cooccurrence_issues)
-    cooccurrence_matrix = [[0 for _ in range(matrix_size)] for _ in range(matrix_size)]
-
-    for invalid_record in invalid_records:
-        present_issues = [issue for issue in set(invalid_record["reasons"]) if issue in issue_index]
-        for issue in present_issues:
-            idx = issue_index[issue]
-            cooccurrence_matrix[idx][idx] += 1
-
-        for i in range(len(present_issues)):
-            for j in range(i + 1, len(present_issues)):
-                idx_i = issue_index[present_issues[i]]
-                idx_j = issue_index[present_issues[j]]
-                cooccurrence_matrix[idx_i][idx_j] += 1
-                cooccurrence_matrix[idx_j][idx_i] += 1
+    # Co-occurrence matrix for top issues; the diagonal is each issue's own count
+    cooccurrence_issues = pareto_codes[:6]
+    cooccurrence_matrix = []
+    for i, code_i in enumerate(cooccurrence_issues):
+        row = []
+        for j, code_j in enumerate(cooccurrence_issues):
+            if i == j:
+                row.append(pareto_values[i])
+            else:
+                row.append(aggregates["pairs"].get((code_i, code_j)) or aggregates["pairs"].get((code_j, code_i), 0))
+        cooccurrence_matrix.append(row)
 
     cooccurrence_max = 0
     for row in cooccurrence_matrix:
         if row:
             cooccurrence_max = max(cooccurrence_max, max(row))
 
+    metric_histograms = {
+        metric: {
+            "labels": [f"{start:g}-{end:g}" for start, end, _ in buckets],
+            "values": [images for _, _, images in buckets],
+        }
+        for metric, buckets in aggregates["histograms"].items()
+    }
+
     return {
         "has_data": total_images > 0,
-        "path_found": bool(path and os.path.exists(path)),
+        "path_found": workspace is not None,
         "total_images": total_images,
         "valid_count": valid_count,
         "invalid_count": invalid_count,
@@ -514,15 +603,15 @@ def _build_validation_report(request):
         "invalid_percentage": invalid_percentage,
         "issue_distribution": issue_distribution,
         "top_issue_distribution": top_issue_distribution,
-        "invalid_records": invalid_records,
         "issue_labels_json": json.dumps([item["issue"] for item in top_issue_distribution]),
         "issue_values_json": json.dumps([item["affected_images"] for item in top_issue_distribution]),
         "pareto_labels_json": json.dumps(pareto_labels),
         "pareto_values_json": json.dumps(pareto_values),
         "pareto_cumulative_json": json.dumps(pareto_cumulative),
-        "cooccurrence_labels_json": json.dumps(cooccurrence_issues),
+        "cooccurrence_labels_json": json.dumps([reason_label(code) for code in cooccurrence_issues]),
         "cooccurrence_matrix_json": json.dumps(cooccurrence_matrix),
         "cooccurrence_max": cooccurrence_max,
+        "metric_histograms_json": json.dumps(metric_histograms),
         "status_labels_json": json.dumps(["Valid", "Invalid"]),
         "status_values_json": json.dumps([valid_count, invalid_count]),
     }
@@ -533,290 +622,239 @@ def validation_report(request):
     return render(request, "api/validation_report.html", report)
 
 
-def image_gallery(request):
-    invalid_images_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
+def cooccurrence_report(request):
+    """Full reason co-occurrence, conditional failure rates and check correlations as JSON"""
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        return JsonResponse({"status": "error", "message": "No batch found"}, status=404)
+    results = workspace.results
+    total_images = max(request.session.get("total_images_count", 0), sum(results.counts().values()))
+    return JsonResponse(cooccurrence_analytics(results.mask_counts(), total_images))
 
-    # read the reasons for invalidity from the results.csv file
-    result_file = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-    )
-    reasons_for_invalidity = {}  # a dict
 
-    logging.debug(f"Looking for invalid images in: {invalid_images_directory}")
-    logging.debug(f"Looking for result file at: {result_file}")
+# Gallery pages are fetched from gallery_api as the user scrolls
+GALLERY_PAGE_SIZE = 60
+GALLERY_MAX_PAGE_SIZE = 200
+GALLERY_IMAGE_URLS = {
+    STATUS_INVALID: "serve_invalid_image",
+    STATUS_VALID: "serve_valid_image",
+}
 
-    # Check if directories exist
-    if not os.path.exists(invalid_images_directory):
-        logging.error(f"Invalid images directory does not exist: {invalid_images_directory}")
-    else:
-        logging.debug(f"Invalid images directory exists, contents: {os.listdir(invalid_images_directory)}")
 
-    if not os.path.exists(result_file):
-        logging.error(f"Result file does not exist: {result_file}")
-    else:
-        logging.debug(f"Result file exists")
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
 
+
+def _decode_cursor(cursor):
+    """The sort key in an opaque cursor; ValueError if it is not one of ours"""
     try:
-        with open(result_file, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if len(row) > 0:  # Skip empty rows
-                    image_filename = row[0]  # The image filename is in the first column
-                    reasons = row[1:]  # Initialize the list of reasons
-                    reasons_for_invalidity[image_filename] = reasons
-                    logging.debug(f"Found invalid image: {image_filename} with reasons: {reasons}")
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
     except Exception as e:
-        logging.error(f"Error reading result file: {e}")
-
-    # First, collect all image files
-    images = []
-    if os.path.exists(invalid_images_directory):
-        for filename in os.listdir(invalid_images_directory):
-            if (
-                filename.endswith(".jpg")
-                or filename.endswith(".jpeg")
-                or filename.endswith(".png")
-                or filename.endswith(".PNG")
-                or filename.endswith(".JPG")
-            ):
-                images.append(os.path.join(invalid_images_directory, filename))
-                logging.debug(f"Added image to gallery: {filename}")
-
-    logging.debug(f"Total images found for gallery: {len(images)}")
-    logging.debug(f"Images list: {images}")
-
-    # Create the context that the template expects
-    invalid_images = []
-    for image_path in images:
-        filename = os.path.basename(image_path)
-        # Convert file path to URL path for web access
-        # Use a direct URL to serve images from the invalid directory
-        image_url = f"/invalid_image/{filename}"
-        logging.debug(f"Generated URL for {filename}: {image_url}")
-        
-        # Create a mock object that the template expects
-        image_obj = type('Image', (), {
-            'id': filename,
-            'filename': filename,
-            'photo': type('Photo', (), {'url': image_url})(),
-            'reason_array': reasons_for_invalidity.get(filename, [])
-        })()
-        invalid_images.append(image_obj)
-
-    # Calculate total images count
-    invalid_count = len(invalid_images)
-    
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or not 1 <= len(key) <= 2:
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def _gallery_filters(workspace):
+    """(reason code, label) and metric names the gallery can filter and sort by"""
+    aggregates = workspace.results.aggregates()
+    reasons = [(code, reason_label(code)) for code, _, _ in aggregates["reasons"]]
+    return reasons, sorted(aggregates["histograms"])
+
+
+def _gallery_url(view_name, args, workspace):
+    """The batch URL of an image view, or None for a name the view cannot serve"""
+    try:
+        return batch_url(reverse(view_name, args=args), workspace.batch_id)
+    except NoReverseMatch:
+        return None
+
+
+def gallery_api(request):
+    """
+    One page of a batch's images as JSON.
+
+    Query parameters: ``status`` (invalid or valid), ``reason`` (a reason
+    code), ``sort`` (a metric name; name order by default), ``order`` (asc
+    or desc), ``limit`` and ``cursor`` (``next_cursor`` of the previous page).
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        return JsonResponse({"status": "error", "message": "No batch found"}, status=404)
+
+    status = request.GET.get("status", STATUS_INVALID)
+    if status not in GALLERY_IMAGE_URLS:
+        return JsonResponse({"status": "error", "message": f"Unknown status: {status}"}, status=400)
+    reason = request.GET.get("reason") or None
+    if reason is not None and reason not in REASONS:
+        return JsonResponse({"status": "error", "message": f"Unknown reason code: {reason}"}, status=400)
+    sort = request.GET.get("sort") or None
+    descending = request.GET.get("order") == "desc"
+    try:
+        limit = min(max(int(request.GET.get("limit", GALLERY_PAGE_SIZE)), 1), GALLERY_MAX_PAGE_SIZE)
+        cursor = request.GET.get("cursor")
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    if after is not None and len(after) != (1 if sort is None else 2):
+        return JsonResponse({"status": "error", "message": "Cursor does not match the sort order"}, status=400)
+
+    results = workspace.results
+    entries, next_after = results.page(status, limit, after, reason, sort, descending)
+    # URLs name the batch so the browser may cache the images for good
+    for entry in entries:
+        entry["url"] = _gallery_url(GALLERY_IMAGE_URLS[status], [entry["name"]], workspace)
+        entry["thumbnail_url"] = _gallery_url("serve_thumbnail", [status, entry["name"]], workspace)
+    return JsonResponse({
+        "images": entries,
+        "next_cursor": _encode_cursor(next_after) if next_after is not None else None,
+        "total": results.counts().get(status, 0),
+    })
+
+
+def image_gallery(request):
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        return HttpResponse("No validation session found", status=400)
+
+    counts = workspace.results.counts()
+    invalid_count = counts.get(STATUS_INVALID, 0)
     # Get total count from session (stored during initial processing)
-    total_images = request.session.get("total_images_count", 0)
-    
-    # If session doesn't have the count, calculate from current state
-    if total_images == 0:
-        # Count valid images from the session path if available
-        valid_count = 0
-        path = request.session.get("path")
-        if path:
-            valid_directory = os.path.join(path, "valid")
-            if os.path.exists(valid_directory):
-                for filename in os.listdir(valid_directory):
-                    if filename.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp")):
-                        valid_count += 1
-        total_images = valid_count + invalid_count
-    
-    # Add logging for debugging
-    logging.debug(f"Invalid images count: {invalid_count}")
-    logging.debug(f"Total images count from session: {total_images}")
+    total_images = request.session.get("total_images_count", 0) or sum(counts.values())
+    reason_options, sort_options = _gallery_filters(workspace)
 
     context = {
-        "invalid_images": invalid_images,
-        "reasons_for_invalidity": reasons_for_invalidity,
+        "invalid_count": invalid_count,
         "total_images": total_images,
+        "reason_options": reason_options,
+        "sort_options": sort_options,
+        "page_size": GALLERY_PAGE_SIZE,
     }
-
-    logging.debug(f"Final context - invalid_images count: {len(invalid_images)}")
-    for img in invalid_images:
-        logging.debug(f"  - {img.filename}: {img.photo.url}")
-
     return render(request, "api/image_gallery.html", context)
 
 
 def valid_images_gallery(request):
     """Show valid images that passed validation"""
-    path = request.session.get("path")
-    if not path:
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
         return HttpResponse("No validation session found", status=400)
-    
-    valid_directory = os.path.join(path, "valid")
-    valid_images = []
-    
-    if os.path.exists(valid_directory):
-        for filename in os.listdir(valid_directory):
-            if (
-                filename.endswith(".jpg")
-                or filename.endswith(".jpeg")
-                or filename.endswith(".png")
-                or filename.endswith(".PNG")
-                or filename.endswith(".JPG")
-            ):
-                # Create a mock object for valid images
-                image_obj = type('Image', (), {
-                    'id': filename,
-                    'filename': filename,
-                    'photo': type('Photo', (), {'url': f"/valid_image/{filename}"})(),
-                    'reason_array': ['Passed all validation checks']
-                })()
-                valid_images.append(image_obj)
-    
-    # Calculate total images and success rate
-    valid_count = len(valid_images)
-    
+
+    counts = workspace.results.counts()
+    valid_count = counts.get(STATUS_VALID, 0)
     # Get total count from session (stored during initial processing)
-    total_images = request.session.get("total_images_count", 0)
-    
-    # If session doesn't have the count, calculate from current state
-    if total_images == 0:
-        invalid_count = 0
-        # Count invalid images from the invalid directory
-        invalid_directory = os.path.join(
-            settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-        )
-        if os.path.exists(invalid_directory):
-            for filename in os.listdir(invalid_directory):
-                if filename.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp")):
-                    invalid_count += 1
-        total_images = valid_count + invalid_count
-    
-    # Add logging for debugging
-    logging.debug(f"Valid images count: {valid_count}")
-    logging.debug(f"Total images count from session: {total_images}")
-    
+    total_images = request.session.get("total_images_count", 0) or sum(counts.values())
+
     # Calculate success rate
     if total_images > 0:
-        success_rate = round((len(valid_images) / total_images) * 100, 1)
+        success_rate = round((valid_count / total_images) * 100, 1)
     else:
         success_rate = 0.0
-    
+
+    _, sort_options = _gallery_filters(workspace)
     context = {
-        "valid_images": valid_images,
+        "valid_count": valid_count,
         "title": "Valid Images Gallery",
         "total_images": total_images,
-        "success_rate": success_rate
+        "success_rate": success_rate,
+        "sort_options": sort_options,
+        "page_size": GALLERY_PAGE_SIZE,
     }
-    
     return render(request, "api/valid_images_gallery.html", context)
 
 
+def _serve_store_image(request, store, filename, batch_id):
+    if not store.exists(filename):
+        raise Http404(f"Image {filename} not found")
+    image_path = store.path(filename)
+    # Determine content type
+    content_type, _ = mimetypes.guess_type(image_path)
+    if content_type is None:
+        content_type = 'application/octet-stream'
+    return serve_file(request, image_path, content_type, filename, immutable=is_batch_pinned(request, batch_id))
+
+
 def serve_valid_image(request, filename):
     """Serve valid images directly"""
-    from django.http import FileResponse
-    import mimetypes
-    
-    path = request.session.get("path")
-    if not path:
-        from django.http import Http404
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
         raise Http404("No validation session found")
-    
-    valid_directory = os.path.join(path, "valid")
-    image_path = os.path.join(valid_directory, filename)
-    
-    if os.path.exists(image_path):
-        # Determine content type
-        content_type, _ = mimetypes.guess_type(image_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Serve the file
-        response = FileResponse(open(image_path, 'rb'), content_type=content_type)
-        response['Content-Disposition'] = f'inline; filename="{filename}"'
-        return response
-    else:
-        from django.http import Http404
-        raise Http404(f"Image {filename} not found")
+    return _serve_store_image(request, workspace.valid_store, filename, workspace.batch_id)
 
 
 def serve_invalid_image(request, filename):
     """Serve invalid images directly"""
-    from django.http import FileResponse
-    import mimetypes
-    
-    invalid_images_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    
-    image_path = os.path.join(invalid_images_directory, filename)
-    
-    if os.path.exists(image_path):
-        # Determine content type
-        content_type, _ = mimetypes.guess_type(image_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Serve the file
-        response = FileResponse(open(image_path, 'rb'), content_type=content_type)
-        response['Content-Disposition'] = f'inline; filename="{filename}"'
-        return response
-    else:
-        from django.http import Http404
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        raise Http404("No validation session found")
+    return _serve_store_image(request, workspace.invalid_store, filename, workspace.batch_id)
+
+
+def serve_thumbnail(request, status, filename):
+    """
+    A small preview of a valid or invalid image. ``size`` (px) is snapped to
+    a supported size; ``format`` is jpeg or webp, by default WebP when the
+    browser accepts it.
+    """
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        raise Http404("No validation session found")
+    store = {STATUS_VALID: workspace.valid_store, STATUS_INVALID: workspace.invalid_store}.get(status)
+    if store is None or not store.exists(filename):
         raise Http404(f"Image {filename} not found")
 
+    try:
+        size = thumbnail_size(int(request.GET.get("size", DEFAULT_THUMBNAIL_SIZE)))
+    except ValueError:
+        return HttpResponse("Invalid thumbnail size", status=400)
+    fmt = request.GET.get("format")
+    negotiated = fmt is None
+    if negotiated:
+        fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else DEFAULT_THUMBNAIL_FORMAT
+    if fmt not in ("jpeg", "webp"):
+        return HttpResponse(f"Unsupported thumbnail format: {fmt}", status=400)
+    if fmt == "webp" and not webp_supported():
+        fmt = DEFAULT_THUMBNAIL_FORMAT
+
+    try:
+        thumbnail_path, content_type = get_thumbnail_cache().thumbnail(store.path(filename), size, fmt)
+    except Exception as e:
+        # Corrupted originals have no preview; the gallery shows its placeholder
+        logging.debug(f"No thumbnail for {filename}: {e}")
+        raise Http404(f"No thumbnail for {filename}")
+    response = serve_file(request, thumbnail_path, content_type,
+                          immutable=is_batch_pinned(request, workspace.batch_id))
+    if negotiated:
+        response["Vary"] = "Accept"
+    return response
+
 
 def process_selected_images(request):
     """Move selected invalid images to valid folder (revalidate them)"""
     if request.method == "POST":
-        path = request.session.get("path")
-        validDirectory = os.path.join(path, "valid")
-        result_file = os.path.join(
-            settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-        )
-
-        if not os.path.exists(validDirectory):
-            os.makedirs(validDirectory, exist_ok=True)
+        workspace = BatchWorkspace.from_session(request)
+        if workspace is None:
+            return HttpResponse("No validation session found", status=400)
 
         selected_images = request.POST.getlist("selected_images")
         logging.debug(f"Selected images for revalidation: {selected_images}")
 
-        # read the CSV file into a list of rows
-        rows_to_keep = []
-        if os.path.exists(result_file):
-            with open(result_file, "r") as csv_file:
-                csv_reader = csv.reader(csv_file)
-                for row in csv_reader:
-                    if len(row) > 0:
-                        image_filename = row[0]
-                        if image_filename not in selected_images:
-                            rows_to_keep.append(row)  # Keep the row if the image is not in the selected list
-
-        # Write the updated rows (excluding the removed row) back to the CSV file
-        with open(result_file, "w", newline="") as csv_file:
-            csv_writer = csv.writer(csv_file)
-            csv_writer.writerows(rows_to_keep)
+        # The reviewer's decision is recorded in the results store
+        workspace.results.mark_valid(selected_images)
 
         # Move selected images from invalid to valid directory
         moved_count = 0
         for image_name in selected_images:
-            # Source: api/static/api/images/invalid/
-            image_path = os.path.join(
-                settings.BASE_DIR,
-                "api",
-                "static",
-                "api",
-                "images",
-                "invalid",
-                image_name,
-            )
-            # Destination: media/photos/valid/
-            destination_path = os.path.join(validDirectory, image_name)
-
-            try:
-                if os.path.exists(image_path):
-                    shutil.move(image_path, destination_path)
-                    logging.debug(f"Moved {image_name} from {image_path} to {destination_path}")
-                    moved_count += 1
-                else:
-                    logging.warning(f"Image {image_name} not found at {image_path}")
-            except Exception as e:
-                logging.error(f"Error moving {image_name}: {e}")
+            # From the batch's invalid store to its valid store
+            method = workspace.invalid_store.move_to(image_name, workspace.valid_store)
+            if method is None:
+                logging.warning(f"Image {image_name} could not be moved to the valid images")
+            elif method != COMMIT_EXISTS:
+                moved_count += 1
 
         logging.debug(f"Successfully moved {moved_count} images to valid directory")
 
@@ -827,214 +865,134 @@ def process_selected_images(request):
 
 
 def process_rejected_images(request):
-    if request.method == "POST":
-        path = request.session.get("path")
-        invalidDirectory = path + "/" + "invalid/"
-        # invalidDirectory = path + "/" + "invalid/"
-
-        if not os.path.exists(invalidDirectory):
-            os.mkdir(invalidDirectory)
-
-        invalid_images_directory = os.path.join(
-            settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-        )
-
-        # Get a list of all image files in invalid_images_directory
-        image_files = [
-            filename
-            for filename in os.listdir(invalid_images_directory)
-            if filename.lower().endswith((".jpg", ".jpeg", ".png"))
-        ]
-
-        for image_name in image_files:
-            source_path = os.path.join(invalid_images_directory, image_name)
-            destination_path = os.path.join(invalidDirectory, image_name)
-
-            try:
-                shutil.move(source_path, destination_path)
-                logging.debug(f"Moved from {source_path} to {destination_path}")
-            except Exception as e:
-                logging.debug(f"Error moving {source_path} to {destination_path}: {e}")
-
-        newcsvFile = path + "/" + "results.csv"
-        # newcsvFile = path + "/" + "results.csv"
-        oldcsvFile = os.path.join(
-            settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-        )
-        rows = []
-
-        with open(oldcsvFile, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                rows.append(row)
-
-        # Write the updated rows (excluding the removed row) back to the CSV file
-        with open(newcsvFile, "w", newline="") as csv_file:
-            csv_writer = csv.writer(csv_file)
-            csv_writer.writerows(rows)
-
-        # emptying the old csv
-        rows = []
-        with open(oldcsvFile, "w", newline="") as csv_file:
-            csv_writer = csv.writer(csv_file)
-            csv_writer.writerows(rows)
-
+    # The rejected images and their results already sit in the batch's own workspace
     return redirect("displayCsv")
 
 
 def display_csv(request):
     csv_data = []
-    path = request.session.get("path")
-    newcsvFile = path + "/" + "results.csv"
-    # newcsvFile = path + "/" + "results.csv"
-
-    with open(newcsvFile, "r") as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            csv_data.append(row)
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        return HttpResponse("No validation session found", status=400)
+    # One row per invalid image: its name, then its reasons
+    for image_name, reasons in workspace.results.invalid_reasons().items():
+        csv_data.append([image_name] + reasons)
 
     return render(request, "api/display_csv.html", {"csv_data": csv_data})
     # return render(request, 'api/display_csv.html', {'csv_data': csv_data})
 
 
 def delete_all(request):
-    folder_to_delete = os.path.join(settings.MEDIA_ROOT)
-    invalid_folder = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    if os.path.exists(folder_to_delete) and os.path.isdir(folder_to_delete):
-        try:
-            shutil.rmtree(folder_to_delete)
-        except Exception as e:
-            logging.debug(f"Error deleting folder: {e}")
-    if os.path.exists(invalid_folder) and os.path.isdir(invalid_folder):
-        logging.debug(invalid_folder)
-        try:
-            shutil.rmtree(invalid_folder)
-        except Exception as e:
-            logging.debug(f"Error deleting folder: {e}")
-
-    if not os.path.exists(invalid_folder):
-        os.mkdir(invalid_folder)
+    # Only this session's batch; concurrent batches keep their workspaces
+    _delete_session_batch(request)
     form = PhotoFolderUploadForm()
     return render(request, "api/index1.html", {"form": form})
     # return render(request, 'api/index1.html', {'form': form})
 
 
+def _results_export(request, export, content_type, filename):
+    """Stream a results store export, rows read as they are sent"""
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
+        return HttpResponse("No validation session found", status=400)
+
+    # The export only changes when the results store does
+    etag = f'"{workspace.batch_id}-{content_type.rsplit("/", 1)[-1]}-{workspace.results.revision()}"'
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = with_validators(StreamingHttpResponse(export(workspace.results), content_type=content_type), etag)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 def download_and_delete_csv(request):
     """Export comprehensive validation results including both valid and invalid images"""
-    path = request.session.get("path")
-    if not path:
+    # Note: media folder cleanup after export was dropped to preserve data for future use
+    return _results_export(request, iter_csv, CSV_CONTENT_TYPE, "validation_results.csv")
+
+
+def download_results_ndjson(request):
+    """The same export as newline-delimited JSON, one image per line with its metrics and timings"""
+    return _results_export(request, iter_ndjson, NDJSON_CONTENT_TYPE, "validation_results.ndjson")
+
+
+def _archive_etag(workspace, store):
+    """Validator of a store's ZIP: changes with the results and with the folder contents"""
+    return f'"{workspace.batch_id}-{store.fingerprint()}-{workspace.results.revision()}"'
+
+
+def _zip_download(request, store, filename, missing_message):
+    """Stream every image of a store as a ZIP, as it is written"""
+    workspace = BatchWorkspace.from_session(request)
+    if workspace is None:
         return HttpResponse("No validation session found", status=400)
-    
-    valid_directory = os.path.join(path, "valid")
-    invalid_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    result_file = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "result.csv"
-    )
-    
-    # Create comprehensive results
-    import io
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['Image Name', 'Status', 'Validation Issues', 'User Action'])
-    
-    # Get valid images
-    valid_images = []
-    if os.path.exists(valid_directory):
-        valid_images = [f for f in os.listdir(valid_directory) 
-                       if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif'))]
-    
-    # Get invalid images and their issues
-    invalid_data = {}
-    if os.path.exists(result_file):
-        with open(result_file, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if len(row) > 0 and not row[0].startswith('#'):
-                    image_filename = row[0]
-                    reasons = row[1:] if len(row) > 1 else []
-                    invalid_data[image_filename] = reasons
-    
-    # Write valid images
-    for image in valid_images:
-        writer.writerow([image, 'VALID', 'Passed all checks', 'Computer validated'])
-    
-    # Write invalid images
-    for image, reasons in invalid_data.items():
-        issues = ', '.join(reasons) if reasons else 'Unknown issues'
-        writer.writerow([image, 'INVALID', issues, 'Needs review'])
-    
-    # Create response
-    response = HttpResponse(output.getvalue(), content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="validation_results.csv"'
-    
-    # Note: Media folder cleanup is commented out to preserve data for future use
-    # Uncomment the following lines if you want to clean up after export
-    # folder_to_delete = os.path.join(settings.MEDIA_ROOT)
-    # if os.path.exists(folder_to_delete) and os.path.isdir(folder_to_delete):
-    #     try:
-    #         shutil.rmtree(folder_to_delete)
-    #         logging.debug("Cleaned up media folder after export")
-    #     except Exception as e:
-    #             logging.error(f"Error deleting folder: {e}")
-    
+
+    store = getattr(workspace, store)
+    if not os.path.exists(store.root):
+        return HttpResponse(missing_message, status=404)
+
+    etag = _archive_etag(workspace, store)
+    not_modified = conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Shards are flattened again inside the ZIP
+    response = with_validators(StreamingHttpResponse(iter_zip(store.iter_entries()),
+                                                     content_type="application/zip"), etag)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
 def download_valid_images(request):
     """Download all valid images as a zip file."""
-    path = request.session.get("path")
-    if not path:
-        return HttpResponse("No validation session found", status=400)
-
-    valid_directory = os.path.join(path, "valid")
-    if not os.path.exists(valid_directory):
-        return HttpResponse("No valid images found", status=404)
-
-    import io
-    import zipfile
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for filename in os.listdir(valid_directory):
-            file_path = os.path.join(valid_directory, filename)
-            if os.path.isfile(file_path):
-                zipf.write(file_path, arcname=filename)
-
-    response = HttpResponse(buffer.getvalue(), content_type="application/zip")
-    response["Content-Disposition"] = 'attachment; filename="valid_images.zip"'
-    return response
+    return _zip_download(request, "valid_store", "valid_images.zip", "No valid images found")
 
 
 def download_invalid_images(request):
     """Download all invalid images as a zip file."""
-    invalid_directory = os.path.join(
-        settings.BASE_DIR, "api", "static", "api", "images", "invalid"
-    )
-    if not os.path.exists(invalid_directory):
-        return HttpResponse("No invalid images found", status=404)
-
-    import io
-    import zipfile
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for filename in os.listdir(invalid_directory):
-            file_path = os.path.join(invalid_directory, filename)
-            if os.path.isfile(file_path):
-                zipf.write(file_path, arcname=filename)
-
-    response = HttpResponse(buffer.getvalue(), content_type="application/zip")
-    response["Content-Disposition"] = 'attachment; filename="invalid_images.zip"'
-    return response
+    return _zip_download(request, "invalid_store", "invalid_images.zip", "No invalid images found")
+
+
+@csrf_exempt
+def validate_single_image(request):
+    """
+    Validate one image sent as a multipart ``image`` field or a raw image/*
+    body (``?name=`` names it), in memory, and return the structured
+    per-check verdicts, metrics and timings as JSON.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    try:
+        name, data = read_image(request)
+    except SingleImageError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=e.status)
+    report = validate_bytes(name, data)
+    return JsonResponse({"status": "ok", **format_json_report(report)})
+
+
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from PIL import Image
 import io
 
+@csrf_exempt
+def validate_batch(request):
+    """
+    Validate a batch sent in one request - multipart ``images`` files or a
+    JSON list of server-side ``paths`` - and stream one JSON line per image
+    as it completes. Stateless: no session, folders or results database.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Method not allowed"}, status=405)
+    try:
+        source, indexes, errors = parse_batch_request(request)
+    except BatchRequestError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=e.status)
+    return StreamingHttpResponse(iter_batch_ndjson(source, indexes, errors), content_type=NDJSON_CONTENT_TYPE)
+
+
 @csrf_exempt
 def test_config_image(request):
     """
@@ -1048,34 +1006,14 @@ def test_config_image(request):
         return JsonResponse({"error": "No image uploaded"}, status=400)
 
     try:
-        config = get_or_create_config()
-
-        # Save uploaded image to a temporary file
-        import tempfile
-        import os
-        from api.photo_validator_optimized import main_optimized
-
-        # Get the file extension from the uploaded file
-        file_extension = os.path.splitext(image_file.name)[1] or '.jpg'
-        
-        with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as tmp:
-            for chunk in image_file.chunks():
-                tmp.write(chunk)
-            temp_path = tmp.name
-
+        # Re-read, so the page always tests what is saved, even when another
+        # worker saved it; the image is validated in memory
         clear_config_cache()
-
-        # Run validation using main_optimized
-        logging.debug(f"Testing image: {image_file.name} at temporary path: {temp_path}")
-        result_message = main_optimized(temp_path, config=get_or_create_config())
+        config = get_cached_config()
+        report = validate_bytes(image_file.name, image_file.read(), config)
+        result_message = format_single_report(report, build_plan(config))
         logging.debug(f"Validation result: {result_message[:100]}...")  # Log first 100 chars
 
-        # Clean up temporary file
-        try:
-            os.unlink(temp_path)
-        except Exception as cleanup_error:
-            logging.warning(f"Could not clean up temporary file {temp_path}: {cleanup_error}")
-
         # Parse result_message for display with detailed analysis
         lines = result_message.split('\n')
         checks_html = ""
@@ -0,0 +1,109 @@
+"""
+Per-batch workspaces.
+
+Every batch writes into a directory of its own, ``media/batches/<batch_id>``::
+
+    input/        images waiting to be validated (streamed uploads land here)
+    valid/        images that passed
+    invalid/      images that failed, shown in the gallery
+    quarantine/   images the watchdog gave up on
+    results.sqlite3   every image's status and reasons (see results_store)
+
+valid/, invalid/ and quarantine/ are sharded (see image_store); go through
+``valid_store``, ``invalid_store`` and ``quarantine_store`` to reach images.
+
+The session only stores the batch id (``batch_id``); views resolve every
+path through ``BatchWorkspace.from_session``, so concurrent batches never
+share a folder or a results database.
+"""
+import os
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+
+from .image_store import ShardedImageStore
+from .results_store import RESULTS_DB_NAME, ResultsStore
+
+WORKSPACE_DIR_NAME = "batches"
+BATCH_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+SESSION_KEY = "batch_id"
+
+
+def _workspaces_dir():
+    return os.path.join(settings.MEDIA_ROOT, WORKSPACE_DIR_NAME)
+
+
+class BatchWorkspace:
+    """
+    The folders of one batch. ``input_dir`` defaults to ``<root>/input``;
+    main_threaded, called on a bare directory, uses a workspace rooted at
+    that directory with the directory itself as the input.
+    """
+    def __init__(self, root, batch_id=None, input_dir=None):
+        self.root = root
+        self.batch_id = batch_id
+        self.input_dir = input_dir or os.path.join(root, "input")
+
+    @property
+    def valid_dir(self):
+        return os.path.join(self.root, "valid")
+
+    @property
+    def invalid_dir(self):
+        return os.path.join(self.root, "invalid")
+
+    @property
+    def quarantine_dir(self):
+        return os.path.join(self.root, "quarantine")
+
+    @property
+    def valid_store(self):
+        return ShardedImageStore(self.valid_dir)
+
+    @property
+    def invalid_store(self):
+        return ShardedImageStore(self.invalid_dir)
+
+    @property
+    def quarantine_store(self):
+        return ShardedImageStore(self.quarantine_dir)
+
+    @property
+    def results(self):
+        return ResultsStore(os.path.join(self.root, RESULTS_DB_NAME))
+
+    def ensure_dirs(self):
+        """Create the folders and the results database"""
+        for directory in (self.input_dir, self.valid_dir, self.invalid_dir, self.quarantine_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.results.create()
+
+    @classmethod
+    def create(cls):
+        batch_id = uuid.uuid4().hex
+        workspace = cls(os.path.join(_workspaces_dir(), batch_id), batch_id)
+        workspace.ensure_dirs()
+        return workspace
+
+    @classmethod
+    def get(cls, batch_id):
+        """The workspace of batch_id, or None if there is no such batch"""
+        if not BATCH_ID_PATTERN.match(batch_id or ""):
+            return None
+        root = os.path.join(_workspaces_dir(), batch_id)
+        if not os.path.isdir(root):
+            return None
+        return cls(root, batch_id)
+
+    @classmethod
+    def from_session(cls, request):
+        return cls.get(request.session.get(SESSION_KEY))
+
+    def bind(self, request):
+        """Make this the session's current batch"""
+        request.session[SESSION_KEY] = self.batch_id
+
+    def delete(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,73 @@
+"""
+ZIP archives written as a stream, for downloads of whole image sets.
+
+``iter_zip`` yields the archive piece by piece while it reads the files, so
+a download starts with the first local header and never holds more than a
+copy buffer in memory, however many images it contains. ``zipfile`` writes
+to an unseekable sink here, so sizes and CRCs follow each member in a data
+descriptor and the central directory comes last, as usual.
+
+JPEG, PNG, GIF and WebP are already compressed: they are stored as they are
+(``ZIP_STORED``) instead of burning CPU deflating them for nothing. Only
+formats that do compress (BMP) are deflated.
+"""
+import logging
+import zipfile
+
+# Image formats whose data does not get smaller when deflated
+STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+COPY_BUFFER_SIZE = 256 * 1024
+
+
+class _StreamSink:
+    """A write-only file that hands back what was written since the last drain"""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compression_for(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+def iter_zip(entries):
+    """
+    Yield a ZIP archive of ``entries``, (name in the archive, file path)
+    pairs, as it is written. Files that disappear before they are reached
+    are left out.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for arcname, path in entries:
+            try:
+                source = open(path, "rb")
+            except FileNotFoundError:
+                logging.debug(f"{path} disappeared before it could be archived")
+                continue
+            with source:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = compression_for(arcname)
+                with archive.open(info, "w") as member:
+                    for block in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+                        member.write(block)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # The central directory
+    yield sink.drain()
+
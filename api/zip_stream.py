@@ -0,0 +1,292 @@
+"""
+Incremental reader for ZIP archives that are still arriving.
+
+``zipfile`` needs the central directory at the end of the archive, so it can
+only start once the whole upload is on disk. ``ZipStreamParser`` instead walks
+the local file headers in upload order: bytes are fed in as they arrive and
+``on_member(name, data)`` is called the moment a member is complete.
+
+Stored and deflated members are supported, including ZIP64 sizes and deflated
+members written with a trailing data descriptor (macOS Archive Utility, Java).
+A stored member with a data descriptor has no detectable end and is rejected.
+
+Every member goes through the archive pre-screen (``ArchivePrescreen.screen``)
+as soon as its local header is in, so skipped and rejected members are never
+buffered: their data is passed over, or inflated and thrown away when only the
+deflate stream itself tells where it ends. Accepted members are inflated a
+step at a time and dropped as rejected the moment they grow past their
+declared size or the member size limit. Sizes only known at the end (data
+descriptors) are screened then; a data-descriptor member that inflates past
+the compression ratio limit is a decompression bomb, and the rest of the
+archive is not read.
+"""
+import logging
+import posixpath
+import struct
+import zipfile
+import zlib
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Central directory / end records: no more member data follows
+ARCHIVE_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07")
+
+FLAG_ENCRYPTED = 0x01
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+ZIP64_EXTRA_ID = 0x0001
+
+# Largest piece of output one inflate step produces
+INFLATE_STEP = 1024 * 1024
+
+_HEADER, _DATA, _INFLATE, _DESCRIPTOR, _DONE = range(5)
+
+
+class ZipStreamParser:
+    """
+    Feed archive bytes in order with ``feed``; call ``close`` at the end.
+    ``on_member(name, data)`` gets every member ``prescreen`` (an
+    ArchivePrescreen) accepts; rejects are recorded in the prescreen.
+    """
+    def __init__(self, on_member, prescreen):
+        self.on_member = on_member
+        self.prescreen = prescreen
+        self.members = 0
+        self._buffer = bytearray()
+        self._state = _HEADER
+        self._name = None
+        self._method = None
+        self._crc = None
+        self._remaining = 0
+        self._chunks = []
+        self._inflater = None
+        # Image path of the member being kept, None when its data is discarded
+        self._image_path = None
+        self._declared_size = None
+        self._limit = 0
+        self._size = 0
+        self._compressed = 0
+
+    def feed(self, data):
+        self._buffer += data
+        while self._step():
+            pass
+
+    def close(self):
+        if self._state not in (_HEADER, _DONE) or self._state == _HEADER and self._buffer:
+            raise zipfile.BadZipFile("Archive ended in the middle of a member")
+
+    def _step(self):
+        """Advance the state machine; False when more bytes are needed"""
+        if self._state == _HEADER:
+            return self._read_header()
+        if self._state == _DATA:
+            return self._read_data()
+        if self._state == _INFLATE:
+            return self._inflate()
+        if self._state == _DESCRIPTOR:
+            return self._read_descriptor()
+        # _DONE: ignore the central directory
+        self._buffer.clear()
+        return False
+
+    def _read_header(self):
+        if len(self._buffer) < 4:
+            return False
+        signature = bytes(self._buffer[:4])
+        if signature in ARCHIVE_END_SIGNATURES:
+            self._state = _DONE
+            return True
+        if signature == DATA_DESCRIPTOR_SIGNATURE and self.members == 0:
+            # Split-archive marker some tools write before the first header
+            del self._buffer[:4]
+            return True
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile("Bad local file header in archive")
+        if len(self._buffer) < LOCAL_HEADER.size:
+            return False
+        (_, _, flags, method, _, _, crc, compressed_size, file_size,
+         name_length, extra_length) = LOCAL_HEADER.unpack_from(self._buffer)
+        header_size = LOCAL_HEADER.size + name_length + extra_length
+        if len(self._buffer) < header_size:
+            return False
+
+        raw_name = bytes(self._buffer[LOCAL_HEADER.size:LOCAL_HEADER.size + name_length])
+        name = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437")
+        extra = bytes(self._buffer[LOCAL_HEADER.size + name_length:header_size])
+        del self._buffer[:header_size]
+        if 0xFFFFFFFF in (compressed_size, file_size):
+            file_size, compressed_size = _zip64_sizes(extra, file_size, compressed_size)
+
+        self._name = name
+        self._method = method
+        self._crc = crc
+        self._chunks = []
+        self._size = 0
+        self._compressed = 0
+        if flags & FLAG_ENCRYPTED or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            logging.warning(f"Skipping {name} in uploaded archive: encrypted or unsupported compression")
+            self._method = None
+
+        has_descriptor = bool(flags & FLAG_DATA_DESCRIPTOR)
+        if has_descriptor and self._method != zipfile.ZIP_DEFLATED and not name.endswith("/"):
+            raise zipfile.BadZipFile(f"{name}: member size is unknown until the end of the archive")
+        self._declared_size = None if has_descriptor else file_size
+        if self._method is None:
+            self.prescreen.skipped += 1
+            self._image_path = None
+        elif has_descriptor:
+            self._image_path = self.prescreen.screen(name)
+        else:
+            self._image_path = self.prescreen.screen(name, file_size, compressed_size)
+        self._limit = self.prescreen.max_member_size if has_descriptor else file_size
+
+        if has_descriptor:
+            if self._method == zipfile.ZIP_DEFLATED:
+                self._inflater = zlib.decompressobj(-15)
+                self._state = _INFLATE
+            else:
+                # Directory entry: no data, the descriptor follows directly
+                self._state = _DESCRIPTOR
+        else:
+            self._remaining = compressed_size
+            if self._image_path is not None and self._method == zipfile.ZIP_DEFLATED:
+                self._inflater = zlib.decompressobj(-15)
+            self._state = _DATA
+        return True
+
+    def _read_data(self):
+        take = min(self._remaining, len(self._buffer))
+        if take:
+            if self._image_path is not None:
+                data = bytes(self._buffer[:take])
+                if self._inflater is not None:
+                    self._inflate_step(data)
+                else:
+                    self._keep(data)
+            # A discarded member's data is passed over unread
+            del self._buffer[:take]
+            self._remaining -= take
+        if self._remaining:
+            return False
+        if self._image_path is not None and self._inflater is not None and not self._inflater.eof:
+            raise zipfile.BadZipFile(f"{self._name}: deflate data ends early")
+        self._finish_member()
+        self._state = _HEADER
+        return True
+
+    def _inflate(self):
+        if not self._buffer:
+            return False
+        data = bytes(self._buffer)
+        self._buffer = bytearray(self._inflate_step(data))
+        if self._state == _DONE:
+            return True
+        if not self._inflater.eof:
+            return False
+        self._state = _DESCRIPTOR
+        return True
+
+    def _inflate_step(self, data):
+        """
+        Inflate compressed member bytes INFLATE_STEP at a time, keeping the
+        output of a member that is still accepted. Returns the bytes past the
+        end of the deflate stream.
+        """
+        inflater = self._inflater
+        while data and not inflater.eof:
+            output = inflater.decompress(data, INFLATE_STEP)
+            self._compressed += len(data) - len(inflater.unconsumed_tail) - len(inflater.unused_data)
+            data = inflater.unconsumed_tail
+            if self._image_path is not None:
+                self._keep(output)
+            else:
+                self._size += len(output)
+            if (self._declared_size is None and self._size > INFLATE_STEP
+                    and self._size > self._compressed * self.prescreen.max_ratio):
+                self._reject_bomb()
+                return b""
+        return inflater.unused_data
+
+    def _keep(self, output):
+        """Buffer a piece of the accepted member, or reject it once it outgrows its limit"""
+        self._size += len(output)
+        if self._size <= self._limit:
+            self._chunks.append(output)
+            return
+        logging.warning(f"{self._name} in uploaded archive inflates past {self._limit} bytes, rejected")
+        self.prescreen.reject(self._image_path, self.prescreen.too_large_report(
+            posixpath.basename(self._name), self._size, self._limit))
+        self._image_path = None
+        self._chunks = []
+        if self._declared_size is not None:
+            # The compressed size is known: the rest is passed over without inflating it
+            self._inflater = None
+
+    def _reject_bomb(self):
+        name = self._name
+        logging.warning(f"{name} in uploaded archive exceeds the compression ratio limit; "
+                        f"the rest of the archive is not read")
+        if self._image_path is not None:
+            self.prescreen.reject(self._image_path, self.prescreen.ratio_report(
+                posixpath.basename(name), self._size, self._compressed))
+        self._image_path = None
+        self._chunks = []
+        self._inflater = None
+        self._buffer.clear()
+        self._state = _DONE
+
+    def _read_descriptor(self):
+        offset = 4 if self._buffer[:4] == DATA_DESCRIPTOR_SIGNATURE else 0
+        if len(self._buffer) < offset + 4:
+            return False
+        self._crc = struct.unpack_from("<I", self._buffer, offset)[0]
+        # 32-bit sizes unless the next record only starts after 64-bit ones
+        for size_length in (12, 20):
+            following = self._buffer[offset + size_length:offset + size_length + 2]
+            if len(following) < 2:
+                return False
+            if following == b"PK":
+                break
+        del self._buffer[:offset + size_length]
+        self._finish_member()
+        self._state = _HEADER
+        return True
+
+    def _finish_member(self):
+        name = self._name
+        image_path = self._image_path
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self._inflater = None
+        self._image_path = None
+        self.members += 1
+        if image_path is None:
+            return
+        if self._declared_size != len(data):
+            # Sizes from a data descriptor, or a header that got them wrong
+            report = self.prescreen.check_sizes(posixpath.basename(name), len(data), self._compressed)
+            if report is not None:
+                self.prescreen.reject(image_path, report)
+                return
+        if zlib.crc32(data) != self._crc:
+            logging.warning(f"CRC mismatch for {name} in uploaded archive")
+        self.on_member(name, data)
+
+
+def _zip64_sizes(extra, file_size, compressed_size):
+    """Read the ZIP64 extended sizes out of a local header's extra field"""
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, position)
+        if header_id == ZIP64_EXTRA_ID:
+            values = extra[position + 4:position + 4 + length]
+            fields = [struct.unpack_from("<Q", values, index)[0] for index in range(0, len(values) - 7, 8)]
+            if file_size == 0xFFFFFFFF and fields:
+                file_size = fields.pop(0)
+            if compressed_size == 0xFFFFFFFF and fields:
+                compressed_size = fields.pop(0)
+            break
+        position += 4 + length
+    return file_size, compressed_size
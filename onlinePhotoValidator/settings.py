@@ -147,3 +147,81 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Longest side (px) each validation check analyses, keyed by check name
+# (see api/check_registry.py). None runs the check at full resolution;
+# checks not listed keep their registry default.
+PHOTO_VALIDATOR_WORKING_RESOLUTION = {}
+
+# Batch pre-screen: greyness, background and blur run on a thumbnail of this
+# size first and obvious failures skip the face/eye/symmetry analysis. The
+# audit rate is the fraction of early rejects still fully analysed to measure
+# how often the thumbnail verdict disagrees.
+PHOTO_VALIDATOR_PRESCREEN_ENABLED = True
+PHOTO_VALIDATOR_PRESCREEN_SIZE = 256
+PHOTO_VALIDATOR_PRESCREEN_AUDIT_RATE = 0.05
+
+# Batch engine: "thread" stops over-budget images cooperatively between
+# checks, "process" runs each image in a worker process that is killed once
+# it exceeds the budget. Timed-out images are moved to a quarantine folder.
+PHOTO_VALIDATOR_ENGINE = os.environ.get('PHOTO_VALIDATOR_ENGINE', 'thread')
+PHOTO_VALIDATOR_IMAGE_TIMEOUT = 120  # seconds per image, None to disable
+
+# Largest chunk the resumable upload API (upload/chunked/) accepts; also the
+# chunk size suggested to clients.
+PHOTO_VALIDATOR_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Largest archive a chunked upload may declare (answered with 413), and how
+# long an upload may go without a chunk before its partial file is deleted.
+PHOTO_VALIDATOR_ARCHIVE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+PHOTO_VALIDATOR_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# A streamed upload (stream_upload/) that sends nothing for this many seconds,
+# e.g. a ``final=0`` batch that is never finished, is aborted and its
+# workspace removed. None waits forever.
+PHOTO_VALIDATOR_UPLOAD_IDLE_TIMEOUT = 300
+
+# Archive pre-screen limits, checked against the ZIP central directory before
+# any member is extracted, or against each local header of a streamed upload:
+# members that inflate more than MAX_RATIO times or declare (or inflate to)
+# more than MAX_MEMBER_SIZE bytes are rejected unread.
+PHOTO_VALIDATOR_ARCHIVE_MAX_RATIO = 100
+PHOTO_VALIDATOR_ARCHIVE_MAX_MEMBER_SIZE = 50 * 1024 * 1024
+
+# Gallery thumbnails (api/thumbnails.py): a disk cache keyed by content hash,
+# trimmed to MAX_BYTES least recently used first. With PREGENERATE, batches
+# write each image's default-size thumbnail while it is still decoded.
+# CACHE_DIR None keeps the cache in MEDIA_ROOT/thumbnails.
+PHOTO_VALIDATOR_THUMBNAIL_CACHE_DIR = None
+PHOTO_VALIDATOR_THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PHOTO_VALIDATOR_THUMBNAIL_PREGENERATE = True
+
+# Let a front proxy send image bytes: None serves them from Django,
+# "x-sendfile" (Apache mod_xsendfile, lighttpd) or "x-accel-redirect" (nginx,
+# with an internal location SENDFILE_URL aliased to SENDFILE_ROOT).
+# SENDFILE_ROOT None means MEDIA_ROOT.
+PHOTO_VALIDATOR_SENDFILE = os.environ.get('PHOTO_VALIDATOR_SENDFILE') or None
+PHOTO_VALIDATOR_SENDFILE_ROOT = None
+PHOTO_VALIDATOR_SENDFILE_URL = '/protected-media/'
+
+# Largest image the single-image JSON API (api/validate/) accepts; it is
+# validated in memory, never written to disk.
+PHOTO_VALIDATOR_SINGLE_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+# Load one of each face / eye detector (api/detectors.py) when the app starts,
+# in the background, so the first request does not pay for it.
+PHOTO_VALIDATOR_WARM_DETECTORS = True
+
+# Threads the checks of a single interactively validated image (api/validate/,
+# the config test) run on in parallel; below 2 they run one after another.
+# Only worth it with spare cores: on a single core the parallel run is no
+# faster. Batches keep one image per worker and are not affected.
+PHOTO_VALIDATOR_CHECK_WORKERS = 4
+
+# Directories whose files the batch JSON API (api/validate/batch/) may be
+# asked to validate by path; empty means uploads only.
+PHOTO_VALIDATOR_API_PATH_ROOTS = []
+
+# Most images one batch JSON API request may carry; each is also bounded by
+# PHOTO_VALIDATOR_SINGLE_IMAGE_MAX_BYTES. Larger requests get a 413.
+PHOTO_VALIDATOR_BATCH_API_MAX_IMAGES = 100
+